@@ -0,0 +1,215 @@
+from typing import Deque, FrozenSet, Optional, Tuple
+from collections import OrderedDict, deque
+from metrics import ADMISSION_REJECTED, ADMISSION_QUEUED
+import asyncio
+import math
+import os
+import time
+
+class TokenBuckets:
+    """Per-client token buckets refilled at ``rate`` tokens a second up to ``burst``.
+
+    Keeps the ``max_clients`` most recently seen clients; a client that was
+    evicted simply starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, last refill time)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Take a token, returning 0 or the seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+class ConcurrencyLimit:
+    """At most ``limit`` requests in flight, with a bounded FIFO wait queue.
+
+    Waiters give up after ``timeout`` seconds. A finished request hands its
+    slot straight to the oldest waiter, so queued requests can't be
+    overtaken by new arrivals.
+    """
+
+    def __init__(self, limit: int, max_queue: int, timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.inc()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+            return True
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the deadline passed
+            return waiter.done() and not waiter.cancelled()
+        except asyncio.CancelledError:
+            # The client went away; pass on a slot it was already given
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            ADMISSION_QUEUED.dec()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot passes to the waiter, so in_flight is unchanged
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load before it reaches the routers.
+
+    Each client (verified user, else client address) has a token bucket of
+    RATE_LIMIT_BURST requests refilled at RATE_LIMIT_RPS; an empty bucket
+    gets 429. At most ADMISSION_MAX_IN_FLIGHT requests run at once, up to
+    ADMISSION_MAX_QUEUE more wait for a slot for ADMISSION_QUEUE_TIMEOUT
+    seconds, and the rest get 503. Both carry Retry-After. Exempt paths skip
+    both checks so health checks keep passing while the instance is
+    degraded; long-lived streams skip the in-flight cap.
+
+    The client address comes from X-Forwarded-For only when the connection
+    is from one of the comma-separated TRUSTED_PROXIES; ``*`` trusts
+    whichever peer connects, for hosts like Railway whose edge addresses
+    vary and are the only way in.
+    """
+
+    def __init__(
+        self,
+        app,
+        exempt: Tuple[str, ...] = ("/health", "/metrics"),
+        streams: Tuple[str, ...] = ("/events",)
+    ):
+        self.app = app
+        self.exempt = frozenset(exempt)
+        self.streams = frozenset(streams)
+        self.trusted_proxies = frozenset(
+            address.strip() for address in os.getenv("TRUSTED_PROXIES", "").split(",")
+            if address.strip()
+        )
+        rate = float(os.getenv("RATE_LIMIT_RPS", "10"))
+        self.buckets: Optional[TokenBuckets] = TokenBuckets(
+            rate=rate,
+            burst=float(os.getenv("RATE_LIMIT_BURST", "30")),
+            max_clients=int(os.getenv("RATE_LIMIT_CLIENTS", "10000"))
+        ) if rate > 0 else None
+        max_in_flight = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "100"))
+        self.limit: Optional[ConcurrencyLimit] = ConcurrencyLimit(
+            limit=max_in_flight,
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "200")),
+            timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+        ) if max_in_flight > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt:
+            await self.app(scope, receive, send)
+            return
+
+        if self.buckets:
+            wait = self.buckets.take(await _client_key(scope, self.trusted_proxies))
+            if wait:
+                ADMISSION_REJECTED.inc("rate_limited")
+                await _reject(send, 429, "Too many requests", wait)
+                return
+
+        if not self.limit or scope["path"] in self.streams:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.limit.acquire():
+            ADMISSION_REJECTED.inc("overloaded")
+            await _reject(send, 503, "Server is overloaded", self.limit.timeout)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limit.release()
+
+async def _client_key(scope, trusted_proxies: FrozenSet[str] = frozenset()) -> str:
+    """The verified user behind the bearer token, else the client address.
+
+    Unverified tokens fall back to the address, so made-up tokens can't buy
+    fresh buckets. Verification is cached by the app's TokenVerifier, which
+    the auth dependency then reuses.
+    """
+    token = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                token = None
+            break
+    verifier = getattr(getattr(scope.get("app"), "state", None), "token_verifier", None)
+    if token and verifier:
+        try:
+            claims = await verifier.verify(token)
+            return "user:" + claims["sub"]
+        except Exception:
+            pass
+    return "ip:" + _client_address(scope, trusted_proxies)
+
+def _client_address(scope, trusted_proxies: FrozenSet[str]) -> str:
+    """The peer address, or the forwarded one when the peer is a trusted proxy.
+
+    X-Forwarded-For is read from the right, skipping trusted proxies: each
+    proxy appends the address it saw, and anything further left was sent
+    by the client and could be made up. With ``*`` only the entry added by
+    the connecting proxy is used.
+    """
+    client = scope.get("client")
+    address = client[0] if client else "unknown"
+    if not trusted_proxies or ("*" not in trusted_proxies and address not in trusted_proxies):
+        return address
+
+    forwarded = [
+        value.decode("latin-1") for name, value in scope["headers"]
+        if name == b"x-forwarded-for"
+    ]
+    hops = [hop.strip() for hop in ",".join(forwarded).split(",") if hop.strip()]
+    if "*" in trusted_proxies:
+        return hops[-1] if hops else address
+    for hop in reversed(hops):
+        if hop not in trusted_proxies:
+            return hop
+    return hops[0] if hops else address
+
+async def _reject(send, status: int, detail: str, retry_after: float) -> None:
+    body = b'{"detail":"' + detail.encode() + b'"}'
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,114 @@
+"""Requests per second through the full middleware stack.
+
+Runs the app in-process (no network) against a throwaway SQLite database and
+compares it with the same app using the old @app.middleware("http") HTTPS
+redirect, which wraps every request in Starlette's BaseHTTPMiddleware.
+
+Run from the backend directory:
+
+    python -m benchmarks.rps --requests 2000 --concurrency 20
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("RATE_LIMIT_RPS", "0")
+
+from typing import Dict
+from fastapi import FastAPI, Request
+from fastapi.responses import RedirectResponse
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from redirects import HTTPSRedirectMiddleware
+import argparse
+import asyncio
+import httpx
+import main
+import time
+
+USERS = {"Bearer bench-a": "bench-a", "Bearer bench-b": "bench-b"}
+
+async def legacy_https_redirect(request: Request, call_next):
+    """The HTTPS redirect as it was registered before, for comparison"""
+    forwarded_proto = request.headers.get("x-forwarded-proto", request.url.scheme)
+    if os.environ.get("ENVIRONMENT") == "production" and forwarded_proto != "https":
+        url = str(request.url)
+        https_url = url.replace("http://", "https://", 1)
+        return RedirectResponse(https_url, status_code=301)
+    return await call_next(request)
+
+def build_app(legacy: bool) -> FastAPI:
+    app = main.create_app()
+    if legacy:
+        app.user_middleware = [
+            Middleware(BaseHTTPMiddleware, dispatch=legacy_https_redirect)
+            if middleware.cls is HTTPSRedirectMiddleware else middleware
+            for middleware in app.user_middleware
+        ]
+    return app
+
+async def fake_verify(token: str) -> Dict[str, str]:
+    return {"sub": USERS[f"Bearer {token}"], "email": f"{token}@example.com"}
+
+async def seed(client: httpx.AsyncClient, tasks: int) -> None:
+    """Pair the two benchmark users and give them some active tasks"""
+    a, b = ({"Authorization": header} for header in USERS)
+    code = (await client.post("/auth/generate-pairing-code", headers=a)).json()["pair_code"]
+    await client.post("/auth/generate-pairing-code", headers=b)
+    await client.post("/auth/pair", headers=b, json={"partner_code": code})
+    await client.post("/auth/accept-pair", headers=a)
+    await client.post("/tasks/batch", headers=a, json=[
+        {"title": f"Task {i}", "description": "Benchmark", "points": i} for i in range(tasks)
+    ])
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int, concurrency: int) -> float:
+    headers = {"Authorization": next(iter(USERS))}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+async def run(args) -> None:
+    seeded = False
+    results: Dict[str, Dict[str, list]] = {}
+    for _ in range(args.rounds):
+        # Alternate the variants so drift affects both equally
+        for name, legacy in (("before", True), ("after", False)):
+            app = build_app(legacy)
+            async with app.router.lifespan_context(app):
+                app.state.token_verifier.verify = fake_verify
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                    if not seeded:
+                        await seed(client, args.tasks)
+                        seeded = True
+                    for path in ("/", f"/tasks/active?limit={args.tasks}"):
+                        rps = await measure(client, path, args.requests, args.concurrency)
+                        results.setdefault(path, {}).setdefault(name, []).append(rps)
+
+    print(f"{args.requests} requests x {args.rounds} rounds, concurrency {args.concurrency}")
+    print(f"{'path':<28}{'before rps':>12}{'after rps':>12}{'change':>9}")
+    for path, by_name in results.items():
+        before, after = max(by_name["before"]), max(by_name["after"])
+        print(f"{path:<28}{before:>12.0f}{after:>12.0f}{(after / before - 1) * 100:>8.1f}%")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=20, help="active tasks returned per request")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,138 @@
+"""Per-row cost of serializing the active task list.
+
+Compares the model path (Profile/User/TaskBase/Task objects, a hand-built
+dict, FastAPI's encoder and the stdlib json module) against the row path
+used by GET /tasks/active (database rows encoded directly with orjson).
+No database is needed; rows are generated in memory.
+
+Run from the backend directory:
+
+    python -m benchmarks.task_list --rows 500
+"""
+from typing import Any, Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from models.task import Task
+from models.user import Profile, User
+import argparse
+import json
+import orjson
+import time
+import tracemalloc
+import uuid
+
+def make_rows(count: int) -> List[Dict[str, Any]]:
+    """Rows shaped like a TASK_COLUMNS select from Postgres"""
+    creator_id, assignee_id = str(uuid.uuid4()), str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Task {i}",
+            "description": "Take out the recycling before the truck comes",
+            "points": 10 + i % 40,
+            "creator_id": creator_id,
+            "assignee_id": assignee_id,
+            "status": "active",
+            "validation_required": i % 3 == 0,
+            "random_payout": False,
+            "min_points": None,
+            "max_points": None,
+            "due_date": "2026-10-20T18:00:00+00:00" if i % 2 else None,
+            "overdue_at": None,
+        }
+        for i in range(count)
+    ]
+
+def make_profiles(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    return {
+        user_id: {
+            "id": user_id,
+            "email": f"{user_id[:8]}@example.com",
+            "pair_code": None,
+            "paired": True,
+            "points": 120,
+            "created_at": "2026-01-01T00:00:00+00:00",
+        }
+        for user_id in {rows[0]["creator_id"], rows[0]["assignee_id"]}
+    }
+
+def model_path(rows: List[Dict[str, Any]], profiles: Dict[str, Dict[str, Any]]) -> bytes:
+    """What listing cost before: users and tasks built per row, then re-encoded"""
+    users = {
+        user_id: User(id=user_id, profile=Profile(**data))
+        for user_id, data in profiles.items()
+    }
+    body = []
+    for row in rows:
+        task = Task(
+            creator=users[row["creator_id"]],
+            assignee=users[row["assignee_id"]],
+            **{k: v for k, v in row.items() if k not in ("id", "creator_id", "assignee_id")}
+        )
+        task.id = row["id"]
+        body.append({
+            "id": task.id,
+            "title": task.data.title,
+            "description": task.data.description,
+            "points": task.data.points,
+            "creator_id": task.data.creator_id,
+            "assignee_id": task.data.assignee_id,
+            "status": task.data.status,
+            "validation_required": task.data.validation_required,
+            "random_payout": task.data.random_payout,
+            "min_points": task.data.min_points,
+            "max_points": task.data.max_points,
+            "due_date": task.data.due_date,
+            "overdue_at": task.data.overdue_at
+        })
+    return json.dumps(jsonable_encoder(body)).encode()
+
+def row_path(rows: List[Dict[str, Any]], profiles: Dict[str, Dict[str, Any]]) -> bytes:
+    """What listing costs now: rows straight into orjson"""
+    return orjson.dumps(rows)
+
+def measure(fn: Callable, rows, profiles, repeat: int) -> Dict[str, float]:
+    fn(rows, profiles)  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows, profiles)
+    cpu = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    fn(rows, profiles)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "us_per_row": cpu / len(rows) * 1e6,
+        "peak_bytes_per_row": peak / len(rows),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    profiles = make_profiles(rows)
+    assert orjson.loads(model_path(rows, profiles)) == orjson.loads(row_path(rows, profiles)), \
+        "both paths must produce the same JSON"
+
+    results = {
+        "models + json": measure(model_path, rows, profiles, args.repeat),
+        "rows + orjson": measure(row_path, rows, profiles, args.repeat),
+    }
+    print(f"{args.rows} rows, {args.repeat} runs")
+    print(f"{'path':<16}{'us/row':>10}{'peak B/row':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:<16}{result['us_per_row']:>10.2f}"
+            f"{result['peak_bytes_per_row']:>12.0f}"
+        )
+    before, after = results["models + json"], results["rows + orjson"]
+    print(
+        f"{before['us_per_row'] / after['us_per_row']:.1f}x less CPU, "
+        f"{before['peak_bytes_per_row'] / after['peak_bytes_per_row']:.1f}x less peak memory per row"
+    )
+
+if __name__ == "__main__":
+    main()
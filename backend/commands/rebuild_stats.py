@@ -0,0 +1,34 @@
+"""Recompute the task statistics behind /stats from scratch.
+
+The aggregates are kept up to date by database triggers; run this after
+restoring data, changing the aggregation or editing tasks by hand with the
+triggers disabled. Task writes and ledger appends wait while it runs, so
+run it during a quiet period.
+
+Run from the backend directory:
+
+    python -m commands.rebuild_stats
+"""
+from logs import setup_logging
+from models.database import Database
+from models.stats import TaskStats
+import asyncio
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+async def run() -> int:
+    try:
+        counted = await TaskStats.rebuild()
+    finally:
+        await Database().close()
+    if counted is None:
+        logger.error("Rebuilding task stats failed")
+        return 1
+    logger.info("Rebuilt task stats from %d tasks", counted)
+    return 0
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,265 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from metrics import COMPRESSION_INPUT, COMPRESSION_OUTPUT, COMPRESSION_CPU
+import asyncio
+import os
+import re
+import time
+import zlib
+
+# Brotli and Zstandard are used when their packages are installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compressible content types, besides text/*
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml",
+}
+
+# ETag suffixes marking compressed representations
+_ENCODED_ETAG = re.compile(rb'-(gzip|br|zstd)"')
+
+class _Encoder:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=4)
+        else:
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """Compress a chunk, flushing so the client can decode it right away"""
+        if self.encoding == "zstd":
+            out = self._compressor.compress(data)
+            return out + (self._compressor.flush() if final else
+                          self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+        if self.encoding == "br":
+            out = self._compressor.process(data)
+            return out + (self._compressor.finish() if final else self._compressor.flush())
+        out = self._compressor.compress(data)
+        return out + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+def available_encodings() -> List[str]:
+    """Supported encodings in order of preference"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the preferred encoding the client accepts with the highest q-value"""
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def _compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value
+    media_type = content_type.split(b";")[0].strip().decode("latin-1").lower()
+    if media_type == "text/event-stream":
+        # Events are small and must not wait in a compressor
+        return False
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses the client accepts compressed.
+
+    Uses zstd, br or gzip as negotiated through Accept-Encoding. Bodies
+    smaller than COMPRESSION_MIN_SIZE bytes are sent as they are. Streamed
+    bodies are buffered up to that size, then compressed chunk by chunk with a
+    flush after each so lines still arrive as they are produced. Chunks of at
+    least COMPRESSION_THREAD_SIZE bytes are compressed in a worker thread so
+    the event loop stays free.
+
+    Compressed responses get an encoding suffix on their ETag (``"abc-gzip"``)
+    and the suffix is removed from If-None-Match before the app sees it, so
+    conditional requests keep working. A 304 gets the suffix back so it names
+    the representation the client has cached.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.encodings = available_encodings()
+        self.minimum_size = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        self.thread_size = int(os.getenv("COMPRESSION_THREAD_SIZE", "65536"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        cached_encoding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+            elif name == b"if-none-match":
+                match = _ENCODED_ETAG.search(value)
+                if match:
+                    cached_encoding = match.group(1).decode()
+                    value = _ENCODED_ETAG.sub(b'"', value)
+            headers.append((name, value))
+        # In place, not a copy: the router records scope["route"] on this
+        # dict and the outer metrics and tracing middleware read it back
+        scope["headers"] = headers
+
+        encoding = negotiate(accept_encoding, self.encodings) if accept_encoding else None
+        # HEAD responses have no body but must keep their real Content-Length
+        if encoding is None or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        responder = _Responder(self, encoding, send, cached_encoding)
+        await self.app(scope, receive, responder.send)
+
+class _Responder:
+    """Wraps ``send`` for one response, deciding whether to compress it"""
+
+    def __init__(
+        self,
+        middleware: CompressionMiddleware,
+        encoding: str,
+        send: Callable,
+        cached_encoding: Optional[str] = None
+    ):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.cached_encoding = cached_encoding
+        self._send = send
+        self.start: Optional[dict] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: dict) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            status = message["status"]
+            if status == 304 and self.cached_encoding:
+                self.passthrough = True
+                await self._send({
+                    **message,
+                    "headers": _with_etag_suffix(message.get("headers", []), self.cached_encoding)
+                })
+            elif status < 200 or status in (204, 304) or not _compressible(message.get("headers", [])):
+                self.passthrough = True
+                await self._send(message)
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is not None:
+            await self._send_compressed(body, final=not more_body)
+            return
+
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if self.buffered < self.middleware.minimum_size:
+            if more_body:
+                return
+            # Too small to be worth compressing
+            await self._send_start(self._headers(content_length=self.buffered))
+            await self._send({"type": "http.response.body", "body": b"".join(self.buffer)})
+            return
+
+        self.encoder = _Encoder(self.encoding)
+        data = b"".join(self.buffer)
+        self.buffer = []
+        if not more_body:
+            out = await self._compress(data, final=True)
+            await self._send_start(self._headers(content_length=len(out), encoded=True))
+            await self._send({"type": "http.response.body", "body": out})
+            return
+
+        await self._send_start(self._headers(encoded=True))
+        await self._send_compressed(data, final=False)
+
+    async def _send_start(self, headers: List[Tuple[bytes, bytes]]) -> None:
+        await self._send({**self.start, "headers": headers})
+
+    async def _send_compressed(self, data: bytes, final: bool) -> None:
+        out = await self._compress(data, final)
+        await self._send({"type": "http.response.body", "body": out, "more_body": not final})
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        if len(data) >= self.middleware.thread_size:
+            loop = asyncio.get_running_loop()
+            out, cpu = await loop.run_in_executor(None, _timed, self.encoder.compress, data, final)
+        else:
+            out, cpu = _timed(self.encoder.compress, data, final)
+        # Metrics are only updated from the event loop thread
+        COMPRESSION_INPUT.inc(self.encoding, amount=len(data))
+        COMPRESSION_OUTPUT.inc(self.encoding, amount=len(out))
+        COMPRESSION_CPU.observe(cpu, self.encoding)
+        return out
+
+    def _headers(
+        self,
+        content_length: Optional[int] = None,
+        encoded: bool = False
+    ) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (name, value) for name, value in self.start.get("headers", [])
+            if name != b"content-length"
+        ]
+        if encoded:
+            headers = _with_etag_suffix(headers, self.encoding)
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        if encoded:
+            headers.append((b"content-encoding", self.encoding.encode()))
+            headers.append((b"vary", b"Accept-Encoding"))
+        return headers
+
+def _with_etag_suffix(headers: List[Tuple[bytes, bytes]], encoding: str) -> List[Tuple[bytes, bytes]]:
+    """Mark a strong ETag as belonging to the compressed representation"""
+    return [
+        (name, value[:-1] + b"-" + encoding.encode() + b'"')
+        if name == b"etag" and not value.startswith(b"W/") else (name, value)
+        for name, value in headers
+    ]
+
+def _timed(compress: Callable[[bytes, bool], bytes], data: bytes, final: bool) -> Tuple[bytes, float]:
+    """Compress and measure the CPU time of the thread doing it"""
+    start = time.thread_time()
+    out = compress(data, final)
+    return out, time.thread_time() - start
@@ -0,0 +1,68 @@
+from typing import Optional, TYPE_CHECKING
+from dotenv import load_dotenv
+import os
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+class Settings:
+    """Environment configuration, read once when the app starts"""
+
+    def __init__(self):
+        # Load from .env file if it exists
+        load_dotenv()
+
+        self.database_backend = os.getenv("DATABASE_BACKEND", "supabase")
+        # Connection pool of the "async" backend
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "20"))
+        self.db_pool_keepalive = int(os.getenv("DB_POOL_KEEPALIVE", "10"))
+        self.db_pool_warm = int(os.getenv("DB_POOL_WARM", "2"))
+        self.db_timeout = float(os.getenv("DB_TIMEOUT", "10"))
+        self.db_connect_timeout = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+        self.db_http2 = os.getenv("DB_HTTP2", "true").lower() == "true"
+        self.sqlite_path = os.getenv("SQLITE_PATH", "toucan.db")
+        self.supabase_url = os.getenv("SUPABASE_URL")
+        self.supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+        # The SQLite backend stores nothing in Supabase, so it runs without them
+        if self.database_backend != "sqlite" and not self.has_supabase:
+            raise RuntimeError(
+                "Missing required environment variables. "
+                "Please ensure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set."
+            )
+
+        self.jwt_secret = os.getenv("SUPABASE_JWT_SECRET")
+        default_jwks_url = (
+            f"{self.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+            if self.supabase_url else None
+        )
+        self.jwks_url = os.getenv("SUPABASE_JWKS_URL", default_jwks_url)
+        self.jwt_audience = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+        self.token_cache_size = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+        # Seconds between points ledger compactions; 0 leaves it to pg_cron
+        self.points_compact_interval = float(os.getenv("POINTS_COMPACT_INTERVAL", "300"))
+
+    @property
+    def has_supabase(self) -> bool:
+        return bool(self.supabase_url and self.supabase_key)
+
+_settings: Optional[Settings] = None
+
+def get_settings() -> Settings:
+    """Return the process-wide settings, reading the environment on first use"""
+    global _settings
+    if _settings is None:
+        _settings = Settings()
+    return _settings
+
+def create_supabase_client(settings: Settings) -> Optional["Client"]:
+    """Create the Supabase client shared by the whole app, or None when
+    Supabase isn't configured (only allowed with the SQLite backend)"""
+    if not settings.has_supabase:
+        return None
+    # Imported here so importing the app doesn't pay for the supabase package
+    from supabase import create_client
+    try:
+        return create_client(settings.supabase_url, settings.supabase_key)
+    except Exception as e:
+        raise RuntimeError(f"Failed to initialize Supabase client: {str(e)}")
@@ -1,46 +1,119 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from typing import Any, Dict, Optional, TYPE_CHECKING
+from metrics import AUTH_LATENCY
 from models.user import User
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+from resilience import ServiceUnavailableError, auth_calls
+from security import TokenVerifier
+import asyncio
+import hashlib
+import logging
+import time
+import tracing
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Get environment variables with error handling
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+if TYPE_CHECKING:
+    from supabase import Client
 
-if not supabase_url or not supabase_key:
-    raise RuntimeError(
-        "Missing required environment variables. "
-        "Please ensure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set."
-    )
+def get_supabase(request: Request) -> "Client":
+    """The Supabase client shared by the app, created in its lifespan"""
+    supabase = request.app.state.supabase
+    if supabase is None:
+        raise HTTPException(503, "Supabase Auth is not configured")
+    return supabase
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize Supabase client: {str(e)}")
+def get_token_verifier(request: Request) -> TokenVerifier:
+    """Tokens are verified locally against the JWT secret (HS256) or the project's JWKS"""
+    return request.app.state.token_verifier
 
 security = HTTPBearer()
 
+async def verify_token(token_verifier: TokenVerifier, token: str) -> Dict[str, Any]:
+    """Verify an access token, recording how long it took"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        claims = await token_verifier.verify(token)
+        outcome = "ok"
+        return claims
+    finally:
+        duration = time.perf_counter() - start
+        AUTH_LATENCY.observe(duration, outcome)
+        tracing.record("auth", "token", "verify", duration)
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    token_verifier: TokenVerifier = Depends(get_token_verifier)
 ) -> User:
     """Get the current authenticated user"""
     try:
-        # Get user data from token (this is a sync operation)
-        user = supabase.auth.get_user(credentials.credentials)
-        if not user or not user.user:
-            raise HTTPException(401, "Invalid authentication token")
+        # Verify the token locally (cached until it expires)
+        claims = await verify_token(token_verifier, credentials.credentials)
             
         # Get the user profile (this is async)
-        current_user = await User.get_by_id(user.user.id)
+        current_user = await User.get_by_id(claims["sub"])
         if not current_user:
             raise HTTPException(404, "User profile not found")
             
+        tracing.set_user(current_user.id)
+        
+        # Later lookups in this request reuse the caller and batch the rest
+        User.start_request_scope(current_user)
         return current_user
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
-        print(f"Auth error: {str(e)}")
-        raise HTTPException(401, "Invalid authentication token") 
\ No newline at end of file
+        logger.warning("Auth error: %s", e)
+        raise HTTPException(401, "Invalid authentication token")
+
+async def fetch_auth_user(supabase, token: str):
+    """Ask Supabase Auth for the user behind a token, under the auth call policy.
+
+    The sync client runs in a worker thread so the deadline can fire.
+    """
+    return await auth_calls.call(
+        "get_user",
+        lambda: asyncio.to_thread(supabase.auth.get_user, token),
+        idempotent=True
+    )
+
+async def get_current_user_checked(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    token_verifier: TokenVerifier = Depends(get_token_verifier),
+    supabase = Depends(get_supabase)
+) -> User:
+    """Get the current user, also asking the auth server whether the session
+    is still valid. Use on revocation-sensitive routes only."""
+    current_user = await get_current_user(credentials, token_verifier)
+    try:
+        # Remote round trip to Supabase Auth
+        user = await fetch_auth_user(supabase, credentials.credentials)
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        logger.warning("Auth error: %s", e)
+        raise HTTPException(401, "Invalid authentication token")
+    if not user or not user.user or user.user.id != current_user.id:
+        raise HTTPException(401, "Invalid authentication token")
+    return current_user
+
+def etag(request: Request, version: str) -> str:
+    """Strong ETag for a response determined by the URL and a version tag"""
+    key = f"{request.url.path}?{request.url.query}#{version}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+
+def cache_headers(tag: str) -> Dict[str, str]:
+    """Let clients keep the response but revalidate it on every use"""
+    return {"ETag": tag, "Cache-Control": "private, no-cache"}
+
+def not_modified(request: Request, tag: str) -> Optional[Response]:
+    """A 304 response if If-None-Match already names this ETag, else None"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    # GET uses weak comparison, so a W/ prefix still matches
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    if "*" in candidates or tag in candidates:
+        return Response(status_code=304, headers=cache_headers(tag))
+    return None
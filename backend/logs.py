@@ -0,0 +1,156 @@
+from typing import Optional, Dict, Any, Tuple
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import copy
+import datetime
+import json
+import logging
+import os
+import queue
+import sys
+import time
+import tracing
+
+# Attributes every LogRecord has; anything else was passed with extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime"
+}
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class ContextFilter(logging.Filter):
+    """Attach the current request's context to a record.
+
+    Runs in the caller before the record is queued, since the listener
+    thread can't see the request's context variables.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = tracing.current_trace()
+        if trace is not None:
+            record.request_id = trace.request_id
+            record.user_id = trace.user_id
+            record.route = trace.route
+            db_calls, db_seconds = trace.db_totals()
+            record.db_calls = db_calls
+            record.db_ms = round(db_seconds * 1000, 2)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Let repeated warnings and errors through at a reduced rate.
+
+    Records are grouped by logger and message template. Within each window the
+    first ``burst`` records of a group pass, then one in every ``every``. The
+    next record that passes reports how many were suppressed before it.
+    """
+
+    def __init__(
+        self,
+        level: int = logging.WARNING,
+        burst: int = 10,
+        every: int = 100,
+        window: float = 60.0,
+        max_keys: int = 1000
+    ):
+        super().__init__()
+        self.level = level
+        self.burst = burst
+        self.every = every
+        self.window = window
+        self.max_keys = max_keys
+        # key -> [window start, records seen, records suppressed]
+        self._groups: Dict[Tuple[str, Any], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+
+        now = time.monotonic()
+        key = (record.name, record.msg)
+        group = self._groups.get(key)
+        if group is None or now - group[0] > self.window:
+            suppressed = group[2] if group else 0
+            if len(self._groups) >= self.max_keys:
+                self._groups.clear()
+            group = self._groups[key] = [now, 0, suppressed]
+
+        group[1] += 1
+        if group[1] <= self.burst or group[1] % self.every == 0:
+            if group[2]:
+                record.suppressed = group[2]
+                group[2] = 0
+            return True
+        group[2] += 1
+        return False
+
+class _QueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback here, but leave formatting to the
+        # listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging() -> None:
+    """Send all logs through a bounded queue to a background writer thread.
+
+    LOG_LEVEL sets the level (default INFO) and LOG_FORMAT=text switches from
+    JSON lines to plain text for local development.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        stream.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    handler = _QueueHandler(queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -1,22 +1,29 @@
 # backend/main.py
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from admission import AdmissionMiddleware
+from compression import CompressionMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from contextlib import asynccontextmanager
+from config import get_settings, create_supabase_client
+from logs import setup_logging
+from metrics import MetricsMiddleware, registry
+from redirects import HTTPSRedirectMiddleware
+from resilience import ServiceUnavailableError
+from scheduler import due_dates
+from tracing import TracingMiddleware
+from models.database import Database
+from models.points import PointsLedger
+from routers import auth, events, points, stats, tasks
+from security import TokenVerifier
+import asyncio
 import os
 import datetime
 import logging
-import sys
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
-logger = logging.getLogger(__name__)
+import math
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
 # Set allowed origins to only the frontend domains.
 origins = [
@@ -24,40 +31,107 @@ origins = [
     "http://localhost:5173"        # local development
 ]
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# HTTPS enforcement middleware using x-forwarded-proto header.
-@app.middleware("http")
-async def https_redirect(request: Request, call_next):
-    # In production, rely on the x-forwarded-proto header provided by Railway
-    # (or your reverse proxy) instead of request.url.scheme.
-    forwarded_proto = request.headers.get("x-forwarded-proto", request.url.scheme)
-    if os.environ.get("ENVIRONMENT") == "production" and forwarded_proto != "https":
-        url = str(request.url)
-        https_url = url.replace("http://", "https://", 1)
-        return RedirectResponse(https_url, status_code=301)
-    return await call_next(request)
-
-# Include your routers
-from routers import auth, tasks
-app.include_router(auth.router)
-app.include_router(tasks.router)
-
-@app.get("/health")
-async def health_check():
-    return {
-        "status": "healthy",
-        "timestamp": datetime.datetime.utcnow().isoformat(),
-        "environment": os.environ.get("ENVIRONMENT", "unknown"),
-        "allowed_origins": origins
-    }
-
-@app.get("/")
-async def root():
-    return {"status": "online"}
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the shared clients once, warm them up and close them on shutdown"""
+    settings = get_settings()
+    app.state.supabase = create_supabase_client(settings)
+    app.state.token_verifier = TokenVerifier(
+        jwt_secret=settings.jwt_secret,
+        jwks_url=settings.jwks_url,
+        audience=settings.jwt_audience,
+        cache_size=settings.token_cache_size
+    )
+    
+    database = Database.configure(app.state.supabase, settings)
+    await database.warm()
+
+    background = []
+    if settings.points_compact_interval > 0:
+        background.append(asyncio.create_task(
+            PointsLedger.compact_periodically(settings.points_compact_interval)
+        ))
+    if due_dates.window > 0:
+        background.append(asyncio.create_task(due_dates.run()))
+    
+    yield
+    
+    for task in background:
+        task.cancel()
+    # Let a task cancelled mid-call unwind before its backend is closed
+    await asyncio.gather(*background, return_exceptions=True)
+    await database.close()
+
+def create_app() -> FastAPI:
+    """Build the application; clients are created when it starts, not on import"""
+    setup_logging()
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+    # Inside CORS so rejected requests still carry CORS headers
+    app.add_middleware(AdmissionMiddleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+
+    # HTTPS enforcement using the x-forwarded-proto header
+    app.add_middleware(HTTPSRedirectMiddleware)
+
+    app.add_middleware(CompressionMiddleware)
+
+    # Added last so they wrap every other middleware
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.exception_handler(ServiceUnavailableError)
+    async def service_unavailable(request: Request, exc: ServiceUnavailableError):
+        """Tell clients to back off while Supabase is unavailable"""
+        logger.warning("%s %s: %s", request.method, request.url.path, exc)
+        return JSONResponse(
+            {"detail": f"The {exc.service} service is temporarily unavailable"},
+            status_code=503,
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+        )
+
+    # Include your routers
+    app.include_router(auth.router)
+    app.include_router(tasks.router)
+    app.include_router(events.router)
+    app.include_router(points.router)
+    app.include_router(stats.router)
+
+    # Read once rather than on every request
+    environment = os.environ.get("ENVIRONMENT", "unknown")
+    metrics_token = os.environ.get("METRICS_TOKEN")
+
+    @app.get("/health")
+    async def health_check():
+        return {
+            "status": "healthy",
+            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "environment": environment,
+            "allowed_origins": origins
+        }
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(authorization: str = Header(None)):
+        """Prometheus metrics, optionally protected by METRICS_TOKEN"""
+        if metrics_token and authorization != f"Bearer {metrics_token}":
+            raise HTTPException(401, "Invalid metrics token")
+        return PlainTextResponse(
+            registry.render(),
+            media_type="text/plain; version=0.0.4"
+        )
+
+    @app.get("/")
+    async def root():
+        return {"status": "online"}
+
+    return app
+
+app = create_app()
@@ -0,0 +1,270 @@
+from typing import Dict, List, Tuple, Sequence, Iterable
+from bisect import bisect_left
+import time
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Base class for labelled metrics kept in memory and rendered on scrape.
+
+    Metrics are only updated from the event loop thread, so no locking is
+    needed and recording a value is a dict lookup plus an addition.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def _samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def _samples(self) -> Iterable[str]:
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {count}"
+
+class Registry:
+    """Collection of metrics rendered together in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status code",
+    ["method", "route", "status"]
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template",
+    ["method", "route"]
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served"
+))
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total",
+    "Database calls by table, operation and outcome",
+    ["table", "operation", "outcome"]
+))
+DB_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Database call latency by table and operation",
+    ["table", "operation"]
+))
+AUTH_LATENCY = registry.register(Histogram(
+    "auth_verify_duration_seconds",
+    "Access token verification time by outcome",
+    ["outcome"]
+))
+
+EVENT_CONNECTIONS = registry.register(Gauge(
+    "event_stream_connections",
+    "Open server-sent event connections"
+))
+EVENTS_PUBLISHED = registry.register(Counter(
+    "events_published_total",
+    "Task and pairing events published by type",
+    ["event"]
+))
+EVENT_OVERFLOWS = registry.register(Counter(
+    "event_stream_overflows_total",
+    "Event connections closed because the client fell too far behind"
+))
+
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total",
+    "Requests shed before reaching the routers, by reason",
+    ["reason"]
+))
+ADMISSION_QUEUED = registry.register(Gauge(
+    "admission_queued_requests",
+    "Requests waiting for an in-flight slot"
+))
+
+COMPRESSION_INPUT = registry.register(Counter(
+    "response_compression_input_bytes_total",
+    "Response bytes before compression by encoding",
+    ["encoding"]
+))
+COMPRESSION_OUTPUT = registry.register(Counter(
+    "response_compression_output_bytes_total",
+    "Response bytes after compression by encoding",
+    ["encoding"]
+))
+COMPRESSION_CPU = registry.register(Histogram(
+    "response_compression_cpu_seconds",
+    "CPU time spent compressing one body or chunk, by encoding",
+    ["encoding"],
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+))
+
+UPSTREAM_RETRIES = registry.register(Counter(
+    "upstream_retries_total",
+    "Calls to Supabase retried after a transient failure, by service and operation",
+    ["service", "operation"]
+))
+UPSTREAM_HEDGES = registry.register(Counter(
+    "upstream_hedged_calls_total",
+    "Reads that sent a second, hedged request, by service and which one won",
+    ["service", "winner"]
+))
+UPSTREAM_FAILURES = registry.register(Counter(
+    "upstream_unavailable_total",
+    "Calls failed as unavailable, by service and reason",
+    ["service", "reason"]
+))
+CIRCUIT_STATE = registry.register(Gauge(
+    "circuit_breaker_open",
+    "1 while a service's circuit breaker is open or half-open, else 0",
+    ["service"]
+))
+
+SCHEDULED_DUE_DATES = registry.register(Gauge(
+    "scheduled_due_dates",
+    "Active tasks whose due date is waiting in the in-process scheduler"
+))
+TASKS_OVERDUE = registry.register(Counter(
+    "tasks_marked_overdue_total",
+    "Tasks marked overdue by the due date scheduler"
+))
+
+def record_query(table: str, operation: str, outcome: str, duration: float) -> None:
+    DB_QUERIES.inc(table, operation, outcome)
+    DB_LATENCY.observe(duration, table, operation)
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts, latency and in-flight requests.
+
+    Requests are labelled with the route template (e.g. /tasks/{task_id}/complete)
+    rather than the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(scope["method"], template, str(status))
+            HTTP_LATENCY.observe(duration, scope["method"], template)
@@ -0,0 +1,195 @@
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Union, TYPE_CHECKING
+import asyncio
+import httpx
+from models.query import Filters, Order, select_params, to_postgrest_params
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# A single row, or a list of rows inserted in one statement
+Rows = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+def _add_params(query, params: List[Tuple[str, str]]):
+    """Append compiled PostgREST parameters to a supabase-py request builder"""
+    for key, value in params:
+        query.params = query.params.add(key, value)
+    return query
+
+class SupabaseBackend:
+    """Storage backend using the synchronous supabase-py client.
+
+    Requests run in worker threads so the call policy's deadlines can fire;
+    a request that times out keeps its thread until the client gives up.
+    The sync client shares one connection, so this is only kept as the
+    default for compatibility.
+    """
+
+    def __init__(self, client: "Client"):
+        self.client = client
+
+    async def warm(self, table: str) -> None:
+        # The sync client has one connection in use at a time; open it now
+        await asyncio.to_thread(self.client.table(table).select("id").limit(0).execute)
+
+    async def select(
+        self,
+        table: str,
+        filters: Filters,
+        columns: Optional[Iterable[str]] = None,
+        order: Optional[Iterable[Order]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        query = self.client.table(table).select("*")
+        query.params = httpx.QueryParams(select_params(filters, columns, order, limit))
+        return (await asyncio.to_thread(query.execute)).data or []
+
+    async def insert(self, table: str, data: Rows) -> List[Dict[str, Any]]:
+        query = self.client.table(table).insert(data)
+        return (await asyncio.to_thread(query.execute)).data or []
+
+    async def upsert(self, table: str, data: Rows, on_conflict: str) -> List[Dict[str, Any]]:
+        query = self.client.table(table).upsert(data, on_conflict=on_conflict)
+        return (await asyncio.to_thread(query.execute)).data or []
+
+    async def update(
+        self,
+        table: str,
+        filters: Filters,
+        data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        query = _add_params(self.client.table(table).update(data), to_postgrest_params(filters))
+        return (await asyncio.to_thread(query.execute)).data or []
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        # Supabase's delete needs from_() and the filters chained after delete()
+        query = _add_params(self.client.from_(table).delete(), to_postgrest_params(filters))
+        return (await asyncio.to_thread(query.execute)).data or []
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        query = self.client.rpc(function, params)
+        return (await asyncio.to_thread(query.execute)).data
+
+    async def close(self) -> None:
+        pass
+
+class AsyncPostgrestBackend:
+    """Storage backend talking to PostgREST over a pooled httpx.AsyncClient.
+
+    Requests are truly awaited, and connections are kept alive (over HTTP/2
+    when available) so concurrent queries share a small pool of sockets
+    instead of blocking the event loop one at a time.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        pool_size: int = 20,
+        keepalive: int = 10,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        http2: bool = True,
+        warm_connections: int = 2
+    ):
+        self._base_url = f"{url.rstrip('/')}/rest/v1"
+        self._headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        self._limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._http2 = http2
+        self._warm_connections = min(warm_connections, pool_size)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool is bound to the running event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self._headers,
+                limits=self._limits,
+                timeout=self._timeout,
+                http2=self._http2
+            )
+        return self._client
+
+    async def _request(
+        self,
+        method: str,
+        table: str,
+        params: List[Tuple[str, str]],
+        json: Any = None,
+        prefer: str = "return=representation"
+    ) -> List[Dict[str, Any]]:
+        client = self._get_client()
+        headers = {"Prefer": prefer} if method != "GET" else None
+        response = await client.request(
+            method,
+            f"/{table}",
+            params=params,
+            json=json,
+            headers=headers
+        )
+        response.raise_for_status()
+        if not response.content:
+            return []
+        return response.json()
+
+    async def warm(self, table: str) -> None:
+        # Concurrent no-op reads make the pool open its connections up front
+        params = [("select", "id"), ("limit", "0")]
+        await asyncio.gather(*(
+            self._request("GET", table, params) for _ in range(self._warm_connections)
+        ))
+
+    async def select(
+        self,
+        table: str,
+        filters: Filters,
+        columns: Optional[Iterable[str]] = None,
+        order: Optional[Iterable[Order]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        params = select_params(filters, columns, order, limit)
+        return await self._request("GET", table, params)
+
+    async def insert(self, table: str, data: Rows) -> List[Dict[str, Any]]:
+        return await self._request("POST", table, [], json=data)
+
+    async def upsert(self, table: str, data: Rows, on_conflict: str) -> List[Dict[str, Any]]:
+        return await self._request(
+            "POST",
+            table,
+            [("on_conflict", on_conflict)],
+            json=data,
+            prefer="return=representation,resolution=merge-duplicates"
+        )
+
+    async def update(
+        self,
+        table: str,
+        filters: Filters,
+        data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        return await self._request("PATCH", table, to_postgrest_params(filters), json=data)
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        return await self._request("DELETE", table, to_postgrest_params(filters))
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        response = await self._get_client().post(f"/rpc/{function}", json=params)
+        response.raise_for_status()
+        if not response.content:
+            return None
+        return response.json()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
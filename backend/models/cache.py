@@ -0,0 +1,67 @@
+from typing import Any, Dict, Hashable
+from collections import OrderedDict
+import os
+import time
+
+MISSING = object()
+
+class TTLCache:
+    """In-process LRU cache whose entries also expire after a TTL.
+
+    Holds at most ``max_size`` entries, evicting the least recently used one
+    when full, and counts hits and misses for monitoring.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return a cached value, or ``default`` if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full"""
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+# Profile rows by user id
+profile_cache = TTLCache(
+    max_size=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", "60"))
+)
+
+# Approved partner id by user id
+partner_cache = TTLCache(
+    max_size=int(os.getenv("PARTNER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PARTNER_CACHE_TTL", "300"))
+)
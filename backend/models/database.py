@@ -1,25 +1,44 @@
-from typing import Optional, List, Dict, Any, Callable
-from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any, Callable, Sequence, TYPE_CHECKING
+import logging
+import time
+from config import Settings, get_settings, create_supabase_client
+from models.backends import SupabaseBackend, AsyncPostgrestBackend
+from models.sqlite import SQLiteBackend
+from models.query import Filters, Order
+from metrics import record_query
+from resilience import ServiceUnavailableError, database_calls
+import tracing
 
-load_dotenv()
+if TYPE_CHECKING:
+    from supabase import Client
 
-# Get environment variables with error handling
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+def create_backend(client: Optional["Client"], settings: Settings):
+    """Build the storage backend selected by DATABASE_BACKEND.
 
-if not supabase_url or not supabase_key:
-    raise RuntimeError(
-        "Missing required environment variables. "
-        "Please ensure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set."
-    )
+    "supabase" keeps the sync client, "async" uses the pooled PostgREST backend
+    and "sqlite" stores everything in a local SQLite file (SQLITE_PATH).
+    """
+    database_backend = settings.database_backend
+    if database_backend == "supabase":
+        return SupabaseBackend(client)
+    if database_backend == "async":
+        return AsyncPostgrestBackend(
+            settings.supabase_url,
+            settings.supabase_key,
+            pool_size=settings.db_pool_size,
+            keepalive=settings.db_pool_keepalive,
+            timeout=settings.db_timeout,
+            connect_timeout=settings.db_connect_timeout,
+            http2=settings.db_http2,
+            warm_connections=settings.db_pool_warm
+        )
+    if database_backend == "sqlite":
+        return SQLiteBackend(settings.sqlite_path)
+    raise RuntimeError(f"Unknown DATABASE_BACKEND: {database_backend}")
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize Supabase client: {str(e)}")
+logger = logging.getLogger(__name__)
+
+FILTERED_OPERATIONS = {"select", "update", "delete"}
 
 class Database:
     _instance: Optional['Database'] = None
@@ -27,61 +46,125 @@ class Database:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
+            cls._instance._client = None
+            cls._instance._backend = None
         return cls._instance
 
+    @classmethod
+    def configure(cls, client: Optional["Client"], settings: Settings) -> 'Database':
+        """Use the app's shared client; called once from the app lifespan"""
+        db = cls()
+        db._client = client
+        db._backend = create_backend(client, settings)
+        return db
+
     @property
-    def client(self):
-        return supabase
+    def client(self) -> Optional["Client"]:
+        return self._ensure_configured()._client
+
+    @property
+    def backend(self):
+        return self._ensure_configured()._backend
+
+    def _ensure_configured(self) -> 'Database':
+        # Outside the app (scripts, shells) build a client on first use
+        if self._backend is None:
+            settings = get_settings()
+            self.configure(create_supabase_client(settings), settings)
+        return self
+
+    async def warm(self) -> None:
+        """Open backend connections before the first request needs them"""
+        try:
+            await self.backend.warm("profiles")
+        except Exception as e:
+            logger.warning("Error warming database connections: %s", e)
+
+    async def close(self) -> None:
+        """Release the backend's connection pool"""
+        if self._backend is not None:
+            await self._backend.close()
+
+    async def _call(self, operation: str, table: str, *args) -> Any:
+        """Run one backend operation, recording its latency and outcome.
+
+        Reads are retried and hedged under the database call policy; when the
+        database is unavailable ServiceUnavailableError is raised, and the
+        methods below let it through instead of returning an empty result.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        method = getattr(self.backend, operation)
+        try:
+            result = await database_calls.call(
+                operation,
+                lambda: method(table, *args),
+                idempotent=operation == "select"
+            )
+            outcome = "ok"
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            record_query(table, operation, outcome, duration)
+            # select, update and delete take the filters first
+            filters = args[0] if operation in FILTERED_OPERATIONS else None
+            tracing.record("db", table, operation, duration, filters)
 
     async def fetch_one(
         self, 
         table: str, 
-        filters: Dict[str, Any],
-        extra_checks: Optional[Callable[[Dict[str, Any]], bool]] = None
+        filters: Filters,
+        extra_checks: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[Sequence[Order]] = None
     ) -> Optional[Dict[str, Any]]:
-        """Fetch a single record from the database"""
+        """Fetch a single record from the database.
+
+        ``filters`` is either a dict of equality filters (list values mean IN)
+        or an expression from models.query, compiled into a server-side filter.
+        """
         try:
-            query = self.client.table(table).select("*")
-            for key, value in filters.items():
-                query = query.eq(key, value)
+            rows = await self._call("select", table, filters, columns, order, 1)
             
-            result = query.execute()
-            
-            if not result.data:
+            if not rows:
                 return None
                 
             # Apply extra validation if provided
-            if extra_checks and not extra_checks(result.data[0]):
+            if extra_checks and not extra_checks(rows[0]):
                 return None
                 
-            return result.data[0]
+            return rows[0]
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error fetching from {table}: {e}")
+            logger.error("Error fetching from %s: %s", table, e)
             return None
 
     async def fetch_many(
         self, 
         table: str, 
-        filters: Dict[str, Any],
-        extra_checks: Optional[Callable[[Dict[str, Any]], bool]] = None
+        filters: Filters,
+        extra_checks: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        columns: Optional[Sequence[str]] = None,
+        order: Optional[Sequence[Order]] = None,
+        limit: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Fetch multiple records from the database"""
+        """Fetch multiple records from the database, optionally projected,
+        sorted and limited on the server"""
         try:
-            query = self.client.table(table).select("*")
-            for key, value in filters.items():
-                query = query.eq(key, value)
-            
-            result = query.execute()
+            rows = await self._call("select", table, filters, columns, order, limit)
             
-            if not result.data:
+            if not rows:
                 return []
                 
             # Apply extra validation if provided
             if extra_checks:
-                return [r for r in result.data if extra_checks(r)]
-            return result.data
+                return [r for r in rows if extra_checks(r)]
+            return rows
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error fetching from {table}: {e}")
+            logger.error("Error fetching from %s: %s", table, e)
             return []
 
     async def insert(
@@ -91,46 +174,92 @@ class Database:
     ) -> Optional[str]:
         """Insert a record and return its ID"""
         try:
-            result = self.client.table(table).insert(data).execute()
-            if result.data:
-                return result.data[0]["id"]
+            rows = await self._call("insert", table, data)
+            if rows:
+                return rows[0]["id"]
             return None
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error inserting into {table}: {e}")
+            logger.error("Error inserting into %s: %s", table, e)
             return None
 
+    async def insert_many(
+        self, 
+        table: str, 
+        rows: List[Dict[str, Any]]
+    ) -> Optional[List[str]]:
+        """Insert records in a single multi-row statement and return their IDs"""
+        if not rows:
+            return []
+        try:
+            inserted = await self._call("insert", table, rows)
+            if len(inserted) != len(rows):
+                return None
+            return [row["id"] for row in inserted]
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error inserting into %s: %s", table, e)
+            return None
+
+    async def upsert(
+        self, 
+        table: str, 
+        data: Dict[str, Any],
+        on_conflict: str = "id"
+    ) -> bool:
+        """Insert a record, or update the given columns if it already exists"""
+        try:
+            rows = await self._call("upsert", table, data, on_conflict)
+            return bool(rows)
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error upserting into %s: %s", table, e)
+            return False
+
     async def update(
         self, 
         table: str, 
-        filters: Dict[str, Any], 
+        filters: Filters, 
         data: Dict[str, Any]
     ) -> bool:
         """Update records matching the filters"""
         try:
-            query = self.client.table(table)
-            for key, value in filters.items():
-                query = query.eq(key, value)
-            
-            result = query.update(data).execute()
-            return bool(result.data)
+            rows = await self._call("update", table, filters, data)
+            return bool(rows)
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error updating {table}: {e}")
+            logger.error("Error updating %s: %s", table, e)
             return False
 
     async def delete(
         self, 
         table: str, 
-        filters: Dict[str, Any]
+        filters: Filters
     ) -> bool:
         """Delete records matching the filters"""
         try:
-            # Build the delete query with filters
-            delete_query = self.client.from_(table).delete()
-            for key, value in filters.items():
-                delete_query = delete_query.eq(key, value)
-            
-            result = delete_query.execute()
-            return bool(result.data)
+            rows = await self._call("delete", table, filters)
+            return bool(rows)
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error deleting from {table}: {e}")
-            return False 
\ No newline at end of file
+            logger.error("Error deleting from %s: %s", table, e)
+            return False 
+
+    async def rpc(
+        self, 
+        function: str, 
+        params: Dict[str, Any]
+    ) -> Any:
+        """Call a Postgres function and return its result"""
+        try:
+            return await self._call("rpc", function, params)
+        except ServiceUnavailableError:
+            raise
+        except Exception as e:
+            logger.error("Error calling %s: %s", function, e)
+            return None
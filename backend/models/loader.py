@@ -0,0 +1,58 @@
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Iterable
+import asyncio
+
+class BatchLoader:
+    """Identity map that coalesces lookups by id into batched queries.
+
+    Every id is fetched at most once per loader, and all ids requested in the
+    same event loop tick are collected into a single call to ``batch_fn``.
+    Callers asking for the same id get the same shared object back.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[str]], Awaitable[Dict[str, Any]]]):
+        self._batch_fn = batch_fn
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._queue: List[str] = []
+
+    def prime(self, key: str, value: Any) -> None:
+        """Seed the map with an object that has already been loaded"""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._futures[key] = future
+
+    def load(self, key: str) -> Awaitable[Optional[Any]]:
+        """Load one object, batching it with other loads in this tick"""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            if not self._queue:
+                loop.call_soon(self._dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[str]) -> Dict[str, Optional[Any]]:
+        """Load several objects with at most one batched query"""
+        unique = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in unique))
+        return dict(zip(unique, values))
+
+    def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        asyncio.ensure_future(self._run_batch(keys))
+
+    async def _run_batch(self, keys: List[str]) -> None:
+        try:
+            found = await self._batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Let a later request retry instead of caching the failure
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(found.get(key))
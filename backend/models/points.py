@@ -0,0 +1,101 @@
+from typing import Optional, List, Dict, Any, Tuple
+from models.database import Database
+from models.query import eq, in_, lt, and_, desc, encode_cursor, decode_cursor
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns of a ledger entry, which is also its public shape
+LEDGER_COLUMNS = ["id", "task_id", "delta", "created_at"]
+
+class PointsLedger:
+    """The append-only points_ledger and the balances kept from it.
+
+    Awards only ever append a row; profiles.points is a checkpoint that
+    compact() folds the ledger into, and the profile_balances view adds the
+    rows since the last compaction. Reads of a balance therefore sum a short
+    tail rather than the whole history.
+    """
+
+    @staticmethod
+    async def award(user_id: str, delta: int, task_id: Optional[str] = None) -> Optional[int]:
+        """Append an award and return the user's new balance, or None on failure"""
+        return await Database().rpc("award_points", {
+            "p_user_id": user_id,
+            "p_delta": delta,
+            "p_task_id": task_id
+        })
+
+    @staticmethod
+    async def balances(user_ids: List[str]) -> Dict[str, int]:
+        """Current balances by user id, read from profile_balances"""
+        rows = await Database().fetch_many(
+            "profile_balances",
+            in_("id", user_ids),
+            columns=["id", "points"]
+        )
+        return {row["id"]: row["points"] for row in rows}
+
+    @staticmethod
+    async def get_history(
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of a user's ledger entries, newest first, and the
+        cursor for the next page.
+
+        Pages are keyset-paginated on the ledger id, which the
+        (user_id, id) index serves directly. Raises ValueError for a
+        malformed cursor.
+        """
+        filters = eq("user_id", user_id)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1 or not str(values[0]).isdigit():
+                raise ValueError("Invalid cursor")
+            filters = and_(filters, lt("id", int(values[0])))
+
+        # Fetch one extra row to learn whether another page follows
+        entries = await Database().fetch_many(
+            "points_ledger",
+            filters,
+            columns=LEDGER_COLUMNS,
+            order=[desc("id")],
+            limit=limit + 1
+        )
+
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            next_cursor = encode_cursor([entries[-1]["id"]])
+
+        return entries, next_cursor
+
+    @staticmethod
+    async def compact(min_interval: float = 0) -> Optional[int]:
+        """Fold new ledger rows into profiles.points; returns the balances updated.
+
+        Does nothing if any caller compacted within the last ``min_interval``
+        seconds or is compacting now.
+        """
+        return await Database().rpc("compact_points_ledger", {"p_min_interval": min_interval})
+
+    @staticmethod
+    async def compact_periodically(interval: float) -> None:
+        """Compact every ``interval`` seconds until cancelled.
+
+        Safe to run on every replica: the database lets one compaction
+        through per interval across all of them, and the others return
+        without locking the ledger. The slack keeps a replica's own timer
+        from skipping its turn.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                updated = await PointsLedger.compact(min_interval=interval * 0.9)
+                if updated:
+                    logger.info("Compacted points ledger into %d balances", updated)
+            except Exception as e:
+                logger.warning("Error compacting points ledger: %s", e)
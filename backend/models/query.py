@@ -0,0 +1,197 @@
+from typing import List, Dict, Any, Union, Iterable, Optional, Tuple
+from datetime import datetime, date
+import base64
+import json
+
+# Characters that must be quoted inside PostgREST in-lists and logic trees
+RESERVED_CHARS = set(',.:()" ')
+
+class Expression:
+    """Base class for filters that are compiled into server-side queries"""
+
+class Condition(Expression):
+    """A single column comparison, e.g. status = 'active'"""
+
+    def __init__(self, column: str, operator: str, value: Any):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    def __repr__(self) -> str:
+        return f"Condition({self.column!r}, {self.operator!r}, {self.value!r})"
+
+class Group(Expression):
+    """Conditions combined with AND or OR"""
+
+    def __init__(self, operator: str, items: Iterable[Expression]):
+        self.operator = operator
+        self.items = list(items)
+
+    def __repr__(self) -> str:
+        return f"Group({self.operator!r}, {self.items!r})"
+
+class Order:
+    """A sort key for fetch_many"""
+
+    def __init__(self, column: str, descending: bool = False, nulls_last: bool = True):
+        self.column = column
+        self.descending = descending
+        self.nulls_last = nulls_last
+
+def eq(column: str, value: Any) -> Condition:
+    return Condition(column, "eq", value)
+
+def neq(column: str, value: Any) -> Condition:
+    return Condition(column, "neq", value)
+
+def gt(column: str, value: Any) -> Condition:
+    return Condition(column, "gt", value)
+
+def gte(column: str, value: Any) -> Condition:
+    return Condition(column, "gte", value)
+
+def lt(column: str, value: Any) -> Condition:
+    return Condition(column, "lt", value)
+
+def lte(column: str, value: Any) -> Condition:
+    return Condition(column, "lte", value)
+
+def in_(column: str, values: Iterable[Any]) -> Condition:
+    return Condition(column, "in", list(values))
+
+def is_null(column: str) -> Condition:
+    return Condition(column, "is", None)
+
+def and_(*items: Expression) -> Group:
+    return Group("and", items)
+
+def or_(*items: Expression) -> Group:
+    return Group("or", items)
+
+def asc(column: str, nulls_last: bool = True) -> Order:
+    return Order(column, descending=False, nulls_last=nulls_last)
+
+def desc(column: str, nulls_last: bool = True) -> Order:
+    return Order(column, descending=True, nulls_last=nulls_last)
+
+Filters = Union[Dict[str, Any], Expression]
+
+def as_expression(filters: Filters) -> Group:
+    """Normalize a filters dict (equality, lists meaning IN) into an expression"""
+    if isinstance(filters, Group):
+        return filters
+    if isinstance(filters, Expression):
+        return and_(filters)
+    return and_(*(
+        in_(key, value) if isinstance(value, (list, tuple, set)) else eq(key, value)
+        for key, value in filters.items()
+    ))
+
+def describe(filters: Filters) -> str:
+    """Shape of a filter without its values, e.g. and(id.eq,or(creator_id.eq,assignee_id.eq))"""
+    def shape(expression: Expression) -> str:
+        if isinstance(expression, Condition):
+            if expression.operator == "in":
+                return f"{expression.column}.in[{len(expression.value)}]"
+            return f"{expression.column}.{expression.operator}"
+        return f"{expression.operator}({','.join(shape(item) for item in expression.items)})"
+    return shape(as_expression(filters))
+
+def format_value(value: Any) -> str:
+    """Render a Python value the way PostgREST expects it in a filter"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _quote(value: Any) -> str:
+    text = format_value(value)
+    if any(c in RESERVED_CHARS for c in text):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+def _operand(condition: Condition, nested: bool) -> str:
+    if condition.operator == "in":
+        return f"in.({','.join(_quote(v) for v in condition.value)})"
+    value = _quote(condition.value) if nested else format_value(condition.value)
+    return f"{condition.operator}.{value}"
+
+def _tree(expression: Expression) -> str:
+    # Logic trees use column.op.value items inside or(...)/and(...)
+    if isinstance(expression, Condition):
+        return f"{expression.column}.{_operand(expression, nested=True)}"
+    inner = ",".join(_tree(item) for item in expression.items)
+    return f"{expression.operator}({inner})"
+
+def _flatten_and(expression: Group) -> List[Expression]:
+    items = []
+    for item in expression.items:
+        if isinstance(item, Group) and item.operator == "and":
+            items.extend(_flatten_and(item))
+        else:
+            items.append(item)
+    return items
+
+def to_postgrest_params(filters: Filters) -> List[Tuple[str, str]]:
+    """Compile filters into PostgREST query string parameters"""
+    expression = as_expression(filters)
+    if expression.operator == "or":
+        return [("or", f"({','.join(_tree(item) for item in expression.items)})")]
+
+    params = []
+    or_groups = []
+    for item in _flatten_and(expression):
+        if isinstance(item, Condition):
+            params.append((item.column, _operand(item, nested=False)))
+        else:
+            or_groups.append(item)
+
+    # Only one top-level or= is allowed, so several are wrapped in and=(...)
+    if len(or_groups) == 1:
+        params.append(("or", f"({','.join(_tree(sub) for sub in or_groups[0].items)})"))
+    elif or_groups:
+        params.append(("and", f"({','.join(_tree(group) for group in or_groups)})"))
+    return params
+
+def order_param(order: Iterable[Order]) -> Tuple[str, str]:
+    """Compile sort keys into a PostgREST order parameter"""
+    keys = []
+    for o in order:
+        direction = "desc" if o.descending else "asc"
+        nulls = "nullslast" if o.nulls_last else "nullsfirst"
+        keys.append(f"{o.column}.{direction}.{nulls}")
+    return ("order", ",".join(keys))
+
+def select_params(
+    filters: Filters,
+    columns: Optional[Iterable[str]] = None,
+    order: Optional[Iterable[Order]] = None,
+    limit: Optional[int] = None
+) -> List[Tuple[str, str]]:
+    """Compile a full read query into PostgREST parameters"""
+    params = [("select", ",".join(columns) if columns else "*")]
+    params.extend(to_postgrest_params(filters))
+    if order:
+        params.append(order_param(order))
+    if limit is not None:
+        params.append(("limit", str(limit)))
+    return params
+
+def encode_cursor(values: List[Any]) -> str:
+    """Pack the sort key of the last row of a page into an opaque token"""
+    raw = json.dumps([format_value(v) if v is not None else None for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Unpack a token from encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
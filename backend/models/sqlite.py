@@ -0,0 +1,676 @@
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timezone
+import asyncio
+import re
+import sqlite3
+import uuid
+from models.backends import Rows
+from models.query import Filters, Condition, Expression, Order, as_expression
+
+# Mirrors the Supabase tables used by the backend. auth.users doesn't exist
+# here, so profiles.id is the root of the foreign keys.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    pair_code TEXT,
+    points INTEGER DEFAULT 0,
+    paired INTEGER DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS profiles_pair_code_key ON profiles (pair_code);
+
+CREATE TABLE IF NOT EXISTS pairings (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES profiles (id) ON DELETE CASCADE,
+    partner_id TEXT REFERENCES profiles (id) ON DELETE CASCADE,
+    status TEXT DEFAULT 'approved',
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS pairings_user_id_idx ON pairings (user_id);
+CREATE INDEX IF NOT EXISTS pairings_partner_id_idx ON pairings (partner_id);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    creator_id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    assignee_id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'active',
+    validation_required INTEGER NOT NULL DEFAULT 0,
+    random_payout INTEGER NOT NULL DEFAULT 0,
+    min_points INTEGER,
+    max_points INTEGER,
+    due_date TEXT,
+    completed_at TEXT,
+    overdue_at TEXT,
+    created_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    updated_at TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS tasks_status_creator_id_idx ON tasks (status, creator_id);
+CREATE INDEX IF NOT EXISTS tasks_status_assignee_id_idx ON tasks (status, assignee_id);
+CREATE INDEX IF NOT EXISTS tasks_pending_due_date_idx ON tasks (due_date)
+    WHERE status = 'active' AND overdue_at IS NULL AND due_date IS NOT NULL;
+
+-- AUTOINCREMENT so ids are never reused and the checkpoint stays valid
+CREATE TABLE IF NOT EXISTS points_ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    task_id TEXT,
+    delta INTEGER NOT NULL,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS points_ledger_user_id_id_idx ON points_ledger (user_id, id);
+CREATE TRIGGER IF NOT EXISTS points_ledger_append_only
+    BEFORE UPDATE ON points_ledger
+BEGIN
+    SELECT RAISE(ABORT, 'points_ledger is append-only');
+END;
+
+CREATE TABLE IF NOT EXISTS points_checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    ledger_id INTEGER NOT NULL DEFAULT 0,
+    compacted_at TEXT
+);
+INSERT OR IGNORE INTO points_checkpoint (id) VALUES (1);
+
+CREATE VIEW IF NOT EXISTS profile_balances AS
+SELECT p.id, p.email, p.pair_code, p.paired, p.created_at,
+       COALESCE(p.points, 0) + COALESCE((
+           SELECT SUM(l.delta)
+             FROM points_ledger l
+            WHERE l.user_id = p.id
+              AND l.id > (SELECT ledger_id FROM points_checkpoint)
+       ), 0) AS points
+  FROM profiles p;
+"""
+
+# Monday of the UTC week containing a timestamp
+_WEEK = "date({}, 'weekday 0', '-6 days')"
+
+def _task_stats(row: str, sign: int) -> str:
+    """Trigger statements adding (sign 1) or removing (sign -1) the task in
+    ``row`` (NEW or OLD) from the aggregates"""
+    return f"""
+    INSERT INTO user_task_stats (user_id, role, status, tasks, points)
+    VALUES ({row}.creator_id, 'created', {row}.status, {sign}, {sign} * {row}.points),
+           ({row}.assignee_id, 'assigned', {row}.status, {sign}, {sign} * {row}.points)
+    ON CONFLICT (user_id, role, status) DO UPDATE
+       SET tasks = tasks + excluded.tasks, points = points + excluded.points;
+    INSERT INTO pair_task_stats (user_a, user_b, status, tasks, points)
+    VALUES (min({row}.creator_id, {row}.assignee_id), max({row}.creator_id, {row}.assignee_id),
+            {row}.status, {sign}, {sign} * {row}.points)
+    ON CONFLICT (user_a, user_b, status) DO UPDATE
+       SET tasks = tasks + excluded.tasks, points = points + excluded.points;
+    INSERT INTO user_weekly_stats (user_id, week, tasks_completed)
+    SELECT {row}.assignee_id, {_WEEK.format(f"{row}.completed_at")}, {sign}
+     WHERE {row}.status = 'completed' AND {row}.completed_at IS NOT NULL
+    ON CONFLICT (user_id, week) DO UPDATE
+       SET tasks_completed = tasks_completed + excluded.tasks_completed;"""
+
+# The aggregates behind /stats, maintained by triggers like the Supabase ones
+STATS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS user_task_stats (
+    user_id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tasks INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, role, status)
+);
+CREATE TABLE IF NOT EXISTS pair_task_stats (
+    user_a TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    user_b TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    tasks INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_a, user_b, status)
+);
+CREATE TABLE IF NOT EXISTS user_weekly_stats (
+    user_id TEXT NOT NULL REFERENCES profiles (id) ON DELETE CASCADE,
+    week TEXT NOT NULL,
+    tasks_completed INTEGER NOT NULL DEFAULT 0,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week)
+);
+CREATE TABLE IF NOT EXISTS user_streaks (
+    user_id TEXT PRIMARY KEY REFERENCES profiles (id) ON DELETE CASCADE,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_completed_on TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS tasks_stats_insert AFTER INSERT ON tasks
+BEGIN{_task_stats("NEW", 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_stats_delete AFTER DELETE ON tasks
+BEGIN{_task_stats("OLD", -1)}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_stats_update
+    AFTER UPDATE OF status, points, creator_id, assignee_id, completed_at ON tasks
+BEGIN{_task_stats("OLD", -1)}{_task_stats("NEW", 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_stats_streak AFTER UPDATE OF status ON tasks
+    WHEN NEW.status = 'completed' AND OLD.status <> 'completed' AND NEW.completed_at IS NOT NULL
+BEGIN
+    INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_completed_on)
+    VALUES (NEW.assignee_id, 1, 1, date(NEW.completed_at))
+    ON CONFLICT (user_id) DO UPDATE
+       SET current_streak = CASE
+               WHEN last_completed_on >= excluded.last_completed_on THEN current_streak
+               WHEN last_completed_on = date(excluded.last_completed_on, '-1 day') THEN current_streak + 1
+               ELSE 1
+           END,
+           longest_streak = max(longest_streak, CASE
+               WHEN last_completed_on >= excluded.last_completed_on THEN current_streak
+               WHEN last_completed_on = date(excluded.last_completed_on, '-1 day') THEN current_streak + 1
+               ELSE 1
+           END),
+           last_completed_on = max(last_completed_on, excluded.last_completed_on);
+END;
+CREATE TRIGGER IF NOT EXISTS points_ledger_stats AFTER INSERT ON points_ledger
+BEGIN
+    INSERT INTO user_weekly_stats (user_id, week, points_earned)
+    VALUES (NEW.user_id, {_WEEK.format("NEW.created_at")}, NEW.delta)
+    ON CONFLICT (user_id, week) DO UPDATE
+       SET points_earned = points_earned + excluded.points_earned;
+END;
+"""
+
+def _bump_versions(*user_ids: str) -> str:
+    """Trigger statement bumping the version of each user expression"""
+    values = ", ".join(f"({user_id}, 1)" for user_id in user_ids)
+    return f"""
+    INSERT INTO user_versions (user_id, version) VALUES {values}
+    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;"""
+
+# Per-user data versions behind the ETags, bumped like the Supabase ones.
+# SQLite has no statement-level triggers, so these run once per row.
+VERSIONS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS user_versions (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS tasks_versions_insert AFTER INSERT ON tasks
+BEGIN{_bump_versions("NEW.creator_id", "NEW.assignee_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_versions_update AFTER UPDATE ON tasks
+BEGIN{_bump_versions("NEW.creator_id", "NEW.assignee_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_versions_delete AFTER DELETE ON tasks
+BEGIN{_bump_versions("OLD.creator_id", "OLD.assignee_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS points_ledger_versions AFTER INSERT ON points_ledger
+BEGIN{_bump_versions("NEW.user_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS pairings_versions_insert AFTER INSERT ON pairings
+BEGIN{_bump_versions("NEW.user_id", "NEW.partner_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS pairings_versions_update AFTER UPDATE ON pairings
+BEGIN{_bump_versions("NEW.user_id", "NEW.partner_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS pairings_versions_delete AFTER DELETE ON pairings
+BEGIN{_bump_versions("OLD.user_id", "OLD.partner_id")}
+END;
+CREATE TRIGGER IF NOT EXISTS profiles_versions
+    AFTER UPDATE OF email, pair_code, paired ON profiles
+BEGIN{_bump_versions("NEW.id")}
+END;
+"""
+
+# SQLite has no boolean type; these columns are converted back on read
+BOOLEAN_COLUMNS = {"paired", "validation_required", "random_payout"}
+
+OPERATORS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+def _name(identifier: str) -> str:
+    # Column and table names are interpolated, so only allow plain identifiers
+    if not IDENTIFIER.match(identifier):
+        raise ValueError(f"Invalid identifier: {identifier!r}")
+    return identifier
+
+def _value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _where(expression: Expression, args: List[Any]) -> str:
+    """Compile a query expression into a WHERE clause, appending its arguments"""
+    if isinstance(expression, Condition):
+        column = _name(expression.column)
+        if expression.operator == "in":
+            if not expression.value:
+                return "0"
+            args.extend(_value(v) for v in expression.value)
+            return f"{column} IN ({','.join('?' * len(expression.value))})"
+        if expression.operator == "is":
+            if expression.value is None:
+                return f"{column} IS NULL"
+            args.append(_value(expression.value))
+            return f"{column} IS ?"
+        args.append(_value(expression.value))
+        return f"{column} {OPERATORS[expression.operator]} ?"
+    if not expression.items:
+        return "1" if expression.operator == "and" else "0"
+    joiner = " AND " if expression.operator == "and" else " OR "
+    return "(" + joiner.join(_where(item, args) for item in expression.items) + ")"
+
+def _order_by(order: Iterable[Order]) -> str:
+    keys = []
+    for o in order:
+        direction = "DESC" if o.descending else "ASC"
+        nulls = "NULLS LAST" if o.nulls_last else "NULLS FIRST"
+        keys.append(f"{_name(o.column)} {direction} {nulls}")
+    return ", ".join(keys)
+
+def _row(row: sqlite3.Row) -> Dict[str, Any]:
+    data = dict(row)
+    for column in BOOLEAN_COLUMNS.intersection(data):
+        if data[column] is not None:
+            data[column] = bool(data[column])
+    return data
+
+# RETURNING, UPDATE ... FROM and NULLS LAST
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+class SQLiteBackend:
+    """Storage backend on an embedded SQLite database.
+
+    The connection lives on a single worker thread, so queries never block
+    the event loop and writes are naturally serialized. The database runs in
+    WAL mode and the schema is created on first use. The database functions
+    called through rpc are implemented here in Python, each in a transaction.
+    """
+
+    def __init__(self, path: str = "toucan.db"):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"The SQLite backend needs SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} "
+                f"or newer, found {sqlite3.sqlite_version}"
+            )
+        self.path = path
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    def _call(self, fn: Callable, args: Tuple) -> Any:
+        # Runs on the worker thread
+        if self._conn is None:
+            self._conn = self._connect()
+        return fn(self._conn, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        # Add the tasks columns that databases created before them lack
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+        missing = [c for c in ("completed_at", "overdue_at") if columns and c not in columns]
+        for column in missing:
+            conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} TEXT")
+        conn.executescript(SCHEMA)
+        conn.executescript(STATS_SCHEMA)
+        conn.executescript(VERSIONS_SCHEMA)
+        # Stats kept before completed_at existed have no weeks or streaks
+        if "completed_at" in missing:
+            _transaction(conn, _rebuild_task_stats, {})
+        return conn
+
+    async def warm(self, table: str) -> None:
+        await self._run(lambda conn: None)
+
+    async def select(
+        self,
+        table: str,
+        filters: Filters,
+        columns: Optional[Iterable[str]] = None,
+        order: Optional[Iterable[Order]] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        args: List[Any] = []
+        select = ", ".join(_name(c) for c in columns) if columns else "*"
+        sql = f"SELECT {select} FROM {_name(table)} WHERE {_where(as_expression(filters), args)}"
+        if order:
+            sql += f" ORDER BY {_order_by(order)}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return await self._run(_fetch, sql, args)
+
+    async def insert(self, table: str, data: Rows) -> List[Dict[str, Any]]:
+        rows = data if isinstance(data, list) else [data]
+        return await self._run(_insert, table, rows, None)
+
+    async def upsert(self, table: str, data: Rows, on_conflict: str) -> List[Dict[str, Any]]:
+        rows = data if isinstance(data, list) else [data]
+        return await self._run(_insert, table, rows, on_conflict)
+
+    async def update(
+        self,
+        table: str,
+        filters: Filters,
+        data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        args = [_value(v) for v in data.values()]
+        assignments = ", ".join(f"{_name(c)} = ?" for c in data)
+        sql = (
+            f"UPDATE {_name(table)} SET {assignments} "
+            f"WHERE {_where(as_expression(filters), args)} RETURNING *"
+        )
+        return await self._run(_fetch, sql, args)
+
+    async def delete(self, table: str, filters: Filters) -> List[Dict[str, Any]]:
+        args: List[Any] = []
+        sql = f"DELETE FROM {_name(table)} WHERE {_where(as_expression(filters), args)} RETURNING *"
+        return await self._run(_fetch, sql, args)
+
+    async def rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        if function not in FUNCTIONS:
+            raise ValueError(f"Unknown function: {function}")
+        return await self._run(_transaction, FUNCTIONS[function], params)
+
+    async def close(self) -> None:
+        def close(conn: sqlite3.Connection) -> None:
+            conn.close()
+            self._conn = None
+        if self._conn is not None:
+            await self._run(close)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Everything below runs on the worker thread
+
+def _fetch(conn: sqlite3.Connection, sql: str, args: List[Any]) -> List[Dict[str, Any]]:
+    return [_row(row) for row in conn.execute(sql, args).fetchall()]
+
+def _insert(
+    conn: sqlite3.Connection,
+    table: str,
+    rows: List[Dict[str, Any]],
+    on_conflict: Optional[str]
+) -> List[Dict[str, Any]]:
+    inserted = []
+    conn.execute("BEGIN")
+    try:
+        for data in rows:
+            if on_conflict is None and "id" not in data:
+                data = {"id": str(uuid.uuid4()), **data}
+            columns = [_name(c) for c in data]
+            sql = (
+                f"INSERT INTO {_name(table)} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})"
+            )
+            if on_conflict is not None:
+                updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != on_conflict)
+                action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+                sql += f" ON CONFLICT ({_name(on_conflict)}) {action}"
+            sql += " RETURNING *"
+            inserted.extend(_fetch(conn, sql, [_value(v) for v in data.values()]))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return inserted
+
+def _transaction(conn: sqlite3.Connection, fn: Callable, params: Dict[str, Any]) -> Any:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(conn, params)
+        conn.execute("COMMIT")
+        return result
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _balance(conn: sqlite3.Connection, user_id: str) -> Optional[int]:
+    row = conn.execute("SELECT points FROM profile_balances WHERE id = ?", (user_id,)).fetchone()
+    return row["points"] if row else None
+
+def _append(conn: sqlite3.Connection, user_id: str, task_id: Optional[str], delta: int) -> None:
+    conn.execute(
+        "INSERT INTO points_ledger (user_id, task_id, delta) VALUES (?, ?, ?)",
+        (user_id, task_id, delta)
+    )
+
+def _complete(conn: sqlite3.Connection, task_id: str, completed_by: str) -> Optional[str]:
+    row = conn.execute(
+        """
+        UPDATE tasks
+           SET status = 'completed', completed_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+         WHERE id = ? AND status = 'active' AND assignee_id = ?
+           AND (NOT validation_required OR creator_id = ?)
+        RETURNING creator_id
+        """,
+        (task_id, completed_by, completed_by)
+    ).fetchone()
+    return row["creator_id"] if row else None
+
+def _complete_task(conn: sqlite3.Connection, params: Dict[str, Any]) -> Optional[int]:
+    creator_id = _complete(conn, params["p_task_id"], params["p_completed_by"])
+    if creator_id is None:
+        return None
+    _append(conn, creator_id, params["p_task_id"], params["p_points"])
+    return _balance(conn, creator_id)
+
+def _complete_tasks(conn: sqlite3.Connection, params: Dict[str, Any]) -> Dict[str, Any]:
+    completed = []
+    creators = set()
+    for task_id, points in zip(params["p_task_ids"], params["p_points"]):
+        creator_id = _complete(conn, task_id, params["p_completed_by"])
+        if creator_id is not None:
+            completed.append(task_id)
+            creators.add(creator_id)
+            _append(conn, creator_id, task_id, points)
+    balances = {}
+    for creator_id in creators:
+        balance = _balance(conn, creator_id)
+        if balance is not None:
+            balances[creator_id] = balance
+    return {"completed": completed, "balances": balances}
+
+def _award_points(conn: sqlite3.Connection, params: Dict[str, Any]) -> Optional[int]:
+    user_id = params["p_user_id"]
+    if conn.execute("SELECT 1 FROM profiles WHERE id = ?", (user_id,)).fetchone() is None:
+        return None
+    _append(conn, user_id, params.get("p_task_id"), params["p_delta"])
+    return _balance(conn, user_id)
+
+def _compact_points_ledger(conn: sqlite3.Connection, params: Dict[str, Any]) -> int:
+    # Writes are serialized on this thread, so no append can land behind us
+    recent = conn.execute(
+        """
+        SELECT 1 FROM points_checkpoint
+         WHERE compacted_at > strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)
+        """,
+        (f"-{float(params.get('p_min_interval', 0))} seconds",)
+    ).fetchone()
+    if recent:
+        return 0
+    start = conn.execute("SELECT ledger_id FROM points_checkpoint").fetchone()["ledger_id"]
+    end = conn.execute(
+        "SELECT COALESCE(MAX(id), ?) AS id FROM points_ledger", (start,)
+    ).fetchone()["id"]
+    if end == start:
+        conn.execute(
+            "UPDATE points_checkpoint SET compacted_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+        )
+        return 0
+    updated = conn.execute(
+        """
+        UPDATE profiles
+           SET points = COALESCE(points, 0) + tail.delta
+          FROM (SELECT user_id, SUM(delta) AS delta
+                  FROM points_ledger
+                 WHERE id > ? AND id <= ?
+                 GROUP BY user_id) AS tail
+         WHERE profiles.id = tail.user_id
+        """,
+        (start, end)
+    ).rowcount
+    conn.execute(
+        """
+        UPDATE points_checkpoint
+           SET ledger_id = ?, compacted_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now')
+        """,
+        (end,)
+    )
+    return updated
+
+def _rebuild_task_stats(conn: sqlite3.Connection, params: Dict[str, Any]) -> int:
+    for table in ("user_task_stats", "pair_task_stats", "user_weekly_stats", "user_streaks"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute(
+        """
+        INSERT INTO user_task_stats (user_id, role, status, tasks, points)
+        SELECT creator_id, 'created', status, COUNT(*), SUM(points)
+          FROM tasks GROUP BY creator_id, status
+        UNION ALL
+        SELECT assignee_id, 'assigned', status, COUNT(*), SUM(points)
+          FROM tasks GROUP BY assignee_id, status
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO pair_task_stats (user_a, user_b, status, tasks, points)
+        SELECT min(creator_id, assignee_id), max(creator_id, assignee_id),
+               status, COUNT(*), SUM(points)
+          FROM tasks GROUP BY 1, 2, status
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT INTO user_weekly_stats (user_id, week, tasks_completed, points_earned)
+        SELECT user_id, week, SUM(completed), SUM(points)
+          FROM (
+            SELECT assignee_id AS user_id, {_WEEK.format("completed_at")} AS week,
+                   1 AS completed, 0 AS points
+              FROM tasks
+             WHERE status = 'completed' AND completed_at IS NOT NULL
+            UNION ALL
+            SELECT user_id, {_WEEK.format("created_at")}, 0, delta FROM points_ledger
+          )
+         GROUP BY user_id, week
+        """
+    )
+    # Consecutive days share the same (day - row number), one group per streak
+    conn.execute(
+        """
+        WITH days AS (
+            SELECT DISTINCT assignee_id AS user_id, date(completed_at) AS day
+              FROM tasks
+             WHERE status = 'completed' AND completed_at IS NOT NULL
+        ), runs AS (
+            SELECT user_id, day,
+                   julianday(day) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day) AS run
+              FROM days
+        ), streaks AS (
+            SELECT user_id, COUNT(*) AS length, MAX(day) AS last_day
+              FROM runs GROUP BY user_id, run
+        )
+        INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_completed_on)
+        SELECT user_id,
+               (SELECT length FROM streaks latest
+                 WHERE latest.user_id = streaks.user_id
+                 ORDER BY last_day DESC LIMIT 1),
+               MAX(length), MAX(last_day)
+          FROM streaks
+         GROUP BY user_id
+        """
+    )
+    return conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+def _utc(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def _mark_tasks_overdue(conn: sqlite3.Connection, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    now = params["p_now"]
+    marked = []
+    for task_id in params["p_task_ids"]:
+        row = conn.execute(
+            """
+            SELECT due_date FROM tasks
+             WHERE id = ? AND status = 'active' AND overdue_at IS NULL AND due_date IS NOT NULL
+            """,
+            (task_id,)
+        ).fetchone()
+        # Due dates are compared as times, not as strings in mixed formats
+        if row is None or _utc(row["due_date"]) > _utc(now):
+            continue
+        marked.append(_row(conn.execute(
+            """
+            UPDATE tasks SET overdue_at = ? WHERE id = ?
+            RETURNING id, creator_id, assignee_id, due_date, overdue_at
+            """,
+            (now, task_id)
+        ).fetchone()))
+    return marked
+
+def _request_pairing(conn: sqlite3.Connection, params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = params["p_user_id"]
+    row = conn.execute(
+        "SELECT id FROM profiles WHERE pair_code = ?", (params["p_pair_code"],)
+    ).fetchone()
+    if row is None:
+        return {"error": "invalid_code"}
+    partner_id = row["id"]
+    if partner_id == user_id:
+        return {"error": "self"}
+    existing = conn.execute(
+        """
+        SELECT 1 FROM pairings
+         WHERE (user_id = ? AND partner_id = ?) OR (user_id = ? AND partner_id = ?)
+        """,
+        (user_id, partner_id, partner_id, user_id)
+    ).fetchone()
+    if existing:
+        return {"error": "exists"}
+    conn.execute(
+        "INSERT INTO pairings (id, user_id, partner_id, status) VALUES (?, ?, ?, 'pending')",
+        (str(uuid.uuid4()), user_id, partner_id)
+    )
+    return {"partner_id": partner_id}
+
+def _accept_pairing(conn: sqlite3.Connection, params: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = params["p_user_id"]
+    row = conn.execute(
+        """
+        SELECT id, user_id FROM pairings
+         WHERE partner_id = ? AND status = 'pending'
+         ORDER BY created_at LIMIT 1
+        """,
+        (user_id,)
+    ).fetchone()
+    if row is None:
+        return {"error": "not_found"}
+    conn.execute("UPDATE pairings SET status = 'approved' WHERE id = ?", (row["id"],))
+    conn.execute("UPDATE profiles SET paired = 1 WHERE id IN (?, ?)", (user_id, row["user_id"]))
+    return {"partner_id": row["user_id"]}
+
+# Python versions of the SQL functions in supabase/migrations
+FUNCTIONS: Dict[str, Callable[[sqlite3.Connection, Dict[str, Any]], Any]] = {
+    "complete_task": _complete_task,
+    "complete_tasks": _complete_tasks,
+    "award_points": _award_points,
+    "compact_points_ledger": _compact_points_ledger,
+    "rebuild_task_stats": _rebuild_task_stats,
+    "mark_tasks_overdue": _mark_tasks_overdue,
+    "request_pairing": _request_pairing,
+    "accept_pairing": _accept_pairing,
+}
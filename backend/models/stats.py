@@ -0,0 +1,116 @@
+from typing import Optional, List, Dict, Any
+from datetime import date, datetime, timedelta, timezone
+from models.database import Database
+from models.query import and_, gte, in_
+import asyncio
+
+# Statuses reported even when a user has no tasks in them
+STATUSES = ("active", "completed")
+
+def _week_start(day: date) -> date:
+    """Monday of the week containing ``day``, matching the database's weeks"""
+    return day - timedelta(days=day.weekday())
+
+def _counts(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    counts = {status: {"tasks": 0, "points": 0} for status in STATUSES}
+    for row in rows:
+        counts[row["status"]] = {"tasks": row["tasks"], "points": row["points"]}
+    return counts
+
+class TaskStats:
+    """Reads of the task aggregates kept up to date by database triggers.
+
+    Every insert, status change and delete on tasks (so Task.save,
+    complete and delete, and their bulk versions) adjusts the per-user and
+    per-pair counts in the same transaction; ledger appends add to the
+    weekly points. Reads fetch a handful of small rows per user no matter
+    how many tasks they have.
+    """
+
+    @staticmethod
+    async def get_for_users(user_ids: List[str], weeks: int) -> Dict[str, Dict[str, Any]]:
+        """Counts by role and status, the last ``weeks`` weeks and the streak of each user"""
+        db = Database()
+        today = datetime.now(timezone.utc).date()
+        first_week = _week_start(today) - timedelta(weeks=weeks - 1)
+        task_rows, weekly_rows, streak_rows = await asyncio.gather(
+            db.fetch_many(
+                "user_task_stats",
+                in_("user_id", user_ids),
+                columns=["user_id", "role", "status", "tasks", "points"]
+            ),
+            db.fetch_many(
+                "user_weekly_stats",
+                and_(in_("user_id", user_ids), gte("week", first_week)),
+                columns=["user_id", "week", "tasks_completed", "points_earned"]
+            ),
+            db.fetch_many(
+                "user_streaks",
+                in_("user_id", user_ids),
+                columns=["user_id", "current_streak", "longest_streak", "last_completed_on"]
+            )
+        )
+
+        stats = {}
+        for user_id in user_ids:
+            by_week = {
+                str(row["week"]): row for row in weekly_rows if row["user_id"] == user_id
+            }
+            weekly = []
+            for offset in range(weeks):
+                week = str(first_week + timedelta(weeks=offset))
+                row = by_week.get(week, {})
+                weekly.append({
+                    "week": week,
+                    "tasks_completed": row.get("tasks_completed", 0),
+                    "points_earned": row.get("points_earned", 0)
+                })
+            stats[user_id] = {
+                "created": _counts([
+                    r for r in task_rows if r["user_id"] == user_id and r["role"] == "created"
+                ]),
+                "assigned": _counts([
+                    r for r in task_rows if r["user_id"] == user_id and r["role"] == "assigned"
+                ]),
+                "weekly": weekly,
+                "points_earned": sum(week["points_earned"] for week in weekly),
+                "tasks_completed": sum(week["tasks_completed"] for week in weekly),
+                "streak": _streak(
+                    next((r for r in streak_rows if r["user_id"] == user_id), None), today
+                )
+            }
+        return stats
+
+    @staticmethod
+    async def get_for_pair(user_id: str, partner_id: str) -> Dict[str, Dict[str, int]]:
+        """Counts by status of the tasks between two users, in either direction"""
+        user_a, user_b = sorted((user_id, partner_id))
+        rows = await Database().fetch_many(
+            "pair_task_stats",
+            {"user_a": user_a, "user_b": user_b},
+            columns=["status", "tasks", "points"]
+        )
+        return _counts(rows)
+
+    @staticmethod
+    async def rebuild() -> Optional[int]:
+        """Recompute every aggregate from the tasks and the points ledger.
+
+        Returns the number of tasks counted, or None if the rebuild failed.
+        Task writes and ledger appends wait until it finishes, so only
+        commands.rebuild_stats calls it; don't call it from a request.
+        """
+        return await Database().rpc("rebuild_task_stats", {})
+
+def _streak(row: Optional[Dict[str, Any]], today: date) -> Dict[str, Any]:
+    if not row:
+        return {"current": 0, "longest": 0, "last_completed_on": None}
+    last = row["last_completed_on"]
+    last_day = date.fromisoformat(str(last)[:10]) if last else None
+    # The stored streak is over once a whole day passes without a completion
+    current = row["current_streak"] if last_day and last_day >= today - timedelta(days=1) else 0
+    return {
+        "current": current,
+        "longest": row["longest_streak"],
+        "last_completed_on": str(last_day) if last_day else None
+    }
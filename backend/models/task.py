@@ -1,8 +1,14 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator
 from pydantic import BaseModel, Field, validator
+from pubsub import hub
+from scheduler import due_dates
 from models.database import Database
 from models.user import User
+from models.query import (
+    eq, gt, in_, is_null, or_, and_, asc, encode_cursor, decode_cursor
+)
+import uuid
 
 class TaskCreate(BaseModel):
     """Model for task creation requests"""
@@ -43,7 +49,54 @@ class TaskBase(BaseModel):
     min_points: Optional[int] = None
     max_points: Optional[int] = None
     due_date: Optional[datetime] = None
+    # Set by the due date scheduler, never written by save
+    overdue_at: Optional[datetime] = None
     
+# Columns needed to build a Task
+TASK_COLUMNS = [
+    "id", "title", "description", "points", "creator_id", "assignee_id",
+    "status", "validation_required", "random_payout", "min_points",
+    "max_points", "due_date", "overdue_at"
+]
+
+# Active task lists are sorted by due date (undated last), then id
+ACTIVE_ORDER = [asc("due_date"), asc("id")]
+
+def _involves(user: User):
+    """Filter for tasks the user created or is assigned to"""
+    return or_(eq("creator_id", user.id), eq("assignee_id", user.id))
+
+def _decode_position(cursor: str) -> Tuple[Optional[str], str]:
+    """The (due_date, id) of the row a cursor points after.
+
+    Raises ValueError unless the cursor holds a due date (or null) and a
+    task id, so a tampered cursor gets a 400 rather than reaching the filter.
+    """
+    values = decode_cursor(cursor)
+    if len(values) != 2:
+        raise ValueError("Invalid cursor")
+    due_date, task_id = values
+    if not isinstance(task_id, str) or not (due_date is None or isinstance(due_date, str)):
+        raise ValueError("Invalid cursor")
+    try:
+        uuid.UUID(task_id)
+        if due_date is not None:
+            # Python 3.10 doesn't accept a "Z" offset
+            datetime.fromisoformat(due_date.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    return due_date, task_id
+
+def _after(due_date: Optional[str], task_id: str):
+    """Keyset filter for rows sorted after (due_date, id) in ACTIVE_ORDER"""
+    if due_date is None:
+        return and_(is_null("due_date"), gt("id", task_id))
+    return or_(
+        gt("due_date", due_date),
+        and_(eq("due_date", due_date), gt("id", task_id)),
+        is_null("due_date")
+    )
+
 class Task:
     def __init__(
         self,
@@ -73,18 +126,16 @@ class Task:
         db = Database()
         task_data = await db.fetch_one(
             "tasks",
-            {"id": task_id},
-            extra_checks=lambda t: (
-                t["creator_id"] == current_user.id or 
-                t["assignee_id"] == current_user.id
-            )
+            and_(eq("id", task_id), _involves(current_user)),
+            columns=TASK_COLUMNS
         )
         
         if not task_data:
             return None
             
-        creator = await User.get_by_id(task_data["creator_id"])
-        assignee = await User.get_by_id(task_data["assignee_id"])
+        users = await User.get_many([task_data["creator_id"], task_data["assignee_id"]])
+        creator = users[task_data["creator_id"]]
+        assignee = users[task_data["assignee_id"]]
         
         if not creator or not assignee:
             return None
@@ -103,6 +154,19 @@ class Task:
         task.id = task_id
         return task
 
+    @classmethod
+    async def get_many(cls, task_ids: List[str], current_user: User) -> List['Task']:
+        """Get several tasks by ID in one query, skipping any the user can't access"""
+        if not task_ids:
+            return []
+        db = Database()
+        tasks_data = await db.fetch_many(
+            "tasks",
+            and_(in_("id", task_ids), _involves(current_user)),
+            columns=TASK_COLUMNS
+        )
+        return await cls._from_rows(tasks_data)
+
     @classmethod
     def from_create_request(cls, data: TaskCreate, creator: User, assignee: User) -> 'Task':
         """Create a Task instance from a creation request"""
@@ -124,19 +188,17 @@ class Task:
         if not self._validate_users():
             return False
             
-        task_dict = self.data.dict()
-        
-        # Convert datetime to ISO format string for JSON serialization
-        if task_dict.get('due_date'):
-            task_dict['due_date'] = task_dict['due_date'].isoformat()
+        task_dict = self._to_row()
         
         if self.id:
+            event = "task.updated"
             success = await self._db.update(
                 "tasks",
                 {"id": self.id},
                 task_dict
             )
         else:
+            event = "task.created"
             task_id = await self._db.insert("tasks", task_dict)
             if task_id:
                 self.id = task_id
@@ -144,26 +206,129 @@ class Task:
             else:
                 success = False
                 
+        if success:
+            self._schedule()
+            self._changed(event, self.to_dict())
         return success
 
+    @staticmethod
+    async def save_many(tasks: List['Task']) -> bool:
+        """Insert new tasks with one multi-row statement and set their IDs"""
+        if not all(task._validate_users() for task in tasks):
+            return False
+            
+        task_ids = await Database().insert_many("tasks", [task._to_row() for task in tasks])
+        if task_ids is None:
+            return False
+            
+        for task, task_id in zip(tasks, task_ids):
+            task.id = task_id
+            task._schedule()
+            task._changed("task.created", task.to_dict())
+        return True
+
+    def _changed(self, event: str, data: Dict[str, Any]) -> None:
+        """Push the change to both users who can see this task"""
+        user_ids = (self.data.creator_id, self.data.assignee_id)
+        hub.publish(user_ids, event, data)
+
+    def _schedule(self) -> None:
+        """Keep the due date scheduler in step with this task"""
+        if self.data.status == "active" and self.data.overdue_at is None:
+            due_dates.schedule(
+                self.id, self.data.due_date, (self.data.creator_id, self.data.assignee_id)
+            )
+        else:
+            due_dates.cancel(self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public representation of the task, the same shape as a TASK_COLUMNS row"""
+        overdue_at = self.data.overdue_at
+        return {
+            "id": self.id,
+            **self._to_row(),
+            "overdue_at": overdue_at.isoformat() if overdue_at else None
+        }
+
+    def _to_row(self) -> Dict[str, Any]:
+        """Serialize the task for the database"""
+        task_dict = self.data.dict(exclude={"overdue_at"})
+        
+        # Convert datetime to ISO format string for JSON serialization
+        if task_dict.get('due_date'):
+            task_dict['due_date'] = task_dict['due_date'].isoformat()
+        return task_dict
+
     async def complete(self, completed_by: User) -> bool:
-        """Complete a task and award points"""
+        """Complete a task and award points.
+
+        The status change and the creator's point increment happen atomically
+        in one round trip through the complete_task database function.
+        """
         if not self._can_complete(completed_by):
             return False
             
         # Calculate points (handle random payout if enabled)
         points = self._calculate_points()
         
-        # Update task status
-        self.data.status = "completed"
-        if not await self.save():
+        balance = await self._db.rpc("complete_task", {
+            "p_task_id": self.id,
+            "p_completed_by": completed_by.id,
+            "p_points": points
+        })
+        if balance is None:
             return False
             
-        # Award points to the creator
-        await self._creator.add_points(points)
+        self.data.status = "completed"
+        self._schedule()
+        self._creator.set_points(balance)
+        self._changed("task.completed", self._completion(completed_by, balance))
         
         return True
 
+    @staticmethod
+    async def complete_many(tasks: List['Task'], completed_by: User) -> Optional[List[str]]:
+        """Complete several tasks in one round trip and return the completed IDs.
+
+        Tasks the user can't complete are skipped. The complete_tasks
+        database function appends one ledger row per completed task, so each
+        award keeps its task in the history, and returns every creator's new
+        balance. Returns None if the database call fails.
+        """
+        tasks = [task for task in tasks if task._can_complete(completed_by)]
+        if not tasks:
+            return []
+            
+        result = await Database().rpc("complete_tasks", {
+            "p_task_ids": [task.id for task in tasks],
+            "p_completed_by": completed_by.id,
+            "p_points": [task._calculate_points() for task in tasks]
+        })
+        if result is None:
+            return None
+            
+        completed = set(result["completed"])
+        balances = result["balances"]
+        for task in tasks:
+            if task.id in completed:
+                task.data.status = "completed"
+                task._schedule()
+                balance = balances.get(task._creator.id)
+                if balance is not None:
+                    task._creator.set_points(balance)
+                task._changed("task.completed", task._completion(completed_by, balance))
+                    
+        return [task.id for task in tasks if task.id in completed]
+
+    def _completion(self, completed_by: User, balance: Optional[int]) -> Dict[str, Any]:
+        """Event data for a completed task, including the creator's new balance"""
+        return {
+            "id": self.id,
+            "completed_by": completed_by.id,
+            "creator_id": self.data.creator_id,
+            "balance": balance
+        }
+
     def _validate_users(self) -> bool:
         """Ensure users are paired and task assignment is valid"""
         return (
@@ -197,25 +362,46 @@ class Task:
         if self.data.status != "active":
             return False
             
-        return await self._db.delete("tasks", {"id": self.id})
+        if not await self._db.delete("tasks", {"id": self.id}):
+            return False
+        due_dates.cancel(self.id)
+        self._changed("task.deleted", {"id": self.id})
+        return True
 
     @staticmethod
-    async def get_active_tasks(user: User) -> List['Task']:
-        """Get all active tasks for a user"""
-        db = Database()
-        tasks_data = await db.fetch_many(
+    async def delete_many(tasks: List['Task'], user: User) -> List[str]:
+        """Delete the tasks the user may delete with one statement and return their IDs"""
+        tasks = [
+            task for task in tasks
+            if user.id == task._creator.id and task.data.status == "active"
+        ]
+        if not tasks:
+            return []
+            
+        task_ids = [task.id for task in tasks]
+        if not await Database().delete(
             "tasks",
-            {"status": "active"},
-            extra_checks=lambda t: (
-                t["creator_id"] == user.id or 
-                t["assignee_id"] == user.id
-            )
+            and_(in_("id", task_ids), eq("creator_id", user.id), eq("status", "active"))
+        ):
+            return []
+        for task in tasks:
+            due_dates.cancel(task.id)
+            task._changed("task.deleted", {"id": task.id})
+        return task_ids
+
+    @staticmethod
+    async def _from_rows(tasks_data: List[Dict[str, Any]]) -> List['Task']:
+        """Build tasks from rows, loading every referenced user in one batch"""
+        users = await User.get_many(
+            user_id
+            for task_data in tasks_data
+            for user_id in (task_data["creator_id"], task_data["assignee_id"])
         )
         
         tasks = []
         for task_data in tasks_data:
-            creator = await User.get_by_id(task_data["creator_id"])
-            assignee = await User.get_by_id(task_data["assignee_id"])
+            creator = users[task_data["creator_id"]]
+            assignee = users[task_data["assignee_id"]]
             if creator and assignee:
                 task = Task(
                     title=task_data["title"],
@@ -231,4 +417,77 @@ class Task:
                 task.id = task_data["id"]
                 tasks.append(task)
                 
-        return tasks 
\ No newline at end of file
+        return tasks
+
+    @staticmethod
+    async def get_active_tasks(user: User) -> List['Task']:
+        """Get all active tasks for a user"""
+        db = Database()
+        tasks_data = await db.fetch_many(
+            "tasks",
+            and_(eq("status", "active"), _involves(user)),
+            columns=TASK_COLUMNS,
+            order=ACTIVE_ORDER
+        )
+        return await Task._from_rows(tasks_data)
+
+    @staticmethod
+    async def get_active_rows(
+        user: User,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of active task rows and the cursor for the next page.
+
+        Rows come back exactly as selected with TASK_COLUMNS, which is also
+        the public shape of a task, so listing them skips building models and
+        loading users. Pages are keyset-paginated on (due_date, id), so each
+        page costs the same no matter how deep into the list it is. Raises
+        ValueError for a malformed cursor.
+        """
+        filters = and_(eq("status", "active"), _involves(user))
+        if cursor:
+            due_date, task_id = _decode_position(cursor)
+            filters = and_(filters, _after(due_date, task_id))
+            
+        db = Database()
+        # Fetch one extra row to learn whether another page follows
+        tasks_data = await db.fetch_many(
+            "tasks",
+            filters,
+            columns=TASK_COLUMNS,
+            order=ACTIVE_ORDER,
+            limit=limit + 1
+        )
+        
+        next_cursor = None
+        if len(tasks_data) > limit:
+            tasks_data = tasks_data[:limit]
+            last = tasks_data[-1]
+            next_cursor = encode_cursor([last["due_date"], last["id"]])
+            
+        return tasks_data, next_cursor
+
+    @staticmethod
+    async def get_active_page(
+        user: User,
+        limit: int,
+        cursor: Optional[str] = None
+    ) -> Tuple[List['Task'], Optional[str]]:
+        """Like get_active_rows, but build full Task objects for each row"""
+        tasks_data, next_cursor = await Task.get_active_rows(user, limit, cursor)
+        return await Task._from_rows(tasks_data), next_cursor
+
+    @staticmethod
+    async def iter_active_rows(
+        user: User,
+        page_size: int,
+        cursor: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield active task rows page by page as they arrive from the database"""
+        while True:
+            tasks_data, cursor = await Task.get_active_rows(user, page_size, cursor)
+            for task_data in tasks_data:
+                yield task_data
+            if not cursor:
+                return
@@ -1,6 +1,15 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Iterable
+from contextvars import ContextVar
 from pydantic import BaseModel
 from models.database import Database
+from models.loader import BatchLoader
+from models.points import PointsLedger
+from models.cache import profile_cache, partner_cache, MISSING
+from models.query import eq, in_, or_, and_
+from resilience import ServiceUnavailableError
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Profile(BaseModel):
     id: str
@@ -10,6 +19,13 @@ class Profile(BaseModel):
     points: int = 0
     created_at: str
 
+# Columns needed to build a Profile, read from the profile_balances view so
+# points include ledger entries not yet compacted into profiles.points
+PROFILE_COLUMNS = ["id", "email", "pair_code", "paired", "points", "created_at"]
+
+# Per-request identity map for profiles, see User.start_request_scope
+_user_loader: ContextVar[Optional[BatchLoader]] = ContextVar("user_loader", default=None)
+
 class User:
     def __init__(self, id: str, profile: Profile):
         self.id = id
@@ -17,47 +33,119 @@ class User:
         self._db = Database()
         self._partner: Optional[User] = None
 
+    @classmethod
+    def start_request_scope(cls, current_user: Optional['User'] = None) -> BatchLoader:
+        """Share loaded users for the rest of the current request.
+
+        Lookups made through get_by_id/get_many are de-duplicated and batched
+        into a single profiles query, and return the same User instances.
+        """
+        loader = BatchLoader(cls._fetch_many)
+        if current_user:
+            loader.prime(current_user.id, current_user)
+        _user_loader.set(loader)
+        return loader
+
+    @classmethod
+    async def _fetch_many(cls, user_ids: List[str]) -> Dict[str, 'User']:
+        """Load profiles for several users, serving what it can from the
+        profile cache and fetching the rest with one id=in.(...) query"""
+        users = {}
+        missing = []
+        for user_id in user_ids:
+            profile_data = profile_cache.get(user_id)
+            if profile_data is MISSING:
+                missing.append(user_id)
+            else:
+                users[user_id] = cls(id=user_id, profile=Profile(**profile_data))
+                
+        if missing:
+            db = Database()
+            profiles = await db.fetch_many(
+                "profile_balances",
+                {"id": missing},
+                columns=PROFILE_COLUMNS
+            )
+            for profile_data in profiles:
+                profile_cache.set(profile_data["id"], profile_data)
+                users[profile_data["id"]] = cls(
+                    id=profile_data["id"],
+                    profile=Profile(**profile_data)
+                )
+                
+        return users
+
+    @staticmethod
+    def invalidate_cache(*user_ids: str) -> None:
+        """Drop cached profiles and partners after they change"""
+        for user_id in user_ids:
+            profile_cache.invalidate(user_id)
+            partner_cache.invalidate(user_id)
+
+    @staticmethod
+    async def version(*user_ids: str) -> str:
+        """Tag that changes whenever any of the users' tasks, points, pairing
+        or profile change.
+
+        Read from user_versions, which database triggers bump in the same
+        transaction as the change, so every worker sees the same tag.
+        """
+        rows = await Database().fetch_many(
+            "user_versions",
+            in_("user_id", user_ids),
+            columns=["user_id", "version"]
+        )
+        versions = {row["user_id"]: row["version"] for row in rows}
+        return ",".join(str(versions.get(user_id, 0)) for user_id in user_ids)
+
     @classmethod
     async def get_by_id(cls, user_id: str) -> Optional['User']:
         """Get a user by their ID"""
-        db = Database()
-        profile_data = await db.fetch_one(
-            "profiles",
-            {"id": user_id}
-        )
-        
-        if not profile_data:
-            return None
-            
-        return cls(
-            id=user_id,
-            profile=Profile(**profile_data)
-        )
+        loader = _user_loader.get()
+        if loader:
+            return await loader.load(user_id)
+
+        found = await cls._fetch_many([user_id])
+        return found.get(user_id)
+
+    @classmethod
+    async def get_many(cls, user_ids: Iterable[str]) -> Dict[str, Optional['User']]:
+        """Get several users by ID, keyed by ID"""
+        loader = _user_loader.get()
+        if loader:
+            return await loader.load_many(user_ids)
+
+        user_ids = list(dict.fromkeys(user_ids))
+        found = await cls._fetch_many(user_ids)
+        return {user_id: found.get(user_id) for user_id in user_ids}
 
     async def get_partner(self) -> Optional['User']:
         """Get the user's paired partner"""
         if self._partner:
             return self._partner
             
-        # Check for approved pairing
-        pairing = await self._db.fetch_one(
-            "pairings",
-            {"status": "approved"},
-            extra_checks=lambda p: (
-                p["user_id"] == self.id or 
-                p["partner_id"] == self.id
+        partner_id = partner_cache.get(self.id)
+        if partner_id is MISSING:
+            # Check for approved pairing
+            pairing = await self._db.fetch_one(
+                "pairings",
+                and_(
+                    eq("status", "approved"),
+                    or_(eq("user_id", self.id), eq("partner_id", self.id))
+                ),
+                columns=["user_id", "partner_id"]
             )
-        )
-        
-        if not pairing:
-            return None
             
-        # Get partner's ID
-        partner_id = (
-            pairing["partner_id"] 
-            if pairing["user_id"] == self.id 
-            else pairing["user_id"]
-        )
+            if not pairing:
+                return None
+                
+            # Get partner's ID
+            partner_id = (
+                pairing["partner_id"] 
+                if pairing["user_id"] == self.id 
+                else pairing["user_id"]
+            )
+            partner_cache.set(self.id, partner_id)
         
         # Get partner's profile
         self._partner = await User.get_by_id(partner_id)
@@ -72,20 +160,21 @@ class User:
             self._partner.id == other.id
         )
 
-    async def add_points(self, points: int) -> bool:
-        """Add points to the user's balance"""
+    def set_points(self, balance: int) -> None:
+        """Record a balance the database has already stored"""
+        self.profile.points = balance
+        profile_cache.set(self.id, self.profile.dict())
+
+    async def add_points(self, points: int, task_id: Optional[str] = None) -> bool:
+        """Add points to the user's balance by appending to the points ledger"""
         try:
-            new_points = self.profile.points + points
-            result = await self._db.update(
-                "profiles",
-                {"id": self.id},
-                {"points": new_points}
-            )
-            
-            if result:
-                self.profile.points = new_points
-                
-            return result
+            balance = await PointsLedger.award(self.id, points, task_id)
+            if balance is None:
+                return False
+            self.set_points(balance)
+            return True
+        except ServiceUnavailableError:
+            raise
         except Exception as e:
-            print(f"Error adding points: {e}")
-            return False 
\ No newline at end of file
+            logger.error("Error adding points: %s", e)
+            return False
@@ -0,0 +1,135 @@
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+from metrics import EVENT_CONNECTIONS, EVENTS_PUBLISHED, EVENT_OVERFLOWS
+import asyncio
+import itertools
+import orjson
+import os
+
+class Subscription:
+    """One connected client: a bounded queue of encoded events"""
+
+    __slots__ = ("user_id", "queue", "closed", "overflowed")
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self.overflowed = False
+
+    def close(self) -> None:
+        self.closed = True
+        # Wake the stream if it's waiting on an empty queue
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+class EventHub:
+    """In-process pub/sub fanning task and pairing changes out to connected clients.
+
+    Subscriptions are keyed by user id and changes are published to both
+    members of a pair. Each connection has a bounded queue; one that falls
+    ``queue_size`` events behind is closed rather than buffered, and the
+    client reconnects and refetches. Only the ``max_connections`` newest
+    connections per user are kept, and each is ended after ``max_age``
+    seconds so open streams never hold up a server shutdown or deploy for
+    long. All methods run on the event loop thread.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 100,
+        max_connections: int = 5,
+        heartbeat: float = 15.0,
+        max_age: float = 300.0
+    ):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.heartbeat = heartbeat
+        self.max_age = max_age
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        subscriptions = self._subscriptions.setdefault(user_id, [])
+        subscriptions.append(subscription)
+        while len(subscriptions) > self.max_connections:
+            self._remove(subscriptions.pop(0))
+        EVENT_CONNECTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id, [])
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+            self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscription.close()
+        EVENT_CONNECTIONS.dec()
+
+    def publish(self, user_ids: Iterable[Optional[str]], event: str, data: Dict[str, Any]) -> None:
+        """Queue an event for every connection of the given users without waiting"""
+        targets = [
+            subscription
+            for user_id in dict.fromkeys(user_ids)
+            for subscription in self._subscriptions.get(user_id, ())
+        ]
+        EVENTS_PUBLISHED.inc(event)
+        if not targets:
+            return
+
+        # Encode once and share the bytes between all connections
+        message = (
+            f"id: {next(self._ids)}\nevent: {event}\ndata: ".encode()
+            + orjson.dumps(data) + b"\n\n"
+        )
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                EVENT_OVERFLOWS.inc()
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+    async def stream(self, user_id: str) -> AsyncIterator[bytes]:
+        """Server-sent events for one connection, with heartbeat comments.
+
+        Subscribes only once the response starts, so a client that disconnects
+        before then leaves nothing behind.
+        """
+        subscription = self.subscribe(user_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_age
+        try:
+            # Ask clients to wait a few seconds before reconnecting
+            yield b"retry: 3000\n\n"
+            while not subscription.closed:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), min(self.heartbeat, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if message is None or subscription.closed:
+                    break
+                yield message
+            if subscription.overflowed:
+                # Events were lost, so the client has to refetch
+                yield b"event: reset\ndata: {}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+hub = EventHub(
+    queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", "100")),
+    max_connections=int(os.getenv("EVENTS_MAX_CONNECTIONS", "5")),
+    heartbeat=float(os.getenv("EVENTS_HEARTBEAT", "15")),
+    max_age=float(os.getenv("EVENTS_MAX_AGE", "300"))
+)
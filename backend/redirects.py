@@ -0,0 +1,41 @@
+from starlette.datastructures import URL
+import os
+
+class HTTPSRedirectMiddleware:
+    """ASGI middleware redirecting plain HTTP requests to HTTPS in production.
+
+    Behind Railway (or another reverse proxy) the app itself is served over
+    HTTP, so the original scheme is taken from the X-Forwarded-Proto header
+    rather than the request URL. ENVIRONMENT is read once, when the
+    middleware is built.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = os.environ.get("ENVIRONMENT") == "production"
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forwarded_proto = None
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-proto":
+                # With several proxies the client-facing one comes first
+                forwarded_proto = value.decode("latin-1").split(",")[0].strip()
+                break
+        if (forwarded_proto or scope["scheme"]) == "https":
+            await self.app(scope, receive, send)
+            return
+
+        url = str(URL(scope=scope).replace(scheme="https"))
+        await send({
+            "type": "http.response.start",
+            "status": 301,
+            "headers": [
+                (b"location", url.encode("latin-1")),
+                (b"content-length", b"0"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b""})
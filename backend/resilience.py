@@ -0,0 +1,261 @@
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+from metrics import UPSTREAM_RETRIES, UPSTREAM_HEDGES, UPSTREAM_FAILURES, CIRCUIT_STATE
+import asyncio
+import httpx
+import logging
+import os
+import random
+import sqlite3
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# PostgREST could not reach Postgres, or Postgres is overloaded, shutting
+# down or asked us to retry a serialization failure or deadlock
+TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "40001", "40P01"}
+TRANSIENT_SQLSTATE_CLASSES = ("08", "53", "57")
+
+class ServiceUnavailableError(Exception):
+    """A backing service is down, overloaded or too slow to answer in time.
+
+    Routers let it propagate; the app turns it into a 503 with Retry-After
+    so clients back off instead of treating the failure as a missing row.
+    """
+
+    def __init__(self, service: str, reason: str, retry_after: float):
+        super().__init__(f"{service} unavailable: {reason}")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
+
+def _transient_status(status: Any) -> bool:
+    return isinstance(status, int) and (status == 0 or status == 429 or status >= 500)
+
+def _error_type(module: str, name: str) -> Optional[type]:
+    """An exception class from a client library, if the library is loaded.
+
+    Looked up rather than imported so importing the app doesn't load the
+    supabase client stack; an error can't be of a type never imported.
+    """
+    return getattr(sys.modules.get(module), name, None)
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failure says the service is unhealthy rather than the request wrong"""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError, ConnectionError)):
+        return True
+    if isinstance(error, sqlite3.OperationalError):
+        return "locked" in str(error) or "busy" in str(error)
+    if isinstance(error, httpx.HTTPStatusError):
+        return _transient_status(error.response.status_code)
+    api_error = _error_type("postgrest.exceptions", "APIError")
+    if api_error and isinstance(error, api_error):
+        code = error.code
+        # Responses that weren't JSON carry the HTTP status instead of a code
+        if isinstance(code, int):
+            return _transient_status(code)
+        return bool(code) and (
+            code in TRANSIENT_POSTGREST_CODES or code.startswith(TRANSIENT_SQLSTATE_CLASSES)
+        )
+    auth_error = _error_type("gotrue.errors", "AuthError")
+    if auth_error and isinstance(error, auth_error):
+        # Network failures and 502-504 come back as AuthRetryableError with status 0 or 5xx
+        return _transient_status(getattr(error, "status", None))
+    return False
+
+class CircuitBreaker:
+    """Fails calls fast once a service keeps failing.
+
+    After ``failure_threshold`` consecutive transient failures the circuit
+    opens and calls are refused for ``reset_timeout`` seconds. Then a single
+    probe call is let through: success closes the circuit, failure opens it
+    for another ``reset_timeout``.
+    """
+
+    def __init__(self, service: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.service = service
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            # A passing failure; the next call may well succeed
+            return 1.0
+        return max(1.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probing = False
+        if self.opened_at is not None:
+            self.opened_at = None
+            CIRCUIT_STATE.set(0, self.service)
+            logger.warning("Circuit for %s closed", self.service)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self._probing = False
+            self.opened_at = time.monotonic()
+            CIRCUIT_STATE.set(1, self.service)
+            logger.warning(
+                "Circuit for %s opened after %d failures", self.service, self.failures
+            )
+
+    def release(self) -> None:
+        """Give up a probe whose call was cancelled before it finished"""
+        self._probing = False
+
+class CallPolicy:
+    """Deadlines, retries, hedging and a circuit breaker for one service.
+
+    Every call gets a deadline covering all of its attempts. Idempotent calls
+    are retried after transient failures with full-jitter exponential backoff,
+    and with ``hedge_after`` set a second request is sent when the first is
+    slower than that; whichever answers first wins. Writes are tried once,
+    since a write that timed out may still have been applied. Transient
+    failures end in ServiceUnavailableError; any other error is raised as is.
+    """
+
+    def __init__(
+        self,
+        service: str,
+        read_deadline: float = 5.0,
+        write_deadline: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.05,
+        backoff_max: float = 1.0,
+        hedge_after: float = 0.0,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.service = service
+        self.read_deadline = read_deadline
+        self.write_deadline = write_deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker(service)
+
+    @classmethod
+    def from_env(cls, service: str, prefix: str) -> "CallPolicy":
+        """Build a policy from ``{prefix}_DEADLINE``, ``{prefix}_RETRIES`` and friends"""
+        return cls(
+            service,
+            read_deadline=float(os.getenv(f"{prefix}_DEADLINE", "5")),
+            write_deadline=float(os.getenv(f"{prefix}_WRITE_DEADLINE", "10")),
+            retries=int(os.getenv(f"{prefix}_RETRIES", "2")),
+            backoff=float(os.getenv(f"{prefix}_RETRY_BACKOFF", "0.05")),
+            backoff_max=float(os.getenv(f"{prefix}_RETRY_BACKOFF_MAX", "1")),
+            hedge_after=float(os.getenv(f"{prefix}_HEDGE_AFTER_MS", "0")) / 1000,
+            breaker=CircuitBreaker(
+                service,
+                failure_threshold=int(os.getenv(f"{prefix}_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv(f"{prefix}_BREAKER_RESET", "30"))
+            )
+        )
+
+    async def call(
+        self,
+        operation: str,
+        fn: Callable[[], Awaitable[T]],
+        idempotent: bool = False
+    ) -> T:
+        """Run ``fn`` (which starts a fresh request on every call) under the policy"""
+        if not self.breaker.allow():
+            UPSTREAM_FAILURES.inc(self.service, "circuit_open")
+            raise ServiceUnavailableError(self.service, "circuit open", self.breaker.retry_after())
+
+        deadline = self.read_deadline if idempotent else self.write_deadline
+        expires = time.monotonic() + deadline
+        attempts = 1 + self.retries if idempotent else 1
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            try:
+                if idempotent and self.hedge_after and self.breaker.state == "closed":
+                    result = await self._hedged(fn, remaining)
+                else:
+                    result = await asyncio.wait_for(fn(), remaining)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The service answered; the request itself was at fault
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+                timed_out = isinstance(e, asyncio.TimeoutError)
+                if (timed_out or attempt >= attempts or self.breaker.state != "closed"
+                        or time.monotonic() + delay >= expires):
+                    reason = "timeout" if timed_out else "error"
+                    UPSTREAM_FAILURES.inc(self.service, reason)
+                    raise ServiceUnavailableError(
+                        self.service, f"{operation} failed: {e!r}", self.breaker.retry_after()
+                    ) from e
+                UPSTREAM_RETRIES.inc(self.service, operation)
+                logger.info("Retrying %s %s after %r", self.service, operation, e)
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[T]], timeout: float) -> T:
+        first = asyncio.ensure_future(fn())
+        hedge: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=min(self.hedge_after, timeout))
+            if done:
+                return first.result()
+
+            hedge = asyncio.ensure_future(fn())
+            pending = {first, hedge}
+            error: Optional[BaseException] = None
+            expires = time.monotonic() + timeout - self.hedge_after
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0, expires - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        UPSTREAM_HEDGES.inc(self.service, "hedge" if task is hedge else "first")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing request is abandoned
+            for task in (first, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+# Shared by every caller of the same service, so they trip one breaker
+database_calls = CallPolicy.from_env("database", "DB")
+auth_calls = CallPolicy.from_env("auth", "AUTH")
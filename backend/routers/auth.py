@@ -1,196 +1,212 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
-from supabase import create_client, Client
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from typing import Optional, Dict, Any
 from pydantic import BaseModel
-import os
-from dotenv import load_dotenv
+from dependencies import (
+    get_supabase, get_token_verifier, verify_token, fetch_auth_user,
+    etag, cache_headers, not_modified
+)
+from pubsub import hub
+from models.database import Database
+from models.query import asc
+from models.user import User
+from resilience import ServiceUnavailableError
+from security import TokenVerifier
 import secrets
 import string
-
-# Load from .env file if it exists
-load_dotenv()
+import tracing
 
 router = APIRouter()
 
-class PairRequest(BaseModel):
-    partner_code: str
-
-# Get environment variables with error handling
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+PAIR_CODE_ATTEMPTS = 3
 
-if not supabase_url or not supabase_key:
-    raise RuntimeError(
-        "Missing required environment variables. "
-        "Please ensure SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY are set."
-    )
+# Error codes returned by the request_pairing/accept_pairing functions
+PAIRING_ERRORS = {
+    'invalid_code': (404, "Invalid pairing code"),
+    'self': (400, "Cannot pair with yourself"),
+    'exists': (400, "A pairing request already exists between these users"),
+    'not_found': (404, "No pending pairing requests found"),
+}
 
-# Initialize Supabase client
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    raise RuntimeError(f"Failed to initialize Supabase client: {str(e)}")
+class PairRequest(BaseModel):
+    partner_code: str
 
 def generate_pairing_code(length: int = 8) -> str:
     """Generate a random pairing code of specified length"""
     alphabet = string.ascii_uppercase + string.digits
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
-async def get_current_user(authorization: str = Header(None)):
+async def get_current_user(
+    authorization: str = Header(None),
+    token_verifier: TokenVerifier = Depends(get_token_verifier)
+) -> Dict[str, Any]:
+    """Verify the bearer token locally and return its claims"""
     if not authorization:
         raise HTTPException(status_code=401, detail="No authorization header")
     
     try:
         # Extract token from "Bearer <token>"
         token = authorization.split(" ")[1]
-        user = supabase.auth.get_user(token)
+        claims = await verify_token(token_verifier, token)
+        tracing.set_user(claims['sub'])
+        return claims
+    except ServiceUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+async def get_remote_user(
+    authorization: str = Header(None),
+    supabase = Depends(get_supabase)
+):
+    """Fetch the user from Supabase Auth, which also catches revoked sessions"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="No authorization header")
+    
+    try:
+        # Extract token from "Bearer <token>"
+        token = authorization.split(" ")[1]
+        user = await fetch_auth_user(supabase, token)
         return user
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.get("/auth/user")
-async def get_user(user = Depends(get_current_user)):
+async def get_user(user = Depends(get_remote_user)):
     return user.dict()
 
 @router.post("/auth/generate-pairing-code")
 async def generate_code(user = Depends(get_current_user)):
     try:
-        user_id = user.user.id
-        code = generate_pairing_code()
-
-        # First check if profile exists
-        profile = supabase.table('profiles').select('*').eq('id', user_id).execute()
+        user_id = user['sub']
 
-        if not profile.data or len(profile.data) == 0:
-            # Create profile if it doesn't exist
-            profile = supabase.table('profiles').insert({
+        # Create or update the profile in one upsert. pair_code is unique, so
+        # in the unlikely event of a collision just try another code.
+        for _ in range(PAIR_CODE_ATTEMPTS):
+            code = generate_pairing_code()
+            profile = {
                 'id': user_id,
-                'email': user.user.email,
-                'pair_code': code,
-                'paired': False,
-                'points': 0
-            }).execute()
-        else:
-            # Update existing profile
-            profile = supabase.table('profiles').update({
                 'pair_code': code,
                 'paired': False
-            }).eq('id', user_id).execute()
+            }
+            if user.get('email'):
+                profile['email'] = user['email']
 
-        if not profile.data:
-            raise HTTPException(status_code=500, detail="Failed to update profile")
+            if await Database().upsert('profiles', profile):
+                User.invalidate_cache(user_id)
+                return {"pair_code": code}
 
-        return {"pair_code": code}
-    except HTTPException as e:
-        raise e
+        raise HTTPException(status_code=500, detail="Failed to update profile")
+    except (HTTPException, ServiceUnavailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/auth/pair")
 async def pair_users(request: PairRequest, user = Depends(get_current_user)):
     try:
-        user_id = user.user.id
-
-        # Find partner by pairing code
-        partner = supabase.table('profiles').select('*').eq('pair_code', request.partner_code).execute()
-        
-        if not partner.data or len(partner.data) == 0:
-            raise HTTPException(status_code=404, detail="Invalid pairing code")
-
-        partner_id = partner.data[0]['id']
-        
-        if user_id == partner_id:
-            raise HTTPException(status_code=400, detail="Cannot pair with yourself")
-
-        # Check if there's already a pending request
-        existing_request = supabase.table('pairings') \
-            .select('*') \
-            .eq('user_id', user_id) \
-            .eq('partner_id', partner_id) \
-            .execute()
-
-        if not existing_request.data:
-            # Check the reverse relationship
-            existing_request = supabase.table('pairings') \
-                .select('*') \
-                .eq('user_id', partner_id) \
-                .eq('partner_id', user_id) \
-                .execute()
-
-        if existing_request.data and len(existing_request.data) > 0:
-            raise HTTPException(status_code=400, detail="A pairing request already exists between these users")
-
-        # Create a pending pairing request
-        pairing_data = {
-            'user_id': user_id,  # requester
-            'partner_id': partner_id,  # target partner
-            'status': 'pending'
-        }
-        
-        # Create the pairing request
-        supabase.table('pairings').insert(pairing_data).execute()
+        user_id = user['sub']
+
+        # Look up the code, check for existing pairings and create the
+        # pending request in one transaction
+        result = await Database().rpc('request_pairing', {
+            'p_user_id': user_id,
+            'p_pair_code': request.partner_code
+        })
+        if result is None:
+            raise HTTPException(status_code=500, detail="Failed to send pairing request")
+        if 'error' in result:
+            status_code, detail = PAIRING_ERRORS[result['error']]
+            raise HTTPException(status_code=status_code, detail=detail)
+
+        partner_id = result['partner_id']
+        User.invalidate_cache(user_id, partner_id)
+        hub.publish([user_id, partner_id], 'pairing.requested', {
+            'requester_id': user_id,
+            'partner_id': partner_id
+        })
 
         return {
             "status": "pending",
             "message": "Pairing request sent. Waiting for partner to accept.",
             "partner_id": partner_id
         }
-    except HTTPException as e:
-        raise e
+    except (HTTPException, ServiceUnavailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/auth/accept-pair")
 async def accept_pairing(user = Depends(get_current_user)):
     try:
-        user_id = user.user.id
-
-        # Find pending request where this user is the target
-        pending = supabase.table('pairings').select('*').eq('partner_id', user_id).eq('status', 'pending').execute()
-
-        if not pending.data or len(pending.data) == 0:
-            raise HTTPException(status_code=404, detail="No pending pairing requests found")
-
-        pairing = pending.data[0]
-        requester_id = pairing['user_id']
-
-        # Update the pairing status to approved
-        supabase.table('pairings').update({
-            'status': 'approved'
-        }).eq('id', pairing['id']).execute()
-
-        # Update both users' profiles
-        supabase.table('profiles').update({'paired': True}).eq('id', user_id).execute()
-        supabase.table('profiles').update({'paired': True}).eq('id', requester_id).execute()
+        user_id = user['sub']
+
+        # Approve the pending request and mark both profiles paired in one transaction
+        result = await Database().rpc('accept_pairing', {'p_user_id': user_id})
+        if result is None:
+            raise HTTPException(status_code=500, detail="Failed to accept pairing request")
+        if 'error' in result:
+            status_code, detail = PAIRING_ERRORS[result['error']]
+            raise HTTPException(status_code=status_code, detail=detail)
+
+        requester_id = result['partner_id']
+        User.invalidate_cache(user_id, requester_id)
+        hub.publish([user_id, requester_id], 'pairing.accepted', {
+            'requester_id': requester_id,
+            'partner_id': user_id
+        })
 
         return {
             "status": "success",
             "message": "Pairing request accepted",
             "partner_id": requester_id
         }
-    except HTTPException as e:
-        raise e
+    except (HTTPException, ServiceUnavailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/auth/pending-pair")
-async def get_pending_pair(user = Depends(get_current_user)):
+async def get_pending_pair(
+    request: Request,
+    response: Response,
+    user = Depends(get_current_user)
+):
     try:
-        user_id = user.user.id
+        user_id = user['sub']
+
+        # Answer repeat polls from the user's version tag alone
+        tag = etag(request, await User.version(user_id))
+        cached = not_modified(request, tag)
+        if cached:
+            return cached
+        response.headers.update(cache_headers(tag))
 
         # Check for pending requests where this user is the target
-        pending = supabase.table('pairings').select('*,profiles!pairings_user_id_fkey(*)').eq('partner_id', user_id).eq('status', 'pending').execute()
+        pending = await Database().fetch_one(
+            'pairings',
+            {'partner_id': user_id, 'status': 'pending'},
+            columns=['user_id'],
+            order=[asc('created_at')]
+        )
+
+        if not pending:
+            return {"has_pending": False}
 
-        if not pending.data or len(pending.data) == 0:
+        # The requester's profile usually comes from the profile cache
+        requester = await User.get_by_id(pending['user_id'])
+        if not requester:
             return {"has_pending": False}
 
-        requester = pending.data[0]['profiles']
         return {
             "has_pending": True,
             "requester": {
-                "id": requester['id'],
-                "email": requester['email']
+                "id": requester.id,
+                "email": requester.profile.email
             }
         }
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
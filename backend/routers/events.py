@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from pubsub import hub
+from models.user import User
+from dependencies import get_current_user
+
+router = APIRouter(tags=["events"])
+
+@router.get("/events")
+async def stream_events(current_user: User = Depends(get_current_user)):
+    """Push task and pairing changes for the current user as server-sent events.
+
+    Events: task.created, task.updated, task.completed, task.deleted,
+    pairing.requested, pairing.accepted, and reset when the connection fell
+    too far behind and the client should refetch. A comment line is sent as
+    a heartbeat when nothing else happens.
+    """
+    return StreamingResponse(
+        hub.stream(current_user.id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx-style proxies from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from typing import Optional
+from models.points import PointsLedger
+from models.user import User
+from dependencies import get_current_user, etag, cache_headers, not_modified
+
+router = APIRouter(prefix="/points", tags=["points"])
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_points(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the current user's balance and one page of their point history.
+
+    History is newest first; the cursor for the next page is returned in the
+    X-Next-Cursor header. Responses carry an ETag derived from the user's
+    version tag, which changes whenever they are awarded points.
+    """
+    tag = etag(request, await User.version(current_user.id))
+    cached = not_modified(request, tag)
+    if cached:
+        return cached
+
+    try:
+        history, next_cursor = await PointsLedger.get_history(current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+    # Fresh from the database: the cached profile can lag writes on other workers
+    balances = await PointsLedger.balances([current_user.id])
+
+    headers = cache_headers(tag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return ORJSONResponse(
+        {"balance": balances.get(current_user.id, current_user.profile.points), "history": history},
+        headers=headers
+    )
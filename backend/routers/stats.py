@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import ORJSONResponse
+from datetime import datetime, timezone
+from models.points import PointsLedger
+from models.stats import TaskStats
+from models.user import User
+from dependencies import get_current_user, etag, cache_headers, not_modified
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+DEFAULT_WEEKS = 8
+MAX_WEEKS = 52
+
+async def _pair_etag(request: Request, current_user: User, partner) -> str:
+    # Either user's tasks or points changing moves one of their versions, and
+    # streaks and weeks roll over with the UTC date
+    user_ids = [current_user.id] + ([partner.id] if partner else [])
+    today = datetime.now(timezone.utc).date()
+    return etag(request, f"{await User.version(*user_ids)}@{today}")
+
+@router.get("/", response_class=ORJSONResponse)
+async def get_stats(
+    request: Request,
+    weeks: int = Query(DEFAULT_WEEKS, ge=1, le=MAX_WEEKS),
+    current_user: User = Depends(get_current_user)
+):
+    """Task counts by status, weekly completions and points, and streaks for
+    the current user, their partner and the pair.
+
+    Served from aggregates the database keeps up to date as tasks change, so
+    the cost doesn't grow with the number of tasks.
+    """
+    partner = await current_user.get_partner()
+    tag = await _pair_etag(request, current_user, partner)
+    cached = not_modified(request, tag)
+    if cached:
+        return cached
+
+    user_ids = [current_user.id] + ([partner.id] if partner else [])
+    stats = await TaskStats.get_for_users(user_ids, weeks)
+    pair = await TaskStats.get_for_pair(current_user.id, partner.id) if partner else None
+
+    return ORJSONResponse(
+        {
+            "user": stats[current_user.id],
+            "partner": stats[partner.id] if partner else None,
+            "pair": pair
+        },
+        headers=cache_headers(tag)
+    )
+
+@router.get("/leaderboard", response_class=ORJSONResponse)
+async def get_leaderboard(
+    request: Request,
+    weeks: int = Query(1, ge=1, le=MAX_WEEKS),
+    current_user: User = Depends(get_current_user)
+):
+    """The current user and their partner ranked by points earned over the
+    last `weeks` weeks (this week by default), then by tasks completed"""
+    partner = await current_user.get_partner()
+    tag = await _pair_etag(request, current_user, partner)
+    cached = not_modified(request, tag)
+    if cached:
+        return cached
+
+    users = [current_user] + ([partner] if partner else [])
+    user_ids = [user.id for user in users]
+    stats = await TaskStats.get_for_users(user_ids, weeks)
+    # Fresh from the database: cached profiles can lag writes on other workers
+    balances = await PointsLedger.balances(user_ids)
+    entries = [
+        {
+            "user_id": user.id,
+            "email": user.profile.email,
+            "points_earned": stats[user.id]["points_earned"],
+            "tasks_completed": stats[user.id]["tasks_completed"],
+            "streak": stats[user.id]["streak"]["current"],
+            "balance": balances.get(user.id, user.profile.points)
+        }
+        for user in users
+    ]
+    entries.sort(key=lambda entry: (-entry["points_earned"], -entry["tasks_completed"]))
+    for rank, entry in enumerate(entries, start=1):
+        entry["rank"] = rank
+
+    return ORJSONResponse(entries, headers=cache_headers(tag))
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import Any, Dict, List, Optional
 from models.task import Task, TaskCreate
 from models.user import User
-from dependencies import get_current_user
+from dependencies import get_current_user, etag, cache_headers, not_modified
+import orjson
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 100
+
 @router.post("/")
 async def create_task(
     task_data: TaskCreate,
@@ -25,29 +32,148 @@ async def create_task(
         
     return {"id": task.id, "message": "Task created successfully"}
 
-@router.get("/active")
+@router.post("/batch")
+async def create_tasks(
+    items: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Create several tasks with a single multi-row insert.
+
+    Each item is validated on its own; invalid items are reported in the
+    results by index and the valid ones are still created.
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"At most {MAX_BATCH_SIZE} tasks can be created at once")
+        
+    # Get the assignee once for the whole batch (must be the partner)
+    assignee = await current_user.get_partner()
+    if not assignee:
+        raise HTTPException(400, "You must be paired to create tasks")
+        
+    results: List[Optional[dict]] = [None] * len(items)
+    tasks = []
+    indexes = []
+    for index, item in enumerate(items):
+        try:
+            task_data = TaskCreate(**item)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "error": "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                    for error in e.errors()
+                )
+            }
+            continue
+        tasks.append(Task.from_create_request(task_data, current_user, assignee))
+        indexes.append(index)
+        
+    if tasks and not await Task.save_many(tasks):
+        raise HTTPException(500, "Failed to create tasks")
+        
+    for index, task in zip(indexes, tasks):
+        results[index] = {"index": index, "id": task.id}
+        
+    return {"created": len(tasks), "results": results}
+
+@router.post("/batch/complete")
+async def complete_tasks(
+    ids: List[str] = Body(..., embed=True),
+    current_user: User = Depends(get_current_user)
+):
+    """Complete several tasks, awarding each one's points to its creator"""
+    task_ids = _unique_ids(ids)
+    tasks = await Task.get_many(task_ids, current_user)
+    
+    completed = await Task.complete_many(tasks, current_user)
+    if completed is None:
+        raise HTTPException(500, "Failed to complete tasks")
+        
+    return {"results": _batch_results(task_ids, tasks, completed, "Cannot complete this task")}
+
+@router.post("/batch/delete")
+async def delete_tasks(
+    ids: List[str] = Body(..., embed=True),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete several tasks. Only the creator can delete their tasks."""
+    task_ids = _unique_ids(ids)
+    tasks = await Task.get_many(task_ids, current_user)
+    
+    deleted = await Task.delete_many(tasks, current_user)
+    
+    return {"results": _batch_results(
+        task_ids, tasks, deleted, "Only the task creator can delete active tasks"
+    )}
+
+def _unique_ids(ids: List[str]) -> List[str]:
+    task_ids = list(dict.fromkeys(ids))
+    if len(task_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"At most {MAX_BATCH_SIZE} tasks can be changed at once")
+    return task_ids
+
+def _batch_results(
+    task_ids: List[str],
+    tasks: List[Task],
+    succeeded: List[str],
+    error: str
+) -> List[dict]:
+    """Per-task outcome of a batch operation, in request order"""
+    found = {task.id for task in tasks}
+    succeeded = set(succeeded)
+    results = []
+    for task_id in task_ids:
+        if task_id in succeeded:
+            results.append({"id": task_id, "ok": True})
+        elif task_id in found:
+            results.append({"id": task_id, "ok": False, "error": error})
+        else:
+            results.append({"id": task_id, "ok": False, "error": "Task not found"})
+    return results
+
+@router.get("/active", response_class=ORJSONResponse)
 async def get_active_tasks(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
     current_user: User = Depends(get_current_user)
 ) -> List[dict]:
-    """Get all active tasks for the current user"""
-    tasks = await Task.get_active_tasks(current_user)
-    return [
-        {
-            "id": task.id,
-            "title": task.data.title,
-            "description": task.data.description,
-            "points": task.data.points,
-            "creator_id": task.data.creator_id,
-            "assignee_id": task.data.assignee_id,
-            "status": task.data.status,
-            "validation_required": task.data.validation_required,
-            "random_payout": task.data.random_payout,
-            "min_points": task.data.min_points,
-            "max_points": task.data.max_points,
-            "due_date": task.data.due_date
-        }
-        for task in tasks
-    ]
+    """Get active tasks for the current user, one page at a time.
+
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    With stream=true the remaining tasks are sent as NDJSON, one line per
+    task, fetching `limit` rows from the database at a time.
+
+    Rows are encoded straight from the database with orjson, without going
+    through Pydantic models or FastAPI's encoder. Pages carry an ETag derived
+    from the user's version tag, so a matching If-None-Match gets a 304
+    without querying the tasks table.
+    """
+    if not stream:
+        tag = etag(request, await User.version(current_user.id))
+        cached = not_modified(request, tag)
+        if cached:
+            return cached
+
+    try:
+        rows, next_cursor = await Task.get_active_rows(current_user, limit, cursor)
+    except ValueError:
+        raise HTTPException(400, "Invalid cursor")
+
+    if stream:
+        async def lines():
+            for row in rows:
+                yield orjson.dumps(row) + b"\n"
+            if next_cursor:
+                async for row in Task.iter_active_rows(current_user, limit, next_cursor):
+                    yield orjson.dumps(row) + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+        
+    headers = cache_headers(tag)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return ORJSONResponse(rows, headers=headers)
 
 @router.post("/{task_id}/complete")
 async def complete_task(
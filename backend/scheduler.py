@@ -0,0 +1,238 @@
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from datetime import datetime, timezone
+from metrics import SCHEDULED_DUE_DATES, TASKS_OVERDUE
+from models.database import Database
+from models.query import and_, asc, eq, is_null, lte
+from pubsub import hub
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns needed to schedule a task
+DUE_COLUMNS = ["id", "creator_id", "assignee_id", "due_date"]
+
+OVERDUE = "overdue"
+DUE_SOON = "due_soon"
+
+# Heap entries: (fire at, tie-breaker, task id, kind, due date they were pushed for)
+Entry = Tuple[float, int, str, str, float]
+
+def _timestamp(value: Union[datetime, str]) -> float:
+    """Seconds since the epoch; naive due dates are UTC, as in Postgres"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+class DueDateScheduler:
+    """Marks tasks overdue as soon as their due date passes, without polling.
+
+    The due dates of active tasks are kept in a min-heap and the run loop
+    sleeps until the earliest one. Only tasks due within ``window`` seconds
+    are held: they are loaded from the database when the loop starts and
+    again every half window, and Task.save, complete and delete add and drop
+    entries in between. Tasks that come due together are marked with one
+    mark_tasks_overdue call per ``batch_size`` tasks, and both users get a
+    ``task.overdue`` event. With ``reminder`` set, a ``task.due_soon`` event
+    is sent that many seconds before the due date too.
+
+    Each replica runs its own scheduler. Marking only applies to active,
+    unmarked tasks, so a task marked by one replica is skipped by the rest.
+    All methods run on the event loop thread.
+    """
+
+    def __init__(
+        self,
+        window: float = 86400.0,
+        reminder: float = 3600.0,
+        batch_size: int = 100,
+        max_tasks: int = 10000,
+        retry_delay: float = 30.0
+    ):
+        self.window = window
+        self.reminder = reminder
+        self.batch_size = batch_size
+        self.max_tasks = max_tasks
+        self.retry_delay = retry_delay
+        self._heap: List[Entry] = []
+        # Due date and users of every scheduled task
+        self._tasks: Dict[str, Tuple[float, Tuple[str, str]]] = {}
+        self._ids = itertools.count()
+        # Tasks due up to here are in the heap; later ones come with a later load
+        self._horizon = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def running(self) -> bool:
+        return self._wakeup is not None
+
+    def schedule(
+        self,
+        task_id: str,
+        due_date: Optional[Union[datetime, str]],
+        user_ids: Iterable[str]
+    ) -> None:
+        """Fire an active task at its due date; a no-op while the scheduler isn't running"""
+        if not self.running:
+            return
+        if due_date is None:
+            self.cancel(task_id)
+            return
+        due = _timestamp(due_date)
+        scheduled = self._tasks.get(task_id)
+        if scheduled and scheduled[0] == due:
+            return
+        if due > self._horizon:
+            self.cancel(task_id)
+            return
+
+        self._tasks[task_id] = (due, tuple(user_ids))
+        self._push(due, task_id, OVERDUE, due)
+        if self.reminder > 0 and due - self.reminder > time.time():
+            self._push(due - self.reminder, task_id, DUE_SOON, due)
+        SCHEDULED_DUE_DATES.set(len(self._tasks))
+
+    def cancel(self, task_id: str) -> None:
+        """Stop tracking a task; its heap entries are skipped when they come up"""
+        if self._tasks.pop(task_id, None) is None:
+            return
+        SCHEDULED_DUE_DATES.set(len(self._tasks))
+        # Rebuild once the skipped entries outnumber the live ones
+        if len(self._heap) > 2 * len(self._tasks) + 64:
+            self._heap = [entry for entry in self._heap if self._live(entry)]
+            heapq.heapify(self._heap)
+
+    def _push(self, fire_at: float, task_id: str, kind: str, due: float) -> None:
+        earliest = not self._heap or fire_at < self._heap[0][0]
+        heapq.heappush(self._heap, (fire_at, next(self._ids), task_id, kind, due))
+        if earliest:
+            self._wakeup.set()
+
+    def _live(self, entry: Entry) -> bool:
+        scheduled = self._tasks.get(entry[2])
+        return scheduled is not None and scheduled[0] == entry[4]
+
+    async def run(self) -> None:
+        """Load the window and fire tasks as they come due until cancelled"""
+        self._wakeup = asyncio.Event()
+        try:
+            load_at = 0.0
+            while True:
+                now = time.time()
+                if now >= load_at:
+                    load_at = await self._load(now)
+                    continue
+
+                entries = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if self._live(entry):
+                        entries.append(entry)
+                if entries:
+                    await self._fire(entries, now)
+                    continue
+
+                wake_at = min(load_at, self._heap[0][0]) if self._heap else load_at
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wake_at - now)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+            self._heap.clear()
+            self._tasks.clear()
+            self._horizon = 0.0
+            SCHEDULED_DUE_DATES.set(0)
+
+    async def _load(self, now: float) -> float:
+        """Schedule the unmarked active tasks due within the window, including
+        any that passed while no scheduler ran, and return when to load again"""
+        horizon = now + self.window
+        try:
+            rows = await Database().fetch_many(
+                "tasks",
+                and_(
+                    eq("status", "active"),
+                    is_null("overdue_at"),
+                    lte("due_date", _isoformat(horizon))
+                ),
+                columns=DUE_COLUMNS,
+                order=[asc("due_date")],
+                limit=self.max_tasks
+            )
+        except Exception as e:
+            logger.warning("Error loading due dates: %s", e)
+            return now + self.retry_delay
+
+        if len(rows) >= self.max_tasks:
+            # Hold no more than max_tasks; the rest load once these are due
+            horizon = _timestamp(rows[-1]["due_date"])
+        self._horizon = horizon
+        for row in rows:
+            self.schedule(row["id"], row["due_date"], (row["creator_id"], row["assignee_id"]))
+        logger.debug("Scheduled %d due dates up to %s", len(self._tasks), _isoformat(horizon))
+        return max(min(now + self.window / 2, horizon), now + 1)
+
+    async def _fire(self, entries: List[Entry], now: float) -> None:
+        overdue = []
+        for _, _, task_id, kind, due in entries:
+            if kind == DUE_SOON:
+                hub.publish(self._tasks[task_id][1], "task.due_soon", {
+                    "id": task_id,
+                    "due_date": _isoformat(due)
+                })
+            else:
+                overdue.append(task_id)
+
+        overdue = list(dict.fromkeys(overdue))
+        for start in range(0, len(overdue), self.batch_size):
+            await self._mark(overdue[start:start + self.batch_size], now)
+
+    async def _mark(self, task_ids: List[str], now: float) -> None:
+        """Mark a batch overdue in one call and tell both users of each task"""
+        try:
+            rows = await Database().rpc("mark_tasks_overdue", {
+                "p_task_ids": task_ids,
+                "p_now": _isoformat(now)
+            })
+        except Exception as e:
+            logger.warning("Error marking tasks overdue: %s", e)
+            rows = None
+
+        if rows is None:
+            for task_id in task_ids:
+                scheduled = self._tasks.get(task_id)
+                if scheduled:
+                    self._push(now + self.retry_delay, task_id, OVERDUE, scheduled[0])
+            return
+
+        for row in rows:
+            hub.publish((row["creator_id"], row["assignee_id"]), "task.overdue", {
+                "id": row["id"],
+                "due_date": row["due_date"],
+                "overdue_at": row["overdue_at"]
+            })
+        TASKS_OVERDUE.inc(amount=len(rows))
+
+        # Tasks not returned were completed, deleted or marked elsewhere
+        for task_id in task_ids:
+            self._tasks.pop(task_id, None)
+        SCHEDULED_DUE_DATES.set(len(self._tasks))
+
+due_dates = DueDateScheduler(
+    window=float(os.getenv("DUE_DATE_WINDOW", "86400")),
+    reminder=float(os.getenv("DUE_DATE_REMINDER", "3600")),
+    batch_size=int(os.getenv("DUE_DATE_BATCH_SIZE", "100")),
+    max_tasks=int(os.getenv("DUE_DATE_MAX_TASKS", "10000")),
+    retry_delay=float(os.getenv("DUE_DATE_RETRY_DELAY", "30"))
+)
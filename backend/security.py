@@ -0,0 +1,101 @@
+from typing import Optional, Dict, Any
+from collections import OrderedDict
+from jose import jwt, JWTError
+from resilience import ServiceUnavailableError, auth_calls
+import hashlib
+import httpx
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+JWKS_MIN_REFRESH = 30.0
+
+class TokenVerifier:
+    """Verify Supabase access tokens locally instead of calling the auth server.
+
+    Signatures are checked against the project's JWT secret (HS256) or its
+    JWKS (asymmetric signing keys), and verified claims are kept in a bounded
+    LRU cache keyed by token hash until the token expires.
+    """
+
+    def __init__(
+        self,
+        jwt_secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: str = "authenticated",
+        cache_size: int = 10000,
+        jwks_ttl: float = 600.0
+    ):
+        self.jwt_secret = jwt_secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.cache_size = cache_size
+        self.jwks_ttl = jwks_ttl
+        self._cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._jwks: Optional[Dict[str, Any]] = None
+        self._jwks_fetched_at = 0.0
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return the verified claims of a token, raising JWTError if invalid"""
+        key = hashlib.sha256(token.encode()).digest()
+        claims = self._cache.get(key)
+        if claims is not None:
+            if claims["exp"] > time.time():
+                self._cache.move_to_end(key)
+                return claims
+            del self._cache[key]
+
+        claims = await self._decode(token)
+        if "exp" not in claims or "sub" not in claims:
+            raise JWTError("Token is missing required claims")
+
+        self._cache[key] = claims
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return claims
+
+    async def _decode(self, token: str) -> Dict[str, Any]:
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            if not self.jwt_secret:
+                raise JWTError("No JWT secret configured for HS256 tokens")
+            return jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience)
+
+        if algorithm not in ASYMMETRIC_ALGORITHMS:
+            raise JWTError(f"Unsupported token algorithm: {algorithm}")
+        if not self.jwks_url:
+            raise JWTError(f"No JWKS configured for {algorithm} tokens")
+
+        jwks = await self._get_jwks()
+        kid = header.get("kid")
+        if kid and not any(k.get("kid") == kid for k in jwks.get("keys", [])):
+            # The signing keys may have been rotated since we last fetched them
+            jwks = await self._get_jwks(refresh=True)
+        return jwt.decode(token, jwks, algorithms=ASYMMETRIC_ALGORITHMS, audience=self.audience)
+
+    async def _get_jwks(self, refresh: bool = False) -> Dict[str, Any]:
+        age = time.monotonic() - self._jwks_fetched_at
+        # Forced refreshes are rate limited so bogus kids can't hammer the auth server
+        if self._jwks is None or age > self.jwks_ttl or (refresh and age > JWKS_MIN_REFRESH):
+            try:
+                self._jwks = await auth_calls.call("jwks", self._fetch_jwks, idempotent=True)
+            except ServiceUnavailableError as e:
+                if self._jwks is None:
+                    raise
+                # Keys rotate rarely; keep verifying with the ones we have
+                logger.warning("Using stale JWKS: %s", e)
+            self._jwks_fetched_at = time.monotonic()
+        return self._jwks
+
+    async def _fetch_jwks(self) -> Dict[str, Any]:
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+            return response.json()
+
+    def clear(self) -> None:
+        """Forget all cached verifications"""
+        self._cache.clear()
@@ -0,0 +1,93 @@
+from typing import Callable, Dict, Tuple
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from models.cache import partner_cache, profile_cache
+from models.database import Database
+import asyncio
+import config
+import pytest
+import time
+
+JWT_SECRET = "test-secret"
+
+Headers = Dict[str, str]
+
+class FakeClock:
+    """Stands in for the time module: both clocks only move when advanced"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+def sign(user_id: str, expires_in: float = 3600, **claims) -> str:
+    """An access token for user_id signed like Supabase Auth's HS256 tokens"""
+    return jwt.encode({
+        "sub": user_id,
+        "aud": "authenticated",
+        "email": f"{user_id}@example.com",
+        "exp": int(time.time() + expires_in),
+        **claims
+    }, JWT_SECRET, algorithm="HS256")
+
+@pytest.fixture
+def login() -> Callable[[str], Headers]:
+    return lambda user_id: {"Authorization": f"Bearer {sign(user_id)}"}
+
+@pytest.fixture
+def environment(tmp_path, monkeypatch) -> None:
+    """Settings for a fresh SQLite database, without Supabase"""
+    monkeypatch.setenv("DATABASE_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "toucan.db"))
+    # Empty rather than unset so a local .env can't fill them in
+    monkeypatch.setenv("SUPABASE_URL", "")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "")
+    monkeypatch.setenv("SUPABASE_JWT_SECRET", JWT_SECRET)
+    monkeypatch.setenv("POINTS_COMPACT_INTERVAL", "0")
+    monkeypatch.setenv("RATE_LIMIT_RPS", "0")
+    monkeypatch.setattr(config, "_settings", None)
+    monkeypatch.setattr(Database, "_instance", None)
+    profile_cache.clear()
+    partner_cache.clear()
+    yield
+    profile_cache.clear()
+    partner_cache.clear()
+
+@pytest.fixture
+def database(environment) -> Database:
+    """The Database singleton on its own SQLite file, for model tests"""
+    database = Database.configure(None, config.get_settings())
+    yield database
+    asyncio.run(database.close())
+
+@pytest.fixture
+def app(environment) -> FastAPI:
+    from main import create_app
+    return create_app()
+
+@pytest.fixture
+def client(app) -> TestClient:
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def pair(client, login) -> Tuple[Headers, Headers]:
+    """Headers for alice and bob, paired with each other"""
+    alice, bob = login("alice"), login("bob")
+    code = client.post("/auth/generate-pairing-code", headers=alice).json()["pair_code"]
+    client.post("/auth/generate-pairing-code", headers=bob)
+    assert client.post("/auth/pair", headers=bob, json={"partner_code": code}).status_code == 200
+    assert client.post("/auth/accept-pair", headers=alice).status_code == 200
+    return alice, bob
@@ -0,0 +1,138 @@
+from admission import AdmissionMiddleware, ConcurrencyLimit, TokenBuckets
+from fastapi.testclient import TestClient
+from jose import jwt
+import admission
+import asyncio
+import pytest
+import time
+
+@pytest.fixture
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(admission, "time", clock)
+    return clock
+
+def test_buckets_allow_a_burst_then_the_rate(fake_time):
+    buckets = TokenBuckets(rate=2, burst=3)
+    assert [buckets.take("alice") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("alice") == 0.5
+    # Other clients have their own bucket
+    assert buckets.take("bob") == 0
+    fake_time.advance(0.5)
+    assert buckets.take("alice") == 0
+    fake_time.advance(10)
+    assert [buckets.take("alice") for _ in range(4)][-1] > 0
+
+def test_least_recent_clients_are_forgotten(fake_time):
+    buckets = TokenBuckets(rate=1, burst=1, max_clients=2)
+    for client in ("alice", "bob", "carol"):
+        buckets.take(client)
+    assert list(buckets._buckets) == ["bob", "carol"]
+    assert buckets.take("alice") == 0
+
+def test_concurrency_limit_queues_in_order():
+    async def main():
+        limit = ConcurrencyLimit(limit=1, max_queue=2, timeout=1)
+        order = []
+        assert await limit.acquire()
+
+        async def wait(name):
+            if await limit.acquire():
+                order.append(name)
+        waiters = [asyncio.ensure_future(wait(name)) for name in ("first", "second")]
+        await asyncio.sleep(0)
+        # Queue full
+        assert not await limit.acquire()
+        limit.release()
+        await asyncio.sleep(0)
+        limit.release()
+        await asyncio.gather(*waiters)
+        limit.release()
+        return order, limit.in_flight
+    assert asyncio.run(main()) == (["first", "second"], 0)
+
+def test_waiters_give_up_after_the_timeout():
+    async def main():
+        limit = ConcurrencyLimit(limit=1, max_queue=1, timeout=0.01)
+        await limit.acquire()
+        return await limit.acquire(), limit.in_flight, len(limit._waiters)
+    assert asyncio.run(main()) == (False, 1, 0)
+
+def test_rate_limits_are_per_verified_user(environment, monkeypatch, login):
+    monkeypatch.setenv("RATE_LIMIT_RPS", "0.001")
+    monkeypatch.setenv("RATE_LIMIT_BURST", "2")
+    from main import create_app
+    with TestClient(create_app()) as client:
+        alice, bob = login("alice"), login("bob")
+        code = "/auth/generate-pairing-code"
+        assert [client.post(code, headers=alice).status_code for _ in range(3)] == [200, 200, 429]
+        limited = client.post(code, headers=alice)
+        assert limited.status_code == 429
+        assert int(limited.headers["retry-after"]) >= 1
+        assert client.post(code, headers=bob).status_code == 200
+        assert client.get("/health").status_code == 200
+
+        # Unverifiable tokens share the caller's address bucket
+        forged = [
+            {"Authorization": "Bearer " + jwt.encode({"sub": str(i), "exp": time.time() + 60}, "wrong")}
+            for i in range(3)
+        ]
+        assert [client.post(code, headers=h).status_code for h in forged] == [401, 401, 429]
+
+@pytest.mark.parametrize("trusted, peer, forwarded, expected", [
+    (frozenset(), "10.0.0.1", "1.1.1.1", "10.0.0.1"),
+    (frozenset({"10.0.0.2"}), "10.0.0.1", "1.1.1.1", "10.0.0.1"),
+    (frozenset({"10.0.0.1"}), "10.0.0.1", "9.9.9.9, 1.1.1.1", "1.1.1.1"),
+    (frozenset({"10.0.0.1", "10.0.0.5"}), "10.0.0.1", "9.9.9.9, 1.1.1.1, 10.0.0.5", "1.1.1.1"),
+    (frozenset({"*"}), "10.0.0.1", "9.9.9.9, 1.1.1.1", "1.1.1.1"),
+    (frozenset({"*"}), "10.0.0.1", None, "10.0.0.1"),
+])
+def test_client_address_trusts_only_configured_proxies(trusted, peer, forwarded, expected):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    scope = {"headers": headers, "client": (peer, 1234)}
+    assert admission._client_address(scope, trusted) == expected
+
+def test_forwarded_clients_get_their_own_buckets(environment, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_RPS", "0.001")
+    monkeypatch.setenv("RATE_LIMIT_BURST", "1")
+    monkeypatch.setenv("TRUSTED_PROXIES", "*")
+    from main import create_app
+    with TestClient(create_app()) as client:
+        def status(address):
+            return client.get("/tasks/active", headers={"X-Forwarded-For": address}).status_code
+        assert [status("1.1.1.1"), status("1.1.1.1")] == [403, 429]
+        assert status("2.2.2.2") == 403
+        # A made-up address on the left doesn't buy a fresh bucket
+        assert status("3.3.3.3, 2.2.2.2") == 429
+
+def test_overload_is_shed_with_503(environment, monkeypatch):
+    monkeypatch.setenv("ADMISSION_MAX_IN_FLIGHT", "1")
+    monkeypatch.setenv("ADMISSION_MAX_QUEUE", "0")
+
+    async def main():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        middleware = AdmissionMiddleware(slow_app)
+
+        async def request(path="/tasks/active"):
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+            scope = {"type": "http", "path": path, "headers": [], "client": ("10.0.0.1", 1234)}
+            await middleware(scope, None, send)
+            return sent[0]["status"], dict(sent[0]["headers"])
+
+        first = asyncio.ensure_future(request())
+        await asyncio.sleep(0)
+        shed = await request()
+        release.set()
+        # Streams and exempt paths skip the cap
+        return (await first)[0], shed, (await request("/events"))[0], (await request("/health"))[0]
+    first, (status, headers), stream, health = asyncio.run(main())
+    assert first == 200
+    assert status == 503 and headers[b"retry-after"] == b"2"
+    assert stream == health == 200
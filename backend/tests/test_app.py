@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from models.database import Database, create_backend
+from models.points import PointsLedger
+import asyncio
+import config
+import main
+import os
+import pytest
+import subprocess
+import sys
+
+def test_importing_the_app_creates_no_clients():
+    # A fresh interpreter: this one has long since imported everything
+    code = "import main, sys; print(sorted(m for m in ('supabase', 'postgrest', 'gotrue') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={"PATH": "", "LOG_LEVEL": "ERROR"}
+    )
+    assert result.stdout.strip() == "[]"
+
+def test_lifespan_shares_one_client(app, monkeypatch):
+    created = []
+
+    def create_supabase_client(settings):
+        created.append(object())
+        return created[-1]
+    monkeypatch.setattr(main, "create_supabase_client", create_supabase_client)
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert client.get("/").json() == {"status": "online"}
+        assert app.state.supabase is created[0]
+        assert Database().client is created[0]
+        backend = Database().backend
+    assert len(created) == 1
+    # The database is closed on shutdown
+    assert backend._conn is None
+
+def test_shutdown_waits_for_background_tasks(app, monkeypatch):
+    monkeypatch.setenv("POINTS_COMPACT_INTERVAL", "60")
+    started, finished = asyncio.Event(), []
+
+    async def compact_periodically(interval):
+        started.set()
+        try:
+            await asyncio.sleep(interval)
+        finally:
+            # Cancelled tasks may still be finishing a database call
+            finished.append(await Database().backend.select("profiles", {}))
+    monkeypatch.setattr(PointsLedger, "compact_periodically", compact_periodically)
+
+    with TestClient(app) as client:
+        client.portal.call(started.wait)
+        backend = Database().backend
+    assert finished == [[]]
+    # Nothing reopened the database after it was closed
+    assert backend._conn is None
+
+def test_supabase_backend_needs_credentials(environment, monkeypatch):
+    monkeypatch.setenv("DATABASE_BACKEND", "supabase")
+    with pytest.raises(RuntimeError):
+        config.Settings()
+
+def test_backend_options_come_from_settings(environment, monkeypatch):
+    monkeypatch.setenv("DATABASE_BACKEND", "async")
+    monkeypatch.setenv("SUPABASE_URL", "http://db.test")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "service-key")
+    monkeypatch.setenv("DB_POOL_SIZE", "4")
+    monkeypatch.setenv("DB_POOL_WARM", "8")
+    monkeypatch.setenv("DB_TIMEOUT", "3")
+    monkeypatch.setenv("DB_HTTP2", "false")
+    backend = create_backend(None, config.Settings())
+    assert backend._limits.max_connections == 4
+    assert backend._warm_connections == 4
+    assert backend._timeout.read == 3
+    assert backend._http2 is False
+
+    monkeypatch.setenv("DB_POOL_SIZE", "many")
+    with pytest.raises(ValueError):
+        config.Settings()
@@ -0,0 +1,93 @@
+from models.backends import AsyncPostgrestBackend
+from models.query import desc, eq
+from resilience import is_transient
+import asyncio
+import httpx
+import json
+import pytest
+
+class PostgREST:
+    """Records requests and answers each with the next queued response"""
+
+    def __init__(self, *responses: httpx.Response):
+        self.requests = []
+        self.responses = list(responses)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+def backend(postgrest: PostgREST) -> AsyncPostgrestBackend:
+    backend = AsyncPostgrestBackend("http://db.test/", "service-key", http2=False)
+    backend._client = httpx.AsyncClient(
+        base_url=backend._base_url,
+        headers=backend._headers,
+        transport=httpx.MockTransport(postgrest)
+    )
+    return backend
+
+def test_select_compiles_the_query():
+    postgrest = PostgREST(httpx.Response(200, json=[{"id": "t1"}]))
+    rows = asyncio.run(backend(postgrest).select(
+        "tasks", {"status": "active"}, columns=["id"], order=[desc("created_at")], limit=10
+    ))
+    assert rows == [{"id": "t1"}]
+
+    request = postgrest.requests[0]
+    assert request.method == "GET"
+    assert request.url.path == "/rest/v1/tasks"
+    assert list(request.url.params.multi_items()) == [
+        ("select", "id"),
+        ("status", "eq.active"),
+        ("order", "created_at.desc.nullslast"),
+        ("limit", "10"),
+    ]
+    assert request.headers["apikey"] == "service-key"
+    assert request.headers["authorization"] == "Bearer service-key"
+    assert "prefer" not in request.headers
+
+def test_writes_ask_for_the_rows_back():
+    postgrest = PostgREST(
+        httpx.Response(201, json=[{"id": "t1"}]),
+        httpx.Response(200, json=[{"id": "t1"}]),
+        httpx.Response(204)
+    )
+    db = backend(postgrest)
+
+    async def writes():
+        await db.insert("tasks", [{"title": "a"}])
+        await db.upsert("profiles", {"id": "u1"}, on_conflict="id")
+        return await db.delete("tasks", eq("id", "t1"))
+    assert asyncio.run(writes()) == []
+
+    insert, upsert, delete = postgrest.requests
+    assert insert.method == "POST"
+    assert json.loads(insert.content) == [{"title": "a"}]
+    assert insert.headers["prefer"] == "return=representation"
+    assert upsert.url.params["on_conflict"] == "id"
+    assert upsert.headers["prefer"] == "return=representation,resolution=merge-duplicates"
+    assert delete.method == "DELETE"
+    assert delete.url.params["id"] == "eq.t1"
+
+def test_rpc():
+    postgrest = PostgREST(httpx.Response(200, json={"points": 5}), httpx.Response(204))
+    db = backend(postgrest)
+    assert asyncio.run(db.rpc("complete_task", {"p_task_id": "t1"})) == {"points": 5}
+    assert asyncio.run(db.rpc("noop", {})) is None
+    assert postgrest.requests[0].url.path == "/rest/v1/rpc/complete_task"
+    assert json.loads(postgrest.requests[0].content) == {"p_task_id": "t1"}
+
+def test_server_errors_are_transient():
+    postgrest = PostgREST(httpx.Response(503), httpx.Response(400))
+    db = backend(postgrest)
+    with pytest.raises(httpx.HTTPStatusError) as unavailable:
+        asyncio.run(db.select("tasks", {}))
+    assert is_transient(unavailable.value)
+    with pytest.raises(httpx.HTTPStatusError) as bad_request:
+        asyncio.run(db.select("tasks", {}))
+    assert not is_transient(bad_request.value)
+
+def test_close_releases_the_pool():
+    db = backend(PostgREST())
+    asyncio.run(db.close())
+    assert db._client is None
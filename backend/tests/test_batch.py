@@ -0,0 +1,85 @@
+import re
+
+def test_batch_creates_valid_items_in_one_insert(client, pair):
+    alice, bob = pair
+    response = client.post("/tasks/batch", headers=alice, json=[
+        {"title": "Dishes", "description": "", "points": 3},
+        {"title": "Negative", "description": "", "points": -1},
+        {"description": "No title", "points": 1},
+        {"title": "Laundry", "description": "", "points": 4, "due_date": "2030-01-01T00:00:00Z"},
+    ])
+    assert response.status_code == 200
+    assert re.search(r'db\.tasks\.insert;dur=[\d.]+;desc="1x"', response.headers["server-timing"])
+
+    body = response.json()
+    assert body["created"] == 2
+    created, negative, untitled, dated = body["results"]
+    assert created["index"] == 0 and "id" in created
+    assert negative["index"] == 1 and "Points must be non-negative" in negative["error"]
+    assert untitled["index"] == 2 and "title" in untitled["error"]
+    assert dated["index"] == 3 and "id" in dated
+
+    active = {task["id"]: task for task in client.get("/tasks/active", headers=bob).json()}
+    assert active.keys() == {created["id"], dated["id"]}
+    assert active[dated["id"]]["assignee_id"] == "bob"
+
+def test_batch_size_is_limited(client, pair):
+    alice, _ = pair
+    items = [{"title": f"Task {i}", "description": "", "points": 1} for i in range(101)]
+    assert client.post("/tasks/batch", headers=alice, json=items).status_code == 400
+    assert client.get("/tasks/active", headers=alice).json() == []
+
+def test_batch_needs_a_partner(client, login):
+    carol = login("carol")
+    client.post("/auth/generate-pairing-code", headers=carol)
+    item = {"title": "Dishes", "description": "", "points": 1}
+    assert client.post("/tasks/batch", headers=carol, json=[item]).status_code == 400
+
+def create_tasks(client, headers, count: int, points: int = 2):
+    items = [{"title": f"Task {i}", "description": "", "points": points} for i in range(count)]
+    results = client.post("/tasks/batch", headers=headers, json=items).json()["results"]
+    return [result["id"] for result in results]
+
+def test_batch_complete(client, pair):
+    alice, bob = pair
+    mine = create_tasks(client, alice, 3)
+    theirs = create_tasks(client, bob, 1)
+    ids = mine + theirs + ["missing", mine[0]]
+
+    response = client.post("/tasks/batch/complete", headers=bob, json={"ids": ids})
+    assert re.search(r'db\.complete_tasks\.rpc;dur=[\d.]+;desc="1x"', response.headers["server-timing"])
+    assert response.json()["results"] == [
+        {"id": mine[0], "ok": True},
+        {"id": mine[1], "ok": True},
+        {"id": mine[2], "ok": True},
+        {"id": theirs[0], "ok": False, "error": "Cannot complete this task"},
+        {"id": "missing", "ok": False, "error": "Task not found"},
+    ]
+    # One ledger entry per task, all credited to the creator
+    points = client.get("/points/", headers=alice).json()
+    assert points["balance"] == 6
+    assert sorted(entry["task_id"] for entry in points["history"]) == sorted(mine)
+    assert client.get("/points/", headers=bob).json()["balance"] == 0
+
+    again = client.post("/tasks/batch/complete", headers=bob, json={"ids": mine[:1]}).json()
+    assert again["results"] == [{"id": mine[0], "ok": False, "error": "Cannot complete this task"}]
+
+def test_batch_delete(client, pair):
+    alice, bob = pair
+    mine = create_tasks(client, alice, 2)
+    theirs = create_tasks(client, bob, 1)
+
+    response = client.post("/tasks/batch/delete", headers=alice, json={"ids": mine + theirs})
+    assert re.search(r'db\.tasks\.delete;dur=[\d.]+;desc="1x"', response.headers["server-timing"])
+    assert response.json()["results"] == [
+        {"id": mine[0], "ok": True},
+        {"id": mine[1], "ok": True},
+        {"id": theirs[0], "ok": False, "error": "Only the task creator can delete active tasks"},
+    ]
+    assert [task["id"] for task in client.get("/tasks/active", headers=alice).json()] == theirs
+
+def test_batch_changes_are_limited(client, pair):
+    alice, _ = pair
+    ids = [f"task-{i}" for i in range(101)]
+    assert client.post("/tasks/batch/complete", headers=alice, json={"ids": ids}).status_code == 400
+    assert client.post("/tasks/batch/delete", headers=alice, json={"ids": ids}).status_code == 400
@@ -0,0 +1,77 @@
+from models.cache import MISSING, TTLCache, partner_cache, profile_cache
+from models.user import User
+import asyncio
+import models.cache
+import pytest
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(models.cache, "time", clock)
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", 1)
+    clock.advance(59)
+    assert cache.get("a") == 1
+    clock.advance(1)
+    assert cache.get("a") is MISSING
+    assert cache.stats()["size"] == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+def test_hits_misses_and_invalidation():
+    cache = TTLCache(max_size=10, ttl=60)
+    cache.set("a", None)
+    assert cache.get("a") is None
+    cache.invalidate("a")
+    assert cache.get("a", "default") == "default"
+    assert cache.stats() == {"size": 0, "max_size": 10, "ttl": 60, "hits": 1, "misses": 1}
+
+@pytest.fixture
+def profile_queries(database):
+    asyncio.run(database.insert("profiles", {"id": "alice", "email": "alice@example.com"}))
+    queries = []
+    select = database.backend.select
+
+    async def counting_select(table, *args):
+        queries.append(table)
+        return await select(table, *args)
+    database.backend.select = counting_select
+    return queries
+
+def test_profiles_are_served_from_the_cache(profile_queries):
+    first = asyncio.run(User.get_by_id("alice"))
+    second = asyncio.run(User.get_by_id("alice"))
+    assert first is not second
+    assert second.profile == first.profile
+    assert profile_queries == ["profile_balances"]
+
+def test_invalidated_profiles_are_reloaded(database, profile_queries):
+    asyncio.run(User.get_by_id("alice"))
+    asyncio.run(database.update("profiles", {"id": "alice"}, {"email": "new@example.com"}))
+    User.invalidate_cache("alice")
+    assert asyncio.run(User.get_by_id("alice")).profile.email == "new@example.com"
+    assert profile_queries == ["profile_balances", "profile_balances"]
+
+def test_pairing_writes_through(client, login):
+    alice, bob = login("alice"), login("bob")
+    code = client.post("/auth/generate-pairing-code", headers=alice).json()["pair_code"]
+    client.post("/auth/generate-pairing-code", headers=bob)
+    task = {"title": "Dishes", "description": "", "points": 1}
+    # Unpaired: the profile is cached, but no partner
+    assert client.post("/tasks/", headers=alice, json=task).status_code == 400
+    assert profile_cache.get("alice") is not MISSING
+
+    client.post("/auth/pair", headers=bob, json={"partner_code": code})
+    client.post("/auth/accept-pair", headers=alice)
+    # The pairing dropped both cached profiles, so the new partner shows up at once
+    assert client.post("/tasks/", headers=alice, json=task).status_code == 200
+    assert partner_cache.get("alice") == "bob"
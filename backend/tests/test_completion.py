@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+def create_task(client, headers, **fields) -> str:
+    task = {"title": "Dishes", "description": "Tonight", "points": 5, **fields}
+    return client.post("/tasks/", headers=headers, json=task).json()["id"]
+
+def balance(client, headers) -> int:
+    return client.get("/points/", headers=headers).json()["balance"]
+
+def test_completing_awards_the_creator_in_one_call(client, pair):
+    alice, bob = pair
+    task_id = create_task(client, alice)
+
+    response = client.post(f"/tasks/{task_id}/complete", headers=bob)
+    assert response.status_code == 200
+    # The status change and the award are one database call
+    assert "db.complete_task.rpc" in response.headers["server-timing"]
+    assert "db.tasks.update" not in response.headers["server-timing"]
+    assert balance(client, alice) == 5
+    assert client.get("/tasks/active", headers=bob).json() == []
+
+def test_tasks_complete_once(client, pair):
+    alice, bob = pair
+    task_id = create_task(client, alice)
+    client.post(f"/tasks/{task_id}/complete", headers=bob)
+    assert client.post(f"/tasks/{task_id}/complete", headers=bob).status_code == 400
+    assert balance(client, alice) == 5
+
+def test_only_the_assignee_completes(client, pair):
+    alice, bob = pair
+    task_id = create_task(client, alice)
+    assert client.post(f"/tasks/{task_id}/complete", headers=alice).status_code == 400
+    assert balance(client, alice) == 0
+
+def test_random_payouts_stay_in_range(client, pair):
+    alice, bob = pair
+    task_id = create_task(client, alice, random_payout=True, min_points=2, max_points=4)
+    client.post(f"/tasks/{task_id}/complete", headers=bob)
+    assert 2 <= balance(client, alice) <= 4
+
+@pytest.fixture
+def task(database):
+    async def create():
+        for user_id in ("alice", "bob"):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com"})
+        await database.insert("tasks", {
+            "id": "t1", "title": "Dishes", "description": "", "points": 5,
+            "creator_id": "alice", "assignee_id": "bob"
+        })
+    asyncio.run(create())
+    return "t1"
+
+def test_concurrent_completions_award_once(database, task):
+    async def complete():
+        return await database.rpc("complete_task", {
+            "p_task_id": task, "p_completed_by": "bob", "p_points": 5
+        })
+
+    async def race():
+        return await asyncio.gather(complete(), complete())
+    assert sorted(asyncio.run(race()), key=str) == [5, None]
+    ledger = asyncio.run(database.fetch_many("points_ledger", {"user_id": "alice"}))
+    assert [row["delta"] for row in ledger] == [5]
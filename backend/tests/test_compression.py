@@ -0,0 +1,83 @@
+from compression import CompressionMiddleware, negotiate
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from test_metrics import samples
+
+def compressing_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/large")
+    async def large(response: Response):
+        response.headers["ETag"] = '"v1"'
+        return {"items": ["x" * 100] * 50}
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(20):
+                yield f'{{"line": {i}, "pad": "{"x" * 100}"}}\n'
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    return TestClient(app)
+
+def test_negotiate_prefers_server_order_and_honours_q_values():
+    assert negotiate("gzip, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", ["br", "gzip"]) == "gzip"
+    assert negotiate("gzip;q=0", ["gzip"]) is None
+    assert negotiate("*", ["gzip"]) == "gzip"
+    assert negotiate("identity", ["gzip"]) is None
+
+def test_small_responses_are_not_compressed():
+    response = compressing_client().get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+def test_large_responses_are_gzipped():
+    response = compressing_client().get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == '"v1-gzip"'
+    assert len(response.json()["items"]) == 50
+
+def test_responses_without_accept_encoding_are_not_compressed():
+    response = compressing_client().get("/large", headers={"Accept-Encoding": ""})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+def test_streams_are_compressed_chunk_by_chunk():
+    response = compressing_client().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len(response.text.splitlines()) == 20
+
+def test_encoded_if_none_match_reaches_the_app_without_its_suffix():
+    seen = []
+    async def recorder(scope, receive, send):
+        seen.append(dict(scope["headers"]).get(b"if-none-match"))
+        await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", b'"v1"')]})
+        await send({"type": "http.response.body", "body": b""})
+
+    response = TestClient(CompressionMiddleware(recorder)).get(
+        "/large", headers={"Accept-Encoding": "gzip", "If-None-Match": '"v1-gzip"'}
+    )
+    assert seen == [b'"v1"']
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"v1-gzip"'
+
+def test_compressed_requests_keep_their_route_label(client, pair):
+    alice, _ = pair
+    for i in range(30):
+        client.post("/tasks/", headers=alice, json={
+            "title": f"Task {i} " + "x" * 50, "description": "y" * 50, "points": 1
+        })
+    response = client.get("/tasks/active", headers={**alice, "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    series = samples(client.get("/metrics").text)
+    assert series['http_requests_total{method="GET",route="/tasks/active",status="200"}'] >= 1
+    assert 'http_requests_total{method="GET",route="unmatched",status="200"}' not in series
@@ -0,0 +1,99 @@
+from models.user import User
+import asyncio
+import os
+import pytest
+import sqlite3
+
+def revalidate(client, path, headers, tag, status):
+    response = client.get(path, headers={**headers, "If-None-Match": tag})
+    assert response.status_code == status
+    return response
+
+def test_task_list_revalidates_until_the_tasks_change(client, pair):
+    alice, bob = pair
+    first = client.get("/tasks/active", headers=bob)
+    tag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    not_modified = revalidate(client, "/tasks/active", bob, tag, 304)
+    assert not_modified.headers["etag"] == tag
+    assert not_modified.content == b""
+    # No tasks query for a 304
+    assert "db.tasks" not in not_modified.headers["server-timing"]
+    revalidate(client, "/tasks/active", bob, f'W/{tag}, "other"', 304)
+    revalidate(client, "/tasks/active", bob, "*", 304)
+    # Another page is another resource
+    assert client.get("/tasks/active?limit=5", headers=bob).headers["etag"] != tag
+
+    client.post("/tasks/", headers=alice, json={"title": "Dishes", "description": "", "points": 1})
+    changed = revalidate(client, "/tasks/active", bob, tag, 200)
+    assert len(changed.json()) == 1
+    assert changed.headers["etag"] != tag
+
+def test_writes_from_other_workers_change_the_tag(client, pair):
+    alice, bob = pair
+    task_id = client.post("/tasks/", headers=alice, json={
+        "title": "Dishes", "description": "", "points": 1
+    }).json()["id"]
+    tag = client.get("/tasks/active", headers=bob).headers["etag"]
+
+    # Another worker or a manual edit goes straight to the database
+    conn = sqlite3.connect(os.environ["SQLITE_PATH"])
+    with conn:
+        conn.execute("UPDATE tasks SET title = 'Dishes and pans' WHERE id = ?", (task_id,))
+    conn.close()
+
+    changed = revalidate(client, "/tasks/active", bob, tag, 200)
+    assert changed.json()[0]["title"] == "Dishes and pans"
+
+def test_points_and_pending_pair_revalidate(client, pair, login):
+    alice, bob = pair
+    points_tag = client.get("/points/", headers=alice).headers["etag"]
+    revalidate(client, "/points/", alice, points_tag, 304)
+
+    carol = login("carol")
+    code = client.post("/auth/generate-pairing-code", headers=carol).json()["pair_code"]
+    pending_tag = client.get("/auth/pending-pair", headers=carol).headers["etag"]
+    revalidate(client, "/auth/pending-pair", carol, pending_tag, 304)
+
+    task_id = client.post("/tasks/", headers=alice, json={
+        "title": "Dishes", "description": "", "points": 3
+    }).json()["id"]
+    client.post(f"/tasks/{task_id}/complete", headers=bob)
+    assert revalidate(client, "/points/", alice, points_tag, 200).json()["balance"] == 3
+
+    client.post("/auth/pair", headers=alice, json={"partner_code": code})
+    assert revalidate(client, "/auth/pending-pair", carol, pending_tag, 200).json()["has_pending"]
+
+@pytest.fixture
+def versions(database):
+    async def setup():
+        for user_id in ("alice", "bob", "carol"):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com"})
+    asyncio.run(setup())
+
+    def current(*user_ids):
+        return asyncio.run(User.version(*user_ids))
+    return current
+
+def test_versions_follow_every_kind_of_change(database, versions):
+    def changes(write):
+        before = versions("alice", "bob", "carol")
+        asyncio.run(write)
+        after = versions("alice", "bob", "carol")
+        return [b != a for b, a in zip(before.split(","), after.split(","))]
+
+    assert changes(database.insert("pairings", {"user_id": "alice", "partner_id": "bob"})) == [True, True, False]
+    assert changes(database.insert("tasks", {
+        "id": "t1", "title": "Dishes", "description": "", "points": 1,
+        "creator_id": "alice", "assignee_id": "bob"
+    })) == [True, True, False]
+    assert changes(database.update("tasks", {"id": "t1"}, {"title": "Pans"})) == [True, True, False]
+    assert changes(database.rpc("award_points", {"p_user_id": "carol", "p_delta": 2})) == [False, False, True]
+    assert changes(database.update("profiles", {"id": "carol"}, {"pair_code": "CAROL123"})) == [False, False, True]
+    # Compaction only moves points already counted by the ledger
+    assert changes(database.rpc("compact_points_ledger", {})) == [False, False, False]
+    assert changes(database.delete("tasks", {"id": "t1"})) == [True, True, False]
+
+def test_unknown_users_are_version_zero(versions):
+    assert versions("nobody", "alice") == "0,0"
@@ -0,0 +1,97 @@
+from pubsub import EventHub, hub
+import asyncio
+import orjson
+import pytest
+
+def parse(message: bytes):
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return fields["event"], orjson.loads(fields["data"])
+
+def test_events_reach_every_connection_of_both_users():
+    events = EventHub()
+
+    async def main():
+        alice_phone, alice_laptop = events.subscribe("alice"), events.subscribe("alice")
+        bob, carol = events.subscribe("bob"), events.subscribe("carol")
+        events.publish(["alice", "bob", "alice"], "task.created", {"id": "t1"})
+        return [s.queue.get_nowait() for s in (alice_phone, alice_laptop, bob)], carol
+    (first, second, third), carol = asyncio.run(main())
+    # Encoded once and shared
+    assert first is second is third
+    assert parse(first) == ("task.created", {"id": "t1"})
+    assert carol.queue.empty()
+
+def test_only_the_newest_connections_are_kept():
+    events = EventHub(max_connections=2)
+
+    async def main():
+        return [events.subscribe("alice") for _ in range(3)]
+    oldest, *newest = asyncio.run(main())
+    assert oldest.closed
+    assert not any(s.closed for s in newest)
+
+async def collect(stream, count: int):
+    return [await stream.__anext__() for _ in range(count)]
+
+def test_stream_sends_events_and_heartbeats():
+    events = EventHub(heartbeat=0.01, max_age=10)
+
+    async def main():
+        stream = events.stream("alice")
+        received = await collect(stream, 1)
+        events.publish(["alice"], "task.completed", {"id": "t1"})
+        received += await collect(stream, 2)
+        await stream.aclose()
+        return received
+    retry, event, heartbeat = asyncio.run(main())
+    assert retry == b"retry: 3000\n\n"
+    assert parse(event) == ("task.completed", {"id": "t1"})
+    assert heartbeat == b": heartbeat\n\n"
+    assert not events._subscriptions
+
+def test_slow_clients_are_reset():
+    events = EventHub(queue_size=1, heartbeat=10, max_age=10)
+
+    async def main():
+        stream = events.stream("alice")
+        await collect(stream, 1)
+        events.publish(["alice"], "task.created", {"id": "t1"})
+        events.publish(["alice"], "task.created", {"id": "t2"})
+        return [message async for message in stream]
+    # Queued events are dropped too: the client refetches everything
+    assert asyncio.run(main()) == [b"event: reset\ndata: {}\n\n"]
+    assert not events._subscriptions
+
+def test_streams_end_at_max_age():
+    events = EventHub(heartbeat=10, max_age=0.01)
+
+    async def main():
+        return [message async for message in events.stream("alice")]
+    # Ends on its own, without waiting for the next heartbeat
+    assert asyncio.run(asyncio.wait_for(main(), 1))[0] == b"retry: 3000\n\n"
+    assert not events._subscriptions
+
+@pytest.fixture
+def published(monkeypatch):
+    published = []
+    monkeypatch.setattr(hub, "publish", lambda user_ids, event, data: published.append(
+        (tuple(user_ids), event, data.get("id"))
+    ))
+    return published
+
+def test_task_changes_are_published_to_the_pair(client, pair, published):
+    alice, bob = pair
+    first, second = [result["id"] for result in client.post("/tasks/batch", headers=alice, json=[
+        {"title": "Dishes", "description": "", "points": 1},
+        {"title": "Laundry", "description": "", "points": 1},
+    ]).json()["results"]]
+    client.post(f"/tasks/{first}/complete", headers=bob)
+    client.delete(f"/tasks/{second}", headers=alice)
+
+    pair_ids = ("alice", "bob")
+    assert published == [
+        (pair_ids, "task.created", first),
+        (pair_ids, "task.created", second),
+        (pair_ids, "task.completed", first),
+        (pair_ids, "task.deleted", second),
+    ]
@@ -0,0 +1,101 @@
+from models.cache import profile_cache
+from models.loader import BatchLoader
+from models.user import User
+import asyncio
+import pytest
+
+class Source:
+    """Batch function over a dict, recording the keys of every batch"""
+
+    def __init__(self, values, error: Exception = None):
+        self.values = values
+        self.error = error
+        self.batches = []
+
+    async def __call__(self, keys):
+        self.batches.append(keys)
+        if self.error:
+            raise self.error
+        return {key: self.values[key] for key in keys if key in self.values}
+
+def test_loads_in_the_same_tick_share_one_batch():
+    source = Source({"a": object(), "b": object()})
+
+    async def main():
+        loader = BatchLoader(source)
+        return await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"))
+    a, b, again = asyncio.run(main())
+    assert source.batches == [["a", "b"]]
+    assert a is again is source.values["a"]
+    assert b is source.values["b"]
+
+def test_each_key_is_loaded_once():
+    source = Source({"a": 1, "b": 2})
+
+    async def main():
+        loader = BatchLoader(source)
+        await loader.load("a")
+        return await loader.load_many(["a", "b", "b", "missing"])
+    assert asyncio.run(main()) == {"a": 1, "b": 2, "missing": None}
+    assert source.batches == [["a"], ["b", "missing"]]
+
+def test_primed_keys_are_not_fetched():
+    source = Source({})
+
+    async def main():
+        loader = BatchLoader(source)
+        loader.prime("a", 1)
+        return await loader.load("a")
+    assert asyncio.run(main()) == 1
+    assert source.batches == []
+
+def test_failures_are_not_cached():
+    source = Source({"a": 1}, error=ConnectionError("down"))
+
+    async def main():
+        loader = BatchLoader(source)
+        with pytest.raises(ConnectionError):
+            await loader.load("a")
+        source.error = None
+        return await loader.load("a")
+    assert asyncio.run(main()) == 1
+    assert source.batches == [["a"], ["a"]]
+
+@pytest.fixture
+def profiles(database):
+    async def create():
+        for user_id in ("alice", "bob", "carol"):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com"})
+    asyncio.run(create())
+    profile_cache.clear()
+
+    queries = []
+    select = database.backend.select
+
+    async def counting_select(table, *args):
+        queries.append(table)
+        return await select(table, *args)
+    database.backend.select = counting_select
+    return queries
+
+def test_request_scope_batches_profile_lookups(profiles):
+    async def request():
+        User.start_request_scope()
+        alice, bob = await asyncio.gather(User.get_by_id("alice"), User.get_by_id("bob"))
+        users = await User.get_many(["alice", "bob", "carol", "nobody"])
+        return alice, bob, users
+    alice, bob, users = asyncio.run(request())
+
+    assert profiles == ["profile_balances", "profile_balances"]
+    assert users["alice"] is alice and users["bob"] is bob
+    assert users["carol"].profile.email == "carol@example.com"
+    assert users["nobody"] is None
+
+def test_current_user_is_reused(profiles):
+    async def request():
+        current = (await User.get_many(["alice"]))["alice"]
+        User.start_request_scope(current)
+        return current, await User.get_by_id("alice")
+    current, again = asyncio.run(request())
+    assert again is current
+    assert profiles == ["profile_balances"]
@@ -0,0 +1,82 @@
+from logs import ContextFilter, JsonFormatter, SamplingFilter, _QueueHandler
+from tracing import Span, Trace
+import json
+import logging
+import logs
+import pytest
+import queue
+import sys
+import tracing
+
+def record(message: str = "Task %s failed", *args, level: int = logging.WARNING, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("tasks", level, __file__, 1, message, args or ("t1",), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_lines_carry_extra_fields():
+    line = JsonFormatter().format(record(status=503, user_id=None))
+    entry = json.loads(line)
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "tasks"
+    assert entry["message"] == "Task t1 failed"
+    assert entry["status"] == 503
+    assert "user_id" not in entry
+    assert entry["ts"].endswith("Z")
+
+def test_records_are_resolved_before_queueing():
+    handler = _QueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        failed = record(exc_info=sys.exc_info())
+    prepared = handler.prepare(failed)
+    assert prepared.msg == "Task t1 failed" and prepared.args is None
+    assert "ValueError: boom" in prepared.exc_text
+    assert prepared.exc_info is None
+    assert failed.args == ("t1",)
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _QueueHandler(queue.Queue(maxsize=1))
+    handler.handle(record())
+    handler.handle(record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+def test_records_carry_the_request_context():
+    trace = Trace("req-1")
+    trace.user_id = "alice"
+    trace.add(Span("db", "tasks", "select", 0.002))
+    token = tracing._current_trace.set(trace)
+    try:
+        tagged = record()
+        ContextFilter().filter(tagged)
+    finally:
+        tracing._current_trace.reset(token)
+    assert (tagged.request_id, tagged.user_id, tagged.db_calls, tagged.db_ms) == ("req-1", "alice", 1, 2.0)
+
+@pytest.fixture
+def sampling(monkeypatch, clock):
+    monkeypatch.setattr(logs, "time", clock)
+    return SamplingFilter(burst=2, every=3, window=60)
+
+def test_repeated_warnings_are_sampled(sampling):
+    records = [record() for _ in range(7)]
+    assert [sampling.filter(r) for r in records] == [True, True, True, False, False, True, False]
+    # The third record passes as one in every three, then reports what was dropped
+    assert not hasattr(records[2], "suppressed")
+    assert records[5].suppressed == 2
+
+def test_sampling_starts_over_each_window(sampling, clock):
+    for _ in range(4):
+        sampling.filter(record())
+    clock.advance(61)
+    again = record()
+    assert sampling.filter(again)
+    assert again.suppressed == 1
+
+def test_info_and_other_messages_are_not_sampled(sampling):
+    for _ in range(5):
+        sampling.filter(record())
+    assert sampling.filter(record(level=logging.INFO))
+    assert sampling.filter(record("Another message"))
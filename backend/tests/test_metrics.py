@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+from metrics import Counter, Histogram, Registry
+from typing import Dict
+
+def samples(text: str) -> Dict[str, float]:
+    """Prometheus text format as {series: value}"""
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.register(Histogram("latency", "Latency", ["route"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/tasks")
+
+    text = registry.render()
+    assert "# TYPE latency histogram" in text
+    assert samples(text) == {
+        'latency_bucket{route="/tasks",le="0.1"}': 2,
+        'latency_bucket{route="/tasks",le="1.0"}': 3,
+        'latency_bucket{route="/tasks",le="+Inf"}': 4,
+        'latency_sum{route="/tasks"}': 3.65,
+        'latency_count{route="/tasks"}': 4,
+    }
+
+def test_counter_labels_are_escaped():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ["path"]))
+    requests.inc('/say "hi"\n')
+    requests.inc('/say "hi"\n', amount=2)
+    assert samples(registry.render()) == {'requests_total{path="/say \\"hi\\"\\n"}': 3}
+
+def test_requests_are_labelled_by_route_template(client, pair):
+    alice, bob = pair
+    task_id = client.post("/tasks/", headers=alice, json={
+        "title": "Dishes", "description": "", "points": 1
+    }).json()["id"]
+    before = samples(client.get("/metrics").text)
+    client.post(f"/tasks/{task_id}/complete", headers=bob)
+    client.get("/no/such/route")
+    after = samples(client.get("/metrics").text)
+
+    def delta(series):
+        return after.get(series, 0) - before.get(series, 0)
+    complete = 'method="POST",route="/tasks/{task_id}/complete"'
+    assert delta(f'http_requests_total{{{complete},status="200"}}') == 1
+    assert delta(f'http_request_duration_seconds_count{{{complete}}}') == 1
+    assert delta('http_requests_total{method="GET",route="unmatched",status="404"}') == 1
+    assert not any(task_id in series for series in after)
+    assert delta('db_queries_total{table="complete_task",operation="rpc",outcome="ok"}') == 1
+
+def test_metrics_token(environment, monkeypatch):
+    monkeypatch.setenv("METRICS_TOKEN", "scrape")
+    from main import create_app
+    with TestClient(create_app()) as client:
+        assert client.get("/metrics").status_code == 401
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
@@ -0,0 +1,76 @@
+from models.query import decode_cursor, encode_cursor
+import base64
+import orjson
+import pytest
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(["2030-01-01T00:00:00+00:00", "task-id"])
+    assert decode_cursor(cursor) == ["2030-01-01T00:00:00+00:00", "task-id"]
+    assert decode_cursor(encode_cursor([None, "task-id"])) == [None, "task-id"]
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", "eyJhIjogMX0"])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+@pytest.fixture
+def tasks(client, pair):
+    """25 active tasks: several sharing each due date, some undated"""
+    alice, bob = pair
+    due_dates = ["2030-01-03T00:00:00+00:00", "2030-01-01T00:00:00+00:00", None,
+                 "2030-01-02T00:00:00+00:00", "2030-01-01T00:00:00+00:00"]
+    response = client.post("/tasks/batch", headers=alice, json=[
+        {"title": f"Task {i}", "description": "", "points": i, "due_date": due_dates[i % 5]}
+        for i in range(25)
+    ])
+    assert response.json()["created"] == 25
+    return bob
+
+def sort_key(task):
+    # Due date ascending with undated tasks last, then id
+    return (task["due_date"] is None, task["due_date"] or "", task["id"])
+
+def test_pages_follow_the_cursor(client, tasks):
+    pages = []
+    params = {"limit": 10}
+    while True:
+        response = client.get("/tasks/active", headers=tasks, params=params)
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"limit": 10, "cursor": cursor}
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    rows = [row for page in pages for row in page]
+    assert len({row["id"] for row in rows}) == 25
+    assert rows == sorted(rows, key=sort_key)
+
+def test_last_full_page_has_no_cursor(client, tasks):
+    response = client.get("/tasks/active", headers=tasks, params={"limit": 25})
+    assert len(response.json()) == 25
+    assert "X-Next-Cursor" not in response.headers
+
+def test_stream_sends_every_task_as_ndjson(client, tasks):
+    first = client.get("/tasks/active", headers=tasks, params={"limit": 10}).json()
+    response = client.get("/tasks/active", headers=tasks, params={"limit": 4, "stream": "true"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 25
+    assert rows[:10] == first
+    assert rows == sorted(rows, key=sort_key)
+
+@pytest.mark.parametrize("params, status", [
+    ({"cursor": "not a cursor"}, 400),
+    ({"cursor": encode_cursor(["2030-01-01T00:00:00+00:00"])}, 400),
+    ({"cursor": encode_cursor(["someday", "8d3c5a4e-1f2b-4c6d-9e7f-0a1b2c3d4e5f"])}, 400),
+    ({"cursor": encode_cursor([None, "not-a-uuid"])}, 400),
+    # Not from encode_cursor, which would stringify the number
+    ({"cursor": base64.urlsafe_b64encode(b'[1, "8d3c5a4e-1f2b-4c6d-9e7f-0a1b2c3d4e5f"]').decode()}, 400),
+    ({"cursor": encode_cursor([None, "8d3c5a4e-1f2b-4c6d-9e7f-0a1b2c3d4e5f"]), "stream": "true"}, 200),
+    ({"limit": 0}, 422),
+    ({"limit": 501}, 422),
+])
+def test_bad_page_requests(client, tasks, params, status):
+    assert client.get("/tasks/active", headers=tasks, params=params).status_code == status
@@ -0,0 +1,44 @@
+import re
+
+def test_pairing_flow(client, login):
+    alice, bob = login("alice"), login("bob")
+    code = client.post("/auth/generate-pairing-code", headers=alice).json()["pair_code"]
+    assert re.fullmatch(r"[A-Z0-9]{8}", code)
+    client.post("/auth/generate-pairing-code", headers=bob)
+    assert client.get("/auth/pending-pair", headers=alice).json() == {"has_pending": False}
+
+    response = client.post("/auth/pair", headers=bob, json={"partner_code": code})
+    assert response.json()["status"] == "pending"
+    assert response.json()["partner_id"] == "alice"
+    # Looking up the code, checking for existing pairings and inserting is one call
+    assert re.search(r'db\.request_pairing\.rpc;dur=[\d.]+;desc="1x"', response.headers["server-timing"])
+    assert "db.profiles" not in response.headers["server-timing"]
+    assert "db.pairings" not in response.headers["server-timing"]
+
+    assert client.get("/auth/pending-pair", headers=alice).json() == {
+        "has_pending": True,
+        "requester": {"id": "bob", "email": "bob@example.com"}
+    }
+
+    response = client.post("/auth/accept-pair", headers=alice)
+    assert response.json()["partner_id"] == "bob"
+    assert re.search(r'db\.accept_pairing\.rpc;dur=[\d.]+;desc="1x"', response.headers["server-timing"])
+    assert client.get("/auth/pending-pair", headers=alice).json() == {"has_pending": False}
+    task = {"title": "Dishes", "description": "", "points": 1}
+    assert client.post("/tasks/", headers=bob, json=task).status_code == 200
+
+def test_pairing_errors(client, login):
+    alice, bob = login("alice"), login("bob")
+    code = client.post("/auth/generate-pairing-code", headers=alice).json()["pair_code"]
+    client.post("/auth/generate-pairing-code", headers=bob)
+
+    assert client.post("/auth/pair", headers=bob, json={"partner_code": "NOPE0000"}).status_code == 404
+    assert client.post("/auth/pair", headers=alice, json={"partner_code": code}).status_code == 400
+    assert client.post("/auth/accept-pair", headers=alice).status_code == 404
+
+    assert client.post("/auth/pair", headers=bob, json={"partner_code": code}).status_code == 200
+    duplicate = client.post("/auth/pair", headers=bob, json={"partner_code": code})
+    assert duplicate.status_code == 400
+    assert duplicate.json()["detail"] == "A pairing request already exists between these users"
+    # Only the invited user can accept
+    assert client.post("/auth/accept-pair", headers=bob).status_code == 404
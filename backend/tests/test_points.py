@@ -0,0 +1,74 @@
+from models.points import PointsLedger
+import asyncio
+import pytest
+
+@pytest.fixture
+def users(database):
+    async def create():
+        for user_id in ("alice", "bob"):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com"})
+    asyncio.run(create())
+    return "alice", "bob"
+
+def award(user_id: str, *deltas: int) -> list:
+    async def append():
+        return [await PointsLedger.award(user_id, delta) for delta in deltas]
+    return asyncio.run(append())
+
+def balances(*user_ids: str) -> dict:
+    return asyncio.run(PointsLedger.balances(list(user_ids)))
+
+def test_awards_append_and_return_the_balance(database, users):
+    assert award("alice", 5, 3, -2) == [5, 8, 6]
+    assert award("nobody", 5) == [None]
+    assert balances("alice", "bob") == {"alice": 6, "bob": 0}
+    ledger = asyncio.run(database.fetch_many("points_ledger", {"user_id": "alice"}))
+    assert [row["delta"] for row in ledger] == [5, 3, -2]
+
+def test_ledger_is_append_only(database, users, caplog):
+    award("alice", 5)
+    assert asyncio.run(database.update("points_ledger", {"user_id": "alice"}, {"delta": 500})) is False
+    assert "points_ledger is append-only" in caplog.text
+    assert balances("alice") == {"alice": 5}
+
+def test_compaction_folds_the_ledger_without_changing_balances(database, users):
+    award("alice", 5, 3)
+    award("bob", 2)
+    assert asyncio.run(PointsLedger.compact()) == 2
+
+    profiles = asyncio.run(database.fetch_many("profiles", {}, columns=["id", "points"]))
+    assert {row["id"]: row["points"] for row in profiles} == {"alice": 8, "bob": 2}
+    assert balances("alice", "bob") == {"alice": 8, "bob": 2}
+
+    # Rows after the checkpoint still count until the next compaction
+    award("alice", 1)
+    assert balances("alice") == {"alice": 9}
+    assert asyncio.run(PointsLedger.compact()) == 1
+    assert balances("alice") == {"alice": 9}
+
+def test_compaction_skips_within_the_minimum_interval(database, users):
+    award("alice", 5)
+    assert asyncio.run(PointsLedger.compact(min_interval=60)) == 1
+    award("alice", 3)
+    assert asyncio.run(PointsLedger.compact(min_interval=60)) == 0
+    assert balances("alice") == {"alice": 8}
+    assert asyncio.run(PointsLedger.compact()) == 1
+
+def test_history_pages_newest_first(client, pair):
+    alice, bob = pair
+    for points in (1, 2, 3):
+        task_id = client.post("/tasks/", headers=alice, json={
+            "title": f"Task {points}", "description": "", "points": points
+        }).json()["id"]
+        client.post(f"/tasks/{task_id}/complete", headers=bob)
+
+    first = client.get("/points/?limit=2", headers=alice)
+    assert first.json()["balance"] == 6
+    assert [entry["delta"] for entry in first.json()["history"]] == [3, 2]
+    cursor = first.headers["x-next-cursor"]
+
+    second = client.get("/points/", params={"limit": 2, "cursor": cursor}, headers=alice)
+    assert [entry["delta"] for entry in second.json()["history"]] == [1]
+    assert "x-next-cursor" not in second.headers
+
+    assert client.get("/points/?cursor=bogus", headers=alice).status_code == 400
@@ -0,0 +1,110 @@
+from datetime import datetime, timezone
+from models.query import (
+    and_, asc, describe, desc, eq, gt, in_, is_null, or_, select_params, to_postgrest_params
+)
+import asyncio
+import pytest
+
+def test_dict_filters_are_equality_and_in():
+    assert to_postgrest_params({"status": "active", "id": ["a", "b"]}) == [
+        ("status", "eq.active"),
+        ("id", "in.(a,b)"),
+    ]
+
+def test_values_are_formatted_for_postgrest():
+    when = datetime(2026, 10, 16, 12, tzinfo=timezone.utc)
+    assert to_postgrest_params(and_(
+        eq("paired", True), is_null("due_date"), gt("due_date", when)
+    )) == [
+        ("paired", "eq.true"),
+        ("due_date", "is.null"),
+        ("due_date", "gt.2026-10-16T12:00:00+00:00"),
+    ]
+
+def test_one_or_group_becomes_an_or_param():
+    filters = and_(
+        eq("status", "active"),
+        or_(eq("creator_id", "u1"), eq("assignee_id", "u1"))
+    )
+    assert to_postgrest_params(filters) == [
+        ("status", "eq.active"),
+        ("or", "(creator_id.eq.u1,assignee_id.eq.u1)"),
+    ]
+
+def test_several_or_groups_are_wrapped_in_and():
+    filters = and_(
+        or_(eq("creator_id", "u1"), eq("assignee_id", "u1")),
+        and_(or_(is_null("due_date"), gt("due_date", "2026-10-16")))
+    )
+    assert to_postgrest_params(filters) == [
+        ("and", "(or(creator_id.eq.u1,assignee_id.eq.u1),or(due_date.is.null,due_date.gt.2026-10-16))"),
+    ]
+
+def test_top_level_or():
+    assert to_postgrest_params(or_(eq("a", 1), and_(eq("b", 2), eq("c", 3)))) == [
+        ("or", "(a.eq.1,and(b.eq.2,c.eq.3))"),
+    ]
+
+def test_reserved_characters_are_quoted_in_lists_and_trees():
+    assert to_postgrest_params(and_(
+        in_("title", ["a,b", 'say "hi"']),
+        or_(eq("title", "x.y"), eq("title", "plain"))
+    )) == [
+        ("title", 'in.("a,b","say \\"hi\\"")'),
+        ("or", '(title.eq."x.y",title.eq.plain)'),
+    ]
+
+def test_select_params():
+    assert select_params(
+        {"status": "active"},
+        columns=["id", "title"],
+        order=[asc("due_date"), desc("id", nulls_last=False)],
+        limit=50
+    ) == [
+        ("select", "id,title"),
+        ("status", "eq.active"),
+        ("order", "due_date.asc.nullslast,id.desc.nullsfirst"),
+        ("limit", "50"),
+    ]
+    assert select_params({}) == [("select", "*")]
+
+def test_describe_leaves_out_values():
+    filters = and_(in_("id", ["a", "b"]), or_(eq("creator_id", "u1"), eq("assignee_id", "u1")))
+    assert describe(filters) == "and(id.in[2],or(creator_id.eq,assignee_id.eq))"
+
+@pytest.fixture
+def profiles(database):
+    async def create():
+        for user_id, paired in (("alice", True), ("bob", True), ("carol", False)):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com", "paired": paired})
+    asyncio.run(create())
+    return database
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"paired": True}, ["alice", "bob"]),
+    ({"id": ["alice", "carol", "nobody"]}, ["alice", "carol"]),
+    (or_(eq("id", "carol"), and_(eq("paired", True), gt("id", "alice"))), ["bob", "carol"]),
+    (and_(eq("paired", False), or_(eq("id", "alice"), eq("id", "bob"))), []),
+    (in_("id", []), []),
+    (and_(), ["alice", "bob", "carol"]),
+])
+def test_sqlite_applies_the_same_filters(profiles, filters, expected):
+    rows = asyncio.run(profiles.fetch_many("profiles", filters, columns=["id"], order=[asc("id")]))
+    assert [row["id"] for row in rows] == expected
+
+def test_sqlite_rejects_unsafe_identifiers(profiles):
+    with pytest.raises(ValueError):
+        asyncio.run(profiles.backend.select("profiles", {"id = id; --": "x"}))
+
+def test_access_filters_hide_other_users_tasks(client, pair, login):
+    alice, bob = pair
+    task_id = client.post("/tasks/", headers=alice, json={
+        "title": "Dishes", "description": "Tonight", "points": 5
+    }).json()["id"]
+    carol = login("carol")
+    client.post("/auth/generate-pairing-code", headers=carol)
+
+    assert client.post(f"/tasks/{task_id}/complete", headers=carol).status_code == 404
+    assert client.delete(f"/tasks/{task_id}", headers=carol).status_code == 404
+    assert client.get("/tasks/active", headers=carol).json() == []
+    assert [task["id"] for task in client.get("/tasks/active", headers=bob).json()] == [task_id]
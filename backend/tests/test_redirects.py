@@ -0,0 +1,37 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redirects import HTTPSRedirectMiddleware
+import pytest
+
+def client(monkeypatch, environment: str) -> TestClient:
+    monkeypatch.setenv("ENVIRONMENT", environment)
+    app = FastAPI()
+    app.add_middleware(HTTPSRedirectMiddleware)
+
+    @app.get("/tasks/active")
+    async def tasks():
+        return []
+    return TestClient(app)
+
+def test_plain_http_is_redirected_in_production(monkeypatch):
+    response = client(monkeypatch, "production").get("/tasks/active?limit=5", follow_redirects=False)
+    assert response.status_code == 301
+    assert response.headers["location"] == "https://testserver/tasks/active?limit=5"
+
+@pytest.mark.parametrize("proto", ["https", "https, http"])
+def test_forwarded_https_passes(monkeypatch, proto):
+    response = client(monkeypatch, "production").get(
+        "/tasks/active", headers={"X-Forwarded-Proto": proto}, follow_redirects=False
+    )
+    assert response.status_code == 200
+
+def test_forwarded_http_is_redirected(monkeypatch):
+    response = client(monkeypatch, "production").get(
+        "/tasks/active", headers={"X-Forwarded-Proto": "http, https"}, follow_redirects=False
+    )
+    assert response.status_code == 301
+
+def test_other_environments_are_not_redirected(monkeypatch):
+    assert client(monkeypatch, "development").get(
+        "/tasks/active", follow_redirects=False
+    ).status_code == 200
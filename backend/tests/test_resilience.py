@@ -0,0 +1,131 @@
+from resilience import CallPolicy, CircuitBreaker, ServiceUnavailableError
+import asyncio
+import httpx
+import pytest
+import resilience
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(resilience, "time", clock)
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_breaker_half_opens_then_closes(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(29)
+    assert breaker.state == "open"
+    clock.advance(1)
+    assert breaker.state == "half_open"
+    # One probe at a time
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.advance(29)
+    assert not breaker.allow()
+    clock.advance(1)
+    assert breaker.allow()
+
+def test_released_probe_lets_the_next_one_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+class Upstream:
+    """Fails with each error in turn, then answers"""
+
+    def __init__(self, *errors: BaseException):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+def policy(retries: int = 2, threshold: int = 5) -> CallPolicy:
+    breaker = CircuitBreaker("test", failure_threshold=threshold)
+    return CallPolicy("test", retries=retries, backoff=0, breaker=breaker)
+
+def transient() -> Exception:
+    return httpx.ConnectError("connection refused")
+
+def test_idempotent_calls_are_retried():
+    upstream = Upstream(transient(), transient())
+    assert asyncio.run(policy().call("select", upstream, idempotent=True)) == "ok"
+    assert upstream.calls == 3
+
+def test_idempotent_calls_give_up_after_retries():
+    upstream = Upstream(transient(), transient(), transient())
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(policy().call("select", upstream, idempotent=True))
+    assert upstream.calls == 3
+
+def test_non_idempotent_calls_are_never_retried():
+    upstream = Upstream(transient())
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(policy().call("insert", upstream))
+    assert upstream.calls == 1
+
+def test_request_errors_are_raised_as_is():
+    upstream = Upstream(ValueError("bad row"))
+    calls = policy(threshold=1)
+    with pytest.raises(ValueError):
+        asyncio.run(calls.call("select", upstream, idempotent=True))
+    assert upstream.calls == 1
+    assert calls.breaker.state == "closed"
+
+def test_open_circuit_fails_fast(clock):
+    calls = policy(threshold=1, retries=0)
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(calls.call("select", Upstream(transient()), idempotent=True))
+
+    upstream = Upstream()
+    with pytest.raises(ServiceUnavailableError) as e:
+        asyncio.run(calls.call("select", upstream, idempotent=True))
+    assert e.value.reason == "circuit open"
+    assert upstream.calls == 0
+
+    clock.advance(30)
+    assert asyncio.run(calls.call("select", upstream, idempotent=True)) == "ok"
+    assert calls.breaker.state == "closed"
+
+def test_open_circuit_stops_retries():
+    upstream = Upstream(transient(), transient())
+    with pytest.raises(ServiceUnavailableError):
+        asyncio.run(policy(threshold=1).call("select", upstream, idempotent=True))
+    assert upstream.calls == 1
+
+def test_is_transient():
+    assert resilience.is_transient(asyncio.TimeoutError())
+    assert resilience.is_transient(transient())
+    assert not resilience.is_transient(ValueError())
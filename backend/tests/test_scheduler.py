@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+from scheduler import DueDateScheduler
+import asyncio
+import pytest
+import scheduler
+
+def iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+class FakeDatabase:
+    """The tasks table and mark_tasks_overdue, recording every mark call"""
+
+    def __init__(self):
+        self.tasks = {}
+        self.marks = []
+        self.failures = 0
+
+    def add(self, task_id: str, due: float) -> None:
+        self.tasks[task_id] = {
+            "id": task_id,
+            "creator_id": "creator",
+            "assignee_id": "assignee",
+            "due_date": iso(due),
+            "overdue_at": None
+        }
+
+    async def fetch_many(self, table, query, columns, order, limit):
+        rows = [row for row in self.tasks.values() if row["overdue_at"] is None]
+        return sorted(rows, key=lambda row: row["due_date"])[:limit]
+
+    async def rpc(self, name, params):
+        assert name == "mark_tasks_overdue"
+        self.marks.append(params["p_task_ids"])
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database down")
+        marked = []
+        for task_id in params["p_task_ids"]:
+            row = self.tasks.get(task_id)
+            if row and row["overdue_at"] is None and row["due_date"] <= params["p_now"]:
+                row["overdue_at"] = params["p_now"]
+                marked.append(row)
+        return marked
+
+class FakeHub:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, user_ids, event, data):
+        self.events.append((event, data["id"]))
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(scheduler, "Database", lambda: database)
+    return database
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = FakeHub()
+    monkeypatch.setattr(scheduler, "hub", hub)
+    return hub
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(scheduler, "time", clock)
+
+async def settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+async def tick(due_dates: DueDateScheduler, clock, seconds: float) -> None:
+    """Move the clock on and wake the run loop as its timer would"""
+    clock.advance(seconds)
+    due_dates._wakeup.set()
+    await settle()
+
+def run(due_dates: DueDateScheduler, steps) -> None:
+    async def main():
+        runner = asyncio.ensure_future(due_dates.run())
+        await settle()
+        try:
+            await steps()
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+    asyncio.run(main())
+
+def test_tasks_due_together_are_marked_in_batches(database, hub, clock):
+    for i in range(5):
+        database.add(f"t{i}", clock.now + 10)
+    due_dates = DueDateScheduler(reminder=0, batch_size=2)
+
+    async def steps():
+        assert due_dates._tasks.keys() == {"t0", "t1", "t2", "t3", "t4"}
+        await tick(due_dates, clock, 9)
+        assert database.marks == []
+        await tick(due_dates, clock, 1)
+        assert database.marks == [["t0", "t1"], ["t2", "t3"], ["t4"]]
+        assert hub.events == [("task.overdue", f"t{i}") for i in range(5)]
+        assert not due_dates._tasks
+
+    run(due_dates, steps)
+
+def test_tasks_already_due_are_marked_on_load(database, hub, clock):
+    database.add("late", clock.now - 60)
+    due_dates = DueDateScheduler(reminder=0)
+
+    async def steps():
+        assert database.marks == [["late"]]
+        assert hub.events == [("task.overdue", "late")]
+
+    run(due_dates, steps)
+
+def test_reminder_comes_before_the_due_date(database, hub, clock):
+    due_dates = DueDateScheduler(reminder=60)
+
+    async def steps():
+        due_dates.schedule("t", iso(clock.now + 100), ("creator", "assignee"))
+        await tick(due_dates, clock, 40)
+        assert hub.events == [("task.due_soon", "t")]
+        database.add("t", clock.now + 60)
+        await tick(due_dates, clock, 60)
+        assert hub.events == [("task.due_soon", "t"), ("task.overdue", "t")]
+
+    run(due_dates, steps)
+
+def test_cancelled_and_rescheduled_tasks(database, hub, clock):
+    database.add("cancelled", clock.now + 10)
+    database.add("moved", clock.now + 10)
+    due_dates = DueDateScheduler(reminder=0)
+
+    async def steps():
+        due_dates.cancel("cancelled")
+        due_dates.schedule("moved", iso(clock.now + 20), ("creator", "assignee"))
+        database.tasks["moved"]["due_date"] = iso(clock.now + 20)
+        await tick(due_dates, clock, 10)
+        assert database.marks == []
+        await tick(due_dates, clock, 10)
+        assert database.marks == [["moved"]]
+
+    run(due_dates, steps)
+
+def test_failed_batches_are_retried(database, hub, clock):
+    database.add("t", clock.now + 10)
+    database.failures = 1
+    due_dates = DueDateScheduler(reminder=0, retry_delay=30)
+
+    async def steps():
+        await tick(due_dates, clock, 10)
+        assert database.marks == [["t"]]
+        assert hub.events == []
+        await tick(due_dates, clock, 30)
+        assert database.marks == [["t"], ["t"]]
+        assert hub.events == [("task.overdue", "t")]
+
+    run(due_dates, steps)
+
+def test_tasks_marked_elsewhere_are_dropped(database, hub, clock):
+    database.add("t", clock.now + 10)
+    due_dates = DueDateScheduler(reminder=0)
+
+    async def steps():
+        database.tasks["t"]["overdue_at"] = iso(clock.now)
+        await tick(due_dates, clock, 10)
+        assert database.marks == [["t"]]
+        assert hub.events == []
+        assert not due_dates._tasks
+
+    run(due_dates, steps)
+
+def test_schedule_is_a_no_op_when_not_running():
+    due_dates = DueDateScheduler()
+    due_dates.schedule("t", "2026-10-16T12:00:00+00:00", ("creator", "assignee"))
+    assert not due_dates._tasks
@@ -0,0 +1,116 @@
+from conftest import JWT_SECRET, sign
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+from security import TokenVerifier
+import asyncio
+import pytest
+import security
+import time
+
+def verifier(**kwargs) -> TokenVerifier:
+    verifier = TokenVerifier(jwt_secret=JWT_SECRET, **kwargs)
+    decode = verifier._decode
+    verifier.decoded = 0
+
+    async def counting_decode(token):
+        verifier.decoded += 1
+        return await decode(token)
+    verifier._decode = counting_decode
+    return verifier
+
+def test_verifies_hs256_tokens():
+    claims = asyncio.run(verifier().verify(sign("alice")))
+    assert claims["sub"] == "alice"
+    assert claims["email"] == "alice@example.com"
+
+def test_verified_tokens_are_cached():
+    tokens = verifier()
+    token = sign("alice")
+    asyncio.run(tokens.verify(token))
+    asyncio.run(tokens.verify(token))
+    assert tokens.decoded == 1
+
+def test_cached_tokens_expire(monkeypatch, clock):
+    clock.now = time.time()
+    tokens = verifier()
+    token = sign("alice", expires_in=60)
+    asyncio.run(tokens.verify(token))
+
+    # Past exp the cached claims are dropped and the token decoded again
+    monkeypatch.setattr(security, "time", clock)
+    clock.advance(61)
+    asyncio.run(tokens.verify(token))
+    assert tokens.decoded == 2
+
+def test_cache_is_bounded():
+    tokens = verifier(cache_size=2)
+    for user_id in ("alice", "bob", "carol"):
+        asyncio.run(tokens.verify(sign(user_id)))
+    assert len(tokens._cache) == 2
+
+@pytest.mark.parametrize("token", [
+    jwt.encode({"sub": "alice", "aud": "authenticated", "exp": time.time() + 60}, "wrong", algorithm="HS256"),
+    jwt.encode({"sub": "alice", "aud": "anon", "exp": time.time() + 60}, JWT_SECRET, algorithm="HS256"),
+    jwt.encode({"aud": "authenticated", "exp": time.time() + 60}, JWT_SECRET, algorithm="HS256"),
+    sign("alice", expires_in=-60),
+])
+def test_rejects_invalid_tokens(token):
+    with pytest.raises(JWTError):
+        asyncio.run(verifier().verify(token))
+
+def test_rejects_hs256_without_a_secret():
+    with pytest.raises(JWTError):
+        asyncio.run(TokenVerifier().verify(sign("alice")))
+
+def rsa_key(kid: str):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    public = jwk.construct(pem, "RS256").public_key().to_dict()
+    return pem, {**public, "kid": kid, "alg": "RS256"}
+
+def test_refetches_jwks_for_an_unknown_key(monkeypatch, clock):
+    old_pem, old_key = rsa_key("old")
+    new_pem, new_key = rsa_key("new")
+    untrusted_pem, _ = rsa_key("untrusted")
+    keys = [old_key]
+    tokens = TokenVerifier(jwks_url="http://auth.test/jwks.json")
+    fetches = []
+
+    async def fetch_jwks():
+        fetches.append(clock.now)
+        return {"keys": list(keys)}
+    tokens._fetch_jwks = fetch_jwks
+    monkeypatch.setattr(security, "time", clock)
+    clock.now = time.time()
+
+    claims = {"sub": "alice", "aud": "authenticated", "exp": int(clock.now + 3600)}
+    asyncio.run(tokens.verify(jwt.encode(claims, old_pem, "RS256", headers={"kid": "old"})))
+
+    # A rotated key is fetched once enough time has passed since the last fetch
+    keys.append(new_key)
+    clock.advance(security.JWKS_MIN_REFRESH + 1)
+    rotated = jwt.encode(claims, new_pem, "RS256", headers={"kid": "new"})
+    assert asyncio.run(tokens.verify(rotated))["sub"] == "alice"
+    assert len(fetches) == 2
+
+    # Unknown kids don't refetch more often than that
+    bogus = jwt.encode(claims, untrusted_pem, "RS256", headers={"kid": "bogus"})
+    with pytest.raises(JWTError):
+        asyncio.run(tokens.verify(bogus))
+    assert len(fetches) == 2
+
+def test_routes_verify_tokens_locally(client, login):
+    alice = login("alice")
+    assert client.post("/auth/generate-pairing-code", headers=alice).status_code == 200
+    assert client.get("/tasks/active", headers=alice).status_code == 200
+
+    forged = {"Authorization": "Bearer " + jwt.encode(
+        {"sub": "alice", "aud": "authenticated", "exp": time.time() + 60}, "wrong", algorithm="HS256"
+    )}
+    assert client.get("/tasks/active", headers=forged).status_code == 401
+    assert client.post("/auth/generate-pairing-code", headers=forged).status_code == 401
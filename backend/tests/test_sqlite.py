@@ -0,0 +1,109 @@
+from models.sqlite import SQLiteBackend
+import asyncio
+import models.sqlite
+import pytest
+import sqlite3
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "toucan.db"))
+    yield backend
+    asyncio.run(backend.close())
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_insert_returns_rows_with_defaults(backend):
+    rows = run(backend.insert("profiles", [
+        {"id": "alice", "email": "alice@example.com", "paired": True},
+        {"id": "bob", "email": "bob@example.com"},
+    ]))
+    assert [(row["id"], row["paired"], row["points"]) for row in rows] == [
+        ("alice", True, 0), ("bob", False, 0)
+    ]
+    assert rows[0]["created_at"].endswith("Z")
+
+def test_insert_generates_ids(backend):
+    run(backend.insert("profiles", {"id": "alice", "email": "alice@example.com"}))
+    row = run(backend.insert("tasks", {
+        "title": "Dishes", "description": "", "points": 1,
+        "creator_id": "alice", "assignee_id": "alice"
+    }))[0]
+    assert len(row["id"]) == 36
+    assert row["status"] == "active"
+    assert row["validation_required"] is False
+
+def test_failed_batch_inserts_nothing(backend):
+    with pytest.raises(sqlite3.IntegrityError):
+        run(backend.insert("profiles", [{"id": "alice"}, {"id": "alice"}]))
+    assert run(backend.select("profiles", {})) == []
+
+def test_upsert_merges_on_conflict(backend):
+    run(backend.insert("profiles", {"id": "alice", "email": "alice@example.com", "pair_code": "A"}))
+    rows = run(backend.upsert("profiles", {"id": "alice", "pair_code": "B"}, on_conflict="id"))
+    assert (rows[0]["email"], rows[0]["pair_code"]) == ("alice@example.com", "B")
+    assert len(run(backend.select("profiles", {}))) == 1
+
+def test_update_and_delete_return_the_rows(backend):
+    run(backend.insert("profiles", [{"id": "alice"}, {"id": "bob"}]))
+    updated = run(backend.update("profiles", {"id": "alice"}, {"paired": True}))
+    assert [(row["id"], row["paired"]) for row in updated] == [("alice", True)]
+    deleted = run(backend.delete("profiles", {"id": ["alice", "nobody"]}))
+    assert [row["id"] for row in deleted] == ["alice"]
+    assert [row["id"] for row in run(backend.select("profiles", {}, columns=["id"]))] == ["bob"]
+
+def test_foreign_keys_are_enforced(backend):
+    with pytest.raises(sqlite3.IntegrityError):
+        run(backend.insert("tasks", {
+            "title": "Dishes", "description": "", "points": 1,
+            "creator_id": "nobody", "assignee_id": "nobody"
+        }))
+
+def test_unknown_functions_are_refused(backend):
+    with pytest.raises(ValueError):
+        run(backend.rpc("drop_everything", {}))
+
+def test_data_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "toucan.db")
+    first = SQLiteBackend(path)
+    run(first.insert("profiles", {"id": "alice"}))
+    run(first.close())
+    second = SQLiteBackend(path)
+    assert [row["id"] for row in run(second.select("profiles", {}))] == ["alice"]
+    run(second.close())
+
+def test_older_databases_gain_new_task_columns(tmp_path):
+    path = str(tmp_path / "toucan.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE profiles (id TEXT PRIMARY KEY, email TEXT, pair_code TEXT,
+            points INTEGER DEFAULT 0, paired INTEGER DEFAULT 0, created_at TEXT NOT NULL DEFAULT '');
+        CREATE TABLE tasks (id TEXT PRIMARY KEY, title TEXT NOT NULL, description TEXT NOT NULL,
+            points INTEGER NOT NULL, creator_id TEXT NOT NULL, assignee_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active', validation_required INTEGER NOT NULL DEFAULT 0,
+            random_payout INTEGER NOT NULL DEFAULT 0, min_points INTEGER, max_points INTEGER,
+            due_date TEXT, created_at TEXT, updated_at TEXT);
+        INSERT INTO profiles (id) VALUES ('alice');
+        INSERT INTO tasks (id, title, description, points, creator_id, assignee_id, status)
+            VALUES ('t1', 'Dishes', '', 3, 'alice', 'alice', 'completed');
+    """)
+    conn.close()
+
+    backend = SQLiteBackend(path)
+    task = run(backend.select("tasks", {"id": "t1"}))[0]
+    assert task["completed_at"] is None and task["overdue_at"] is None
+    # Stats kept before completed_at existed are rebuilt
+    stats = run(backend.select("user_task_stats", {"user_id": "alice", "status": "completed"}))
+    assert {row["role"]: row["tasks"] for row in stats} == {"created": 1, "assigned": 1}
+    run(backend.close())
+
+def test_old_sqlite_versions_are_refused(monkeypatch):
+    monkeypatch.setattr(models.sqlite.sqlite3, "sqlite_version_info", (3, 34, 1))
+    with pytest.raises(RuntimeError, match="3.35.0"):
+        SQLiteBackend(":memory:")
+
+def test_runs_without_supabase(client, login):
+    alice = login("alice")
+    assert client.post("/auth/generate-pairing-code", headers=alice).status_code == 200
+    # Only the routes that ask Supabase Auth need it
+    assert client.get("/auth/user", headers=alice).status_code == 503
@@ -0,0 +1,74 @@
+from models.stats import TaskStats
+import asyncio
+
+STATS_TABLES = ("user_task_stats", "pair_task_stats", "user_weekly_stats", "user_streaks")
+
+def create_task(client, headers, points: int) -> str:
+    task = {"title": f"Task {points}", "description": "", "points": points}
+    return client.post("/tasks/", headers=headers, json=task).json()["id"]
+
+def test_stats_count_tasks_by_role_and_status(client, pair):
+    alice, bob = pair
+    done = create_task(client, alice, 5)
+    create_task(client, alice, 2)
+    client.post(f"/tasks/{done}/complete", headers=bob)
+
+    stats = client.get("/stats/?weeks=2", headers=alice).json()
+    assert stats["user"]["created"] == {
+        "active": {"tasks": 1, "points": 2}, "completed": {"tasks": 1, "points": 5}
+    }
+    assert stats["partner"]["assigned"]["completed"] == {"tasks": 1, "points": 5}
+    assert stats["pair"]["completed"] == {"tasks": 1, "points": 5}
+    assert len(stats["user"]["weekly"]) == 2
+    assert stats["user"]["points_earned"] == 5
+
+def test_leaderboard_ranks_by_points_earned(client, pair):
+    alice, bob = pair
+    client.post(f"/tasks/{create_task(client, alice, 5)}/complete", headers=bob)
+    client.post(f"/tasks/{create_task(client, bob, 3)}/complete", headers=alice)
+
+    entries = client.get("/stats/leaderboard", headers=bob).json()
+    assert [(entry["rank"], entry["points_earned"], entry["balance"]) for entry in entries] == [
+        (1, 5, 5), (2, 3, 3)
+    ]
+    assert entries[0]["email"].startswith(entries[0]["user_id"])
+
+def test_stats_revalidate_until_a_task_changes(client, pair):
+    alice, bob = pair
+    response = client.get("/stats/", headers=alice)
+    tag = response.headers["etag"]
+    assert client.get("/stats/", headers={**alice, "If-None-Match": tag}).status_code == 304
+
+    create_task(client, bob, 1)
+    response = client.get("/stats/", headers={**alice, "If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.json()["partner"]["created"]["active"]["tasks"] == 1
+
+def test_rebuild_reproduces_the_trigger_maintained_aggregates(database):
+    async def setup():
+        for user_id in ("alice", "bob"):
+            await database.insert("profiles", {"id": user_id, "email": f"{user_id}@example.com"})
+        for i, points in enumerate((5, 3, 2)):
+            await database.insert("tasks", {
+                "id": f"t{i}", "title": "Dishes", "description": "", "points": points,
+                "creator_id": "alice", "assignee_id": "bob"
+            })
+        await database.rpc("complete_task", {"p_task_id": "t0", "p_completed_by": "bob", "p_points": 5})
+        await database.rpc("complete_task", {"p_task_id": "t1", "p_completed_by": "bob", "p_points": 3})
+        await database.delete("tasks", {"id": "t2"})
+
+    async def snapshot():
+        tables = {}
+        for table in STATS_TABLES:
+            # Triggers keep counters that drop back to zero; readers treat
+            # them like the missing rows a rebuild leaves
+            rows = [row for row in await database.fetch_many(table, {}) if row.get("tasks") != 0]
+            tables[table] = sorted(rows, key=lambda row: sorted(row.items()))
+        return tables
+
+    asyncio.run(setup())
+    maintained = asyncio.run(snapshot())
+    assert maintained["user_task_stats"]
+
+    assert asyncio.run(TaskStats.rebuild()) == 2
+    assert asyncio.run(snapshot()) == maintained
@@ -0,0 +1,26 @@
+from benchmarks.task_list import make_profiles, make_rows, model_path, row_path
+from models.task import TASK_COLUMNS
+import json
+import re
+
+def test_row_path_matches_the_model_path():
+    rows = make_rows(20)
+    rows[1]["overdue_at"] = "2026-10-20T18:00:05+00:00"
+    profiles = make_profiles(rows)
+    assert json.loads(row_path(rows, profiles)) == json.loads(model_path(rows, profiles))
+
+def test_active_tasks_are_encoded_straight_from_rows(client, pair):
+    alice, bob = pair
+    client.post("/tasks/batch", headers=alice, json=[
+        {"title": "Dishes", "description": "", "points": 1, "due_date": "2030-01-01T00:00:00+00:00"},
+        {"title": "Laundry", "description": "", "points": 2, "validation_required": True},
+    ])
+    response = client.get("/tasks/active", headers=bob)
+    tasks = response.json()
+    assert [list(task) for task in tasks] == [TASK_COLUMNS, TASK_COLUMNS]
+    assert tasks[0]["due_date"] == "2030-01-01T00:00:00+00:00"
+    assert tasks[1]["validation_required"] is True
+    # One select, and no profile lookups for the creators and assignees
+    timing = response.headers["server-timing"]
+    assert re.search(r'db\.tasks\.select;dur=[\d.]+;desc="1x"', timing)
+    assert "profile" not in timing
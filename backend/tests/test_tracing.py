@@ -0,0 +1,67 @@
+from fastapi.testclient import TestClient
+from models.query import eq
+from tracing import MAX_SPANS, MAX_TIMING_ENTRIES, Span, Trace
+import logging
+import re
+
+def test_server_timing_sums_calls_most_expensive_first():
+    trace = Trace("request")
+    trace.add(Span("db", "tasks", "select", 0.002))
+    trace.add(Span("auth", "token", "verify", 0.001))
+    trace.add(Span("db", "tasks", "select", 0.003))
+    trace.add(Span("db", "profiles", "select", 0.004))
+
+    entries = trace.server_timing().split(", ")
+    assert entries[:3] == [
+        'db.tasks.select;dur=5.0;desc="2x"',
+        'db.profiles.select;dur=4.0;desc="1x"',
+        'auth;dur=1.0;desc="1x"',
+    ]
+    assert re.fullmatch(r"app;dur=[\d.]+", entries[3])
+    count, duration = trace.db_totals()
+    assert count == 3 and abs(duration - 0.009) < 1e-9
+
+def test_server_timing_is_bounded():
+    trace = Trace("request")
+    for i in range(MAX_TIMING_ENTRIES + 5):
+        trace.add(Span("db", f"table{i}", "select", 0.001))
+    assert len(trace.server_timing().split(", ")) == MAX_TIMING_ENTRIES + 1
+
+def test_spans_are_capped():
+    trace = Trace("request")
+    for _ in range(MAX_SPANS + 3):
+        trace.add(Span("db", "tasks", "select", 0.001))
+    assert len(trace.spans) == MAX_SPANS
+    assert trace.dropped == 3
+
+def test_summary_shows_filter_shapes_not_values():
+    trace = Trace("request")
+    trace.add(Span("db", "tasks", "select", 0.0012345, eq("creator_id", "alice")))
+    assert trace.summary() == [{
+        "kind": "db", "name": "tasks", "operation": "select",
+        "filter": "and(creator_id.eq)", "ms": 1.23
+    }]
+
+def test_request_ids(client):
+    assert client.get("/health", headers={"X-Request-ID": "proxy-1.2_3"}).headers["x-request-id"] == "proxy-1.2_3"
+    replaced = client.get("/health", headers={"X-Request-ID": "bad id; drop"}).headers["x-request-id"]
+    assert re.fullmatch(r"[0-9a-f]{32}", replaced)
+
+def test_responses_carry_server_timing(client, pair):
+    _, bob = pair
+    timing = client.get("/tasks/active", headers=bob).headers["server-timing"]
+    assert re.search(r'db\.tasks\.select;dur=[\d.]+;desc="1x"', timing)
+    assert 'auth;dur=' in timing
+
+def test_slow_requests_are_logged_with_their_spans(environment, monkeypatch, login, caplog):
+    monkeypatch.setenv("SLOW_REQUEST_MS", "0")
+    monkeypatch.setenv("SERVER_TIMING", "false")
+    from main import create_app
+    with TestClient(create_app()) as client:
+        with caplog.at_level(logging.WARNING, logger="tracing"):
+            response = client.get("/tasks/active", headers=login("alice"))
+    assert "server-timing" not in response.headers
+
+    slow = [record for record in caplog.records if record.getMessage().startswith("Slow request GET /tasks/active")]
+    assert len(slow) == 1
+    assert {"kind": "auth", "name": "token", "operation": "verify"}.items() <= slow[0].spans[0].items()
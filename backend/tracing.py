@@ -0,0 +1,187 @@
+from typing import Optional, List, Dict, Any, Tuple
+from contextvars import ContextVar
+from models.query import Filters, describe
+import logging
+import os
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Spans kept per request, so long streams can't grow a trace without bound
+MAX_SPANS = 1000
+# Distinct entries in the Server-Timing header
+MAX_TIMING_ENTRIES = 20
+
+REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]+$")
+
+class Span:
+    """One timed call made while serving a request"""
+
+    __slots__ = ("kind", "name", "operation", "duration", "filters")
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        operation: str,
+        duration: float,
+        filters: Optional[Filters] = None
+    ):
+        self.kind = kind
+        self.name = name
+        self.operation = operation
+        self.duration = duration
+        self.filters = filters
+
+class Trace:
+    """Identity and timings collected for a single request"""
+
+    def __init__(self, request_id: str, scope: Optional[Dict[str, Any]] = None):
+        self.request_id = request_id
+        self.user_id: Optional[str] = None
+        self.scope = scope or {}
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+    @property
+    def route(self) -> Optional[str]:
+        # Set on the scope by the router once the request has been matched
+        return getattr(self.scope.get("route"), "path", None)
+
+    def db_totals(self) -> Tuple[int, float]:
+        """Number of database calls so far and their total duration"""
+        spans = [span for span in self.spans if span.kind == "db"]
+        return len(spans), sum(span.duration for span in spans)
+
+    def add(self, span: Span) -> None:
+        if len(self.spans) < MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Summarize the spans as a Server-Timing header value"""
+        totals: Dict[str, List[float]] = {}
+        for span in self.spans:
+            key = f"{span.kind}.{span.name}.{span.operation}" if span.kind == "db" else span.kind
+            entry = totals.setdefault(key, [0.0, 0])
+            entry[0] += span.duration
+            entry[1] += 1
+
+        # The most expensive entries first
+        ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+        entries = [
+            f'{key};dur={duration * 1000:.1f};desc="{count}x"'
+            for key, (duration, count) in ranked[:MAX_TIMING_ENTRIES]
+        ]
+        entries.append(f"app;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(entries)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """The spans as structured records, including each filter's shape"""
+        return [
+            {
+                "kind": span.kind,
+                "name": span.name,
+                "operation": span.operation,
+                "filter": describe(span.filters) if span.filters is not None else None,
+                "ms": round(span.duration * 1000, 2),
+            }
+            for span in self.spans
+        ]
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def set_user(user_id: str) -> None:
+    """Attribute the current request to an authenticated user"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.user_id = user_id
+
+def _request_id(scope) -> str:
+    # Reuse the caller's id (e.g. from the proxy) when it looks sane
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            request_id = value.decode("latin-1")
+            if 0 < len(request_id) <= 64 and REQUEST_ID.match(request_id):
+                return request_id
+    return uuid.uuid4().hex
+
+def record(
+    kind: str,
+    name: str,
+    operation: str,
+    duration: float,
+    filters: Optional[Filters] = None
+) -> None:
+    """Add a span to the current request's trace, if there is one"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(Span(kind, name, operation, duration, filters))
+
+class TracingMiddleware:
+    """ASGI middleware that traces each request.
+
+    Assigns a request id (echoed in X-Request-ID), adds a Server-Timing header
+    summarizing where the time went and logs requests slower than
+    SLOW_REQUEST_MS with every traced call. Event streams stay open by design
+    and are never logged as slow.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.slow_threshold = float(os.getenv("SLOW_REQUEST_MS", "500")) / 1000
+        self.server_timing = os.getenv("SERVER_TIMING", "true").lower() == "true"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(_request_id(scope), scope)
+        token = _current_trace.set(trace)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                streaming = any(
+                    name.lower() == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in headers
+                )
+                headers.append((b"x-request-id", trace.request_id.encode("latin-1")))
+                if self.server_timing:
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = trace.elapsed()
+            if duration >= self.slow_threshold and not streaming:
+                logger.warning(
+                    "Slow request %s %s took %.0fms",
+                    scope["method"], scope["path"], duration * 1000,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "ms": round(duration * 1000, 2),
+                        "spans": trace.summary(),
+                        "dropped_spans": trace.dropped,
+                    }
+                )
+            _current_trace.reset(token)
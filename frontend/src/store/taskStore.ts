@@ -166,10 +166,19 @@ export const useTaskStore = create<TaskState>()((set, get) => ({
     set({ loading: true, error: null })
 
     try {
-      const response = await api.get('/tasks/active')
+      // Follow the pagination cursor until every page is loaded
+      const tasks: Task[] = []
+      let cursor: string | undefined
+      do {
+        const response = await api.get('/tasks/active', {
+          params: cursor ? { cursor } : undefined
+        })
+        tasks.push(...response.data)
+        cursor = response.headers['x-next-cursor']
+      } while (cursor)
       // Keep existing tasks until we have new ones
-      set((state) => ({ 
-        tasks: response.data,
+      set((state) => ({
+        tasks,
         loading: false, 
         error: null 
       }))
@@ -0,0 +1,9 @@
+-- Indexes backing the server-side filters used by the backend
+
+-- Active tasks a user created or is assigned to
+CREATE INDEX IF NOT EXISTS tasks_status_creator_id_idx ON tasks (status, creator_id);
+CREATE INDEX IF NOT EXISTS tasks_status_assignee_id_idx ON tasks (status, assignee_id);
+
+-- Approved pairing lookups from either side
+CREATE INDEX IF NOT EXISTS pairings_user_id_idx ON pairings (user_id);
+CREATE INDEX IF NOT EXISTS pairings_partner_id_idx ON pairings (partner_id);
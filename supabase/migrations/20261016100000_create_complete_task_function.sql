@@ -0,0 +1,40 @@
+-- Complete a task and award its points to the creator in one transaction.
+-- Returns the creator's new balance, or NULL if the task could not be completed
+-- (not found, not active, not assigned to the caller or awaiting validation).
+CREATE OR REPLACE FUNCTION public.complete_task(
+    p_task_id UUID,
+    p_completed_by UUID,
+    p_points INTEGER
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_creator_id UUID;
+    v_balance INTEGER;
+BEGIN
+    UPDATE tasks
+       SET status = 'completed'
+     WHERE id = p_task_id
+       AND status = 'active'
+       AND assignee_id = p_completed_by
+       AND (NOT validation_required OR creator_id = p_completed_by)
+    RETURNING creator_id INTO v_creator_id;
+
+    IF v_creator_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Increment in place so concurrent completions can't lose points
+    UPDATE profiles
+       SET points = COALESCE(points, 0) + p_points
+     WHERE id = v_creator_id
+    RETURNING points INTO v_balance;
+
+    RETURN v_balance;
+END;
+$$;
+
+-- Only the backend (service role) may complete tasks through this function
+REVOKE EXECUTE ON FUNCTION public.complete_task(UUID, UUID, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.complete_task(UUID, UUID, INTEGER) TO service_role;
@@ -0,0 +1,52 @@
+-- Complete several tasks and award their points in one transaction.
+-- p_points holds the points to award for each task in p_task_ids. Awards are
+-- summed per creator so each balance is incremented once.
+-- 20261016130000_create_points_ledger replaces this function: it appends one
+-- points_ledger row per completed task instead of summing awards per creator.
+-- Returns {"completed": [task ids], "balances": {creator id: new balance}}.
+CREATE OR REPLACE FUNCTION public.complete_tasks(
+    p_task_ids UUID[],
+    p_completed_by UUID,
+    p_points INTEGER[]
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_completed UUID[];
+    v_balances JSONB;
+BEGIN
+    WITH awards AS (
+        SELECT task_id, points
+          FROM unnest(p_task_ids, p_points) AS a(task_id, points)
+    ), completed AS (
+        UPDATE tasks t
+           SET status = 'completed'
+          FROM awards a
+         WHERE t.id = a.task_id
+           AND t.status = 'active'
+           AND t.assignee_id = p_completed_by
+           AND (NOT t.validation_required OR t.creator_id = p_completed_by)
+        RETURNING t.id, t.creator_id, a.points
+    ), totals AS (
+        SELECT creator_id, SUM(points)::INTEGER AS points
+          FROM completed
+         GROUP BY creator_id
+    ), credited AS (
+        UPDATE profiles p
+           SET points = COALESCE(p.points, 0) + totals.points
+          FROM totals
+         WHERE p.id = totals.creator_id
+        RETURNING p.id, p.points
+    )
+    SELECT COALESCE((SELECT array_agg(id) FROM completed), '{}'),
+           COALESCE((SELECT jsonb_object_agg(id, points) FROM credited), '{}'::JSONB)
+      INTO v_completed, v_balances;
+
+    RETURN jsonb_build_object('completed', to_jsonb(v_completed), 'balances', v_balances);
+END;
+$$;
+
+-- Only the backend (service role) may complete tasks through this function
+REVOKE EXECUTE ON FUNCTION public.complete_tasks(UUID[], UUID, INTEGER[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.complete_tasks(UUID[], UUID, INTEGER[]) TO service_role;
@@ -0,0 +1,98 @@
+-- Pairing codes must be unique so a code always identifies one profile.
+-- Clear any codes that were handed out twice; those users generate a new one.
+UPDATE profiles p
+   SET pair_code = NULL
+ WHERE pair_code IS NOT NULL
+   AND EXISTS (
+       SELECT 1 FROM profiles o
+        WHERE o.pair_code = p.pair_code
+          AND o.id < p.id
+   );
+
+CREATE UNIQUE INDEX IF NOT EXISTS profiles_pair_code_key ON profiles (pair_code);
+
+-- Send a pairing request to the owner of a pairing code.
+-- Returns {"partner_id": ...} or {"error": "invalid_code" | "self" | "exists"}.
+CREATE OR REPLACE FUNCTION public.request_pairing(
+    p_user_id UUID,
+    p_pair_code TEXT
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_partner_id UUID;
+BEGIN
+    SELECT id INTO v_partner_id
+      FROM profiles
+     WHERE pair_code = p_pair_code;
+
+    IF v_partner_id IS NULL THEN
+        RETURN jsonb_build_object('error', 'invalid_code');
+    END IF;
+
+    IF v_partner_id = p_user_id THEN
+        RETURN jsonb_build_object('error', 'self');
+    END IF;
+
+    -- Serialize concurrent requests between the same two users
+    PERFORM pg_advisory_xact_lock(hashtext(
+        LEAST(p_user_id, v_partner_id)::TEXT || GREATEST(p_user_id, v_partner_id)::TEXT
+    ));
+
+    IF EXISTS (
+        SELECT 1 FROM pairings
+         WHERE (user_id = p_user_id AND partner_id = v_partner_id)
+            OR (user_id = v_partner_id AND partner_id = p_user_id)
+    ) THEN
+        RETURN jsonb_build_object('error', 'exists');
+    END IF;
+
+    INSERT INTO pairings (user_id, partner_id, status)
+    VALUES (p_user_id, v_partner_id, 'pending');
+
+    RETURN jsonb_build_object('partner_id', v_partner_id);
+END;
+$$;
+
+-- Accept the oldest pending request sent to a user and mark both profiles paired.
+-- Returns {"partner_id": ...} or {"error": "not_found"}.
+CREATE OR REPLACE FUNCTION public.accept_pairing(
+    p_user_id UUID
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_pairing_id UUID;
+    v_requester_id UUID;
+BEGIN
+    SELECT id, user_id INTO v_pairing_id, v_requester_id
+      FROM pairings
+     WHERE partner_id = p_user_id
+       AND status = 'pending'
+     ORDER BY created_at
+     LIMIT 1
+       FOR UPDATE;
+
+    IF v_pairing_id IS NULL THEN
+        RETURN jsonb_build_object('error', 'not_found');
+    END IF;
+
+    UPDATE pairings
+       SET status = 'approved'
+     WHERE id = v_pairing_id;
+
+    UPDATE profiles
+       SET paired = TRUE
+     WHERE id IN (p_user_id, v_requester_id);
+
+    RETURN jsonb_build_object('partner_id', v_requester_id);
+END;
+$$;
+
+-- Only the backend (service role) may change pairings through these functions
+REVOKE EXECUTE ON FUNCTION public.request_pairing(UUID, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.accept_pairing(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.request_pairing(UUID, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.accept_pairing(UUID) TO service_role;
@@ -0,0 +1,238 @@
+-- Append-only ledger of point awards. Completions append a row instead of
+-- updating the creator's profile, so concurrent completions never contend on
+-- the same row, and every award is kept for audits and stats.
+--
+-- profiles.points is a checkpoint: the balance up to points_checkpoint.ledger_id.
+-- A balance is the checkpoint plus the ledger rows after it, which
+-- compact_points_ledger() periodically folds into profiles.points. Reads
+-- therefore only ever sum the short tail since the last compaction.
+CREATE TABLE points_ledger (
+    id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    user_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    -- No foreign key: the award stays on record if the task is deleted
+    task_id UUID,
+    delta INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+);
+
+-- Balance tails and a user's history, newest first, both walk this index
+CREATE INDEX points_ledger_user_id_id_idx ON points_ledger (user_id, id);
+
+-- The ledger id up to which balances are folded into profiles.points
+CREATE TABLE points_checkpoint (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    ledger_id BIGINT NOT NULL DEFAULT 0,
+    compacted_at TIMESTAMP WITH TIME ZONE
+);
+INSERT INTO points_checkpoint (id) VALUES (true);
+
+-- Ledger rows are never changed; deletes only happen through the cascade
+-- when a profile is removed
+CREATE OR REPLACE FUNCTION public.reject_ledger_update()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RAISE EXCEPTION 'points_ledger is append-only';
+END;
+$$;
+
+CREATE TRIGGER points_ledger_append_only
+    BEFORE UPDATE ON points_ledger
+    FOR EACH ROW
+    EXECUTE FUNCTION public.reject_ledger_update();
+
+REVOKE UPDATE, DELETE, TRUNCATE ON points_ledger FROM PUBLIC, anon, authenticated, service_role;
+
+ALTER TABLE points_ledger ENABLE ROW LEVEL SECURITY;
+ALTER TABLE points_checkpoint ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own point history"
+    ON points_ledger FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Anyone can read the points checkpoint"
+    ON points_checkpoint FOR SELECT
+    USING (true);
+
+-- Profiles with their current balance; read this rather than profiles.points
+CREATE OR REPLACE VIEW profile_balances
+WITH (security_invoker = true) AS
+SELECT p.id, p.email, p.pair_code, p.paired, p.created_at,
+       COALESCE(p.points, 0) + COALESCE((
+           SELECT SUM(l.delta)
+             FROM points_ledger l
+            WHERE l.user_id = p.id
+              AND l.id > (SELECT ledger_id FROM points_checkpoint)
+       ), 0)::INTEGER AS points
+  FROM profiles p;
+
+-- Current balance of one user
+CREATE OR REPLACE FUNCTION public.points_balance(p_user_id UUID)
+RETURNS INTEGER
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT points FROM profile_balances WHERE id = p_user_id;
+$$;
+
+-- Append an award and return the user's new balance, or NULL if there is no
+-- such user
+CREATE OR REPLACE FUNCTION public.award_points(
+    p_user_id UUID,
+    p_delta INTEGER,
+    p_task_id UUID DEFAULT NULL
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM profiles WHERE id = p_user_id) THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO points_ledger (user_id, task_id, delta)
+    VALUES (p_user_id, p_task_id, p_delta);
+    RETURN points_balance(p_user_id);
+END;
+$$;
+
+-- Fold the ledger rows added since the last compaction into profiles.points.
+-- Returns the number of balances updated.
+--
+-- Every replica calls this on a timer, but only one compaction runs per
+-- p_min_interval seconds across all of them: a caller that finds another
+-- compaction in progress, or one finished within the interval, returns 0
+-- without locking the ledger.
+CREATE OR REPLACE FUNCTION public.compact_points_ledger(
+    p_min_interval DOUBLE PRECISION DEFAULT 0
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_from BIGINT;
+    v_to BIGINT;
+    v_updated INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('compact_points_ledger')) THEN
+        RETURN 0;
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM points_checkpoint
+         WHERE compacted_at > now() - make_interval(secs => p_min_interval)
+    ) THEN
+        RETURN 0;
+    END IF;
+
+    -- Identity values are handed out before commit, so wait for in-flight
+    -- appends to finish; otherwise a lower id could commit after we moved
+    -- the checkpoint past it and never be counted. Appends wait for the
+    -- (short) compaction in turn, so give up rather than queue them behind
+    -- a long-running append.
+    SET LOCAL lock_timeout = '2s';
+    LOCK TABLE points_ledger IN SHARE MODE;
+
+    SELECT ledger_id INTO v_from FROM points_checkpoint FOR UPDATE;
+    SELECT COALESCE(MAX(id), v_from) INTO v_to FROM points_ledger;
+    IF v_to = v_from THEN
+        UPDATE points_checkpoint SET compacted_at = now();
+        RETURN 0;
+    END IF;
+
+    WITH tail AS (
+        SELECT user_id, SUM(delta)::INTEGER AS delta
+          FROM points_ledger
+         WHERE id > v_from AND id <= v_to
+         GROUP BY user_id
+    )
+    UPDATE profiles p
+       SET points = COALESCE(p.points, 0) + tail.delta
+      FROM tail
+     WHERE p.id = tail.user_id;
+    GET DIAGNOSTICS v_updated = ROW_COUNT;
+
+    UPDATE points_checkpoint SET ledger_id = v_to, compacted_at = now();
+    RETURN v_updated;
+END;
+$$;
+
+-- Completions append to the ledger instead of incrementing profiles.points
+CREATE OR REPLACE FUNCTION public.complete_task(
+    p_task_id UUID,
+    p_completed_by UUID,
+    p_points INTEGER
+)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_creator_id UUID;
+BEGIN
+    UPDATE tasks
+       SET status = 'completed'
+     WHERE id = p_task_id
+       AND status = 'active'
+       AND assignee_id = p_completed_by
+       AND (NOT validation_required OR creator_id = p_completed_by)
+    RETURNING creator_id INTO v_creator_id;
+
+    IF v_creator_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO points_ledger (user_id, task_id, delta)
+    VALUES (v_creator_id, p_task_id, p_points);
+
+    RETURN points_balance(v_creator_id);
+END;
+$$;
+
+-- Appends one ledger row per completed task, so each award keeps its task_id
+-- in the history, then returns every creator's new balance
+CREATE OR REPLACE FUNCTION public.complete_tasks(
+    p_task_ids UUID[],
+    p_completed_by UUID,
+    p_points INTEGER[]
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_completed UUID[];
+    v_balances JSONB;
+BEGIN
+    WITH awards AS (
+        SELECT task_id, points
+          FROM unnest(p_task_ids, p_points) AS a(task_id, points)
+    ), completed AS (
+        UPDATE tasks t
+           SET status = 'completed'
+          FROM awards a
+         WHERE t.id = a.task_id
+           AND t.status = 'active'
+           AND t.assignee_id = p_completed_by
+           AND (NOT t.validation_required OR t.creator_id = p_completed_by)
+        RETURNING t.id, t.creator_id, a.points
+    ), appended AS (
+        INSERT INTO points_ledger (user_id, task_id, delta)
+        SELECT creator_id, id, points FROM completed
+        RETURNING user_id
+    )
+    SELECT COALESCE((SELECT array_agg(id) FROM completed), '{}')
+      INTO v_completed;
+
+    -- Computed after the insert so the new rows are part of the balances
+    SELECT COALESCE(jsonb_object_agg(b.id, b.points), '{}'::JSONB)
+      INTO v_balances
+      FROM profile_balances b
+     WHERE b.id IN (SELECT creator_id FROM tasks WHERE id = ANY(v_completed));
+
+    RETURN jsonb_build_object('completed', to_jsonb(v_completed), 'balances', v_balances);
+END;
+$$;
+
+-- Only the backend (service role) may award points or compact the ledger
+REVOKE EXECUTE ON FUNCTION public.award_points(UUID, INTEGER, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.award_points(UUID, INTEGER, UUID) TO service_role;
+REVOKE EXECUTE ON FUNCTION public.compact_points_ledger(DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.compact_points_ledger(DOUBLE PRECISION) TO service_role;
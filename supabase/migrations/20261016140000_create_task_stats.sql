@@ -0,0 +1,252 @@
+-- Aggregates behind GET /stats, kept up to date by triggers as tasks and
+-- ledger rows are written, so reading them never scans tasks.
+--
+-- user_task_stats: tasks and points per user, role (created/assigned) and status
+-- pair_task_stats: the same per pair of users (user_a < user_b) and status
+-- user_weekly_stats: tasks completed (as assignee) and points earned per week
+-- user_streaks: consecutive UTC days with at least one completed task
+--
+-- rebuild_task_stats() recomputes everything from tasks and points_ledger.
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+UPDATE tasks SET completed_at = updated_at WHERE status = 'completed' AND completed_at IS NULL;
+
+CREATE TABLE user_task_stats (
+    user_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('created', 'assigned')),
+    status TEXT NOT NULL,
+    tasks INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, role, status)
+);
+
+CREATE TABLE pair_task_stats (
+    user_a UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    user_b UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    status TEXT NOT NULL,
+    tasks INTEGER NOT NULL DEFAULT 0,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_a, user_b, status),
+    CHECK (user_a < user_b)
+);
+
+CREATE TABLE user_weekly_stats (
+    user_id UUID NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    -- Monday of the UTC week
+    week DATE NOT NULL,
+    tasks_completed INTEGER NOT NULL DEFAULT 0,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week)
+);
+
+CREATE TABLE user_streaks (
+    user_id UUID PRIMARY KEY REFERENCES profiles(id) ON DELETE CASCADE,
+    current_streak INTEGER NOT NULL DEFAULT 0,
+    longest_streak INTEGER NOT NULL DEFAULT 0,
+    last_completed_on DATE
+);
+
+ALTER TABLE user_task_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE pair_task_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_weekly_stats ENABLE ROW LEVEL SECURITY;
+ALTER TABLE user_streaks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own task stats"
+    ON user_task_stats FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "Users can view their pairs' task stats"
+    ON pair_task_stats FOR SELECT USING (auth.uid() = user_a OR auth.uid() = user_b);
+CREATE POLICY "Users can view their own weekly stats"
+    ON user_weekly_stats FOR SELECT USING (auth.uid() = user_id);
+CREATE POLICY "Users can view their own streak"
+    ON user_streaks FOR SELECT USING (auth.uid() = user_id);
+
+CREATE OR REPLACE FUNCTION public.utc_week(p_at TIMESTAMP WITH TIME ZONE)
+RETURNS DATE
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT date_trunc('week', p_at AT TIME ZONE 'UTC')::DATE;
+$$;
+
+-- Stamp the completion time; the stats and streaks are keyed on it
+CREATE OR REPLACE FUNCTION public.set_completed_at()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.status = 'completed' AND OLD.status IS DISTINCT FROM 'completed' THEN
+        NEW.completed_at := now();
+    ELSIF NEW.status <> 'completed' THEN
+        NEW.completed_at := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER tasks_set_completed_at
+    BEFORE UPDATE OF status ON tasks
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_completed_at();
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one task from the aggregates
+CREATE OR REPLACE FUNCTION public.apply_task_stats(p_task tasks, p_sign INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO user_task_stats AS s (user_id, role, status, tasks, points)
+    VALUES (p_task.creator_id, 'created', p_task.status, p_sign, p_sign * p_task.points),
+           (p_task.assignee_id, 'assigned', p_task.status, p_sign, p_sign * p_task.points)
+    ON CONFLICT (user_id, role, status) DO UPDATE
+       SET tasks = s.tasks + excluded.tasks,
+           points = s.points + excluded.points;
+
+    INSERT INTO pair_task_stats AS s (user_a, user_b, status, tasks, points)
+    VALUES (LEAST(p_task.creator_id, p_task.assignee_id),
+            GREATEST(p_task.creator_id, p_task.assignee_id),
+            p_task.status, p_sign, p_sign * p_task.points)
+    ON CONFLICT (user_a, user_b, status) DO UPDATE
+       SET tasks = s.tasks + excluded.tasks,
+           points = s.points + excluded.points;
+
+    IF p_task.status = 'completed' AND p_task.completed_at IS NOT NULL THEN
+        INSERT INTO user_weekly_stats AS s (user_id, week, tasks_completed)
+        VALUES (p_task.assignee_id, utc_week(p_task.completed_at), p_sign)
+        ON CONFLICT (user_id, week) DO UPDATE
+           SET tasks_completed = s.tasks_completed + excluded.tasks_completed;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.track_task_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_day DATE;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_task_stats(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_task_stats(NEW, 1);
+    END IF;
+
+    -- Streaks only move forward; deleting a completed task doesn't shorten
+    -- one until the next rebuild
+    IF TG_OP = 'UPDATE' AND NEW.status = 'completed' AND OLD.status <> 'completed' THEN
+        v_day := (NEW.completed_at AT TIME ZONE 'UTC')::DATE;
+        INSERT INTO user_streaks AS s (user_id, current_streak, longest_streak, last_completed_on)
+        VALUES (NEW.assignee_id, 1, 1, v_day)
+        ON CONFLICT (user_id) DO UPDATE
+           SET current_streak = CASE
+                   WHEN s.last_completed_on >= v_day THEN s.current_streak
+                   WHEN s.last_completed_on = v_day - 1 THEN s.current_streak + 1
+                   ELSE 1
+               END,
+               longest_streak = GREATEST(s.longest_streak, CASE
+                   WHEN s.last_completed_on >= v_day THEN s.current_streak
+                   WHEN s.last_completed_on = v_day - 1 THEN s.current_streak + 1
+                   ELSE 1
+               END),
+               last_completed_on = GREATEST(s.last_completed_on, v_day);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER tasks_track_stats
+    AFTER INSERT OR DELETE OR UPDATE OF status, points, creator_id, assignee_id ON tasks
+    FOR EACH ROW
+    EXECUTE FUNCTION public.track_task_stats();
+
+CREATE OR REPLACE FUNCTION public.track_points_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO user_weekly_stats AS s (user_id, week, points_earned)
+    VALUES (NEW.user_id, utc_week(NEW.created_at), NEW.delta)
+    ON CONFLICT (user_id, week) DO UPDATE
+       SET points_earned = s.points_earned + excluded.points_earned;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER points_ledger_track_stats
+    AFTER INSERT ON points_ledger
+    FOR EACH ROW
+    EXECUTE FUNCTION public.track_points_stats();
+
+-- Recompute every aggregate from tasks and points_ledger. Returns the number
+-- of tasks counted.
+--
+-- Maintenance only: it holds a SHARE lock on tasks and points_ledger until
+-- the transaction ends, so every task write and ledger append waits for the
+-- whole rebuild. Nothing in the backend calls it at runtime; it runs once
+-- below and from `python -m commands.rebuild_stats`.
+CREATE OR REPLACE FUNCTION public.rebuild_task_stats()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Keep writers (and their triggers) out until the aggregates are consistent
+    LOCK TABLE tasks, points_ledger IN SHARE MODE;
+
+    DELETE FROM user_task_stats;
+    DELETE FROM pair_task_stats;
+    DELETE FROM user_weekly_stats;
+    DELETE FROM user_streaks;
+
+    INSERT INTO user_task_stats (user_id, role, status, tasks, points)
+    SELECT creator_id, 'created', status, COUNT(*), SUM(points)
+      FROM tasks GROUP BY creator_id, status
+    UNION ALL
+    SELECT assignee_id, 'assigned', status, COUNT(*), SUM(points)
+      FROM tasks GROUP BY assignee_id, status;
+
+    INSERT INTO pair_task_stats (user_a, user_b, status, tasks, points)
+    SELECT LEAST(creator_id, assignee_id), GREATEST(creator_id, assignee_id),
+           status, COUNT(*), SUM(points)
+      FROM tasks
+     GROUP BY 1, 2, status;
+
+    INSERT INTO user_weekly_stats (user_id, week, tasks_completed, points_earned)
+    SELECT user_id, week, SUM(completed), SUM(points)
+      FROM (
+        SELECT assignee_id AS user_id, utc_week(completed_at) AS week, 1 AS completed, 0 AS points
+          FROM tasks
+         WHERE status = 'completed' AND completed_at IS NOT NULL
+        UNION ALL
+        SELECT user_id, utc_week(created_at), 0, delta
+          FROM points_ledger
+      ) events
+     GROUP BY user_id, week;
+
+    -- Consecutive days share the same (day - row number), one group per streak
+    WITH days AS (
+        SELECT DISTINCT assignee_id AS user_id, (completed_at AT TIME ZONE 'UTC')::DATE AS day
+          FROM tasks
+         WHERE status = 'completed' AND completed_at IS NOT NULL
+    ), runs AS (
+        SELECT user_id, day,
+               day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::INTEGER AS run
+          FROM days
+    ), streaks AS (
+        SELECT user_id, COUNT(*)::INTEGER AS length, MAX(day) AS last_day
+          FROM runs
+         GROUP BY user_id, run
+    )
+    INSERT INTO user_streaks (user_id, current_streak, longest_streak, last_completed_on)
+    SELECT user_id, (array_agg(length ORDER BY last_day DESC))[1], MAX(length), MAX(last_day)
+      FROM streaks
+     GROUP BY user_id;
+
+    RETURN (SELECT COUNT(*) FROM tasks);
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.rebuild_task_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.rebuild_task_stats() TO service_role;
+
+SELECT rebuild_task_stats();
@@ -0,0 +1,43 @@
+-- Overdue tasks. The backend's due date scheduler sets overdue_at when an
+-- active task's due date passes; the task stays active and can still be
+-- completed or deleted.
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS overdue_at TIMESTAMP WITH TIME ZONE;
+
+-- The scheduler loads the next window of due dates from this index, so
+-- restarts only read the tasks that are still waiting to come due
+CREATE INDEX IF NOT EXISTS tasks_pending_due_date_idx ON tasks (due_date)
+    WHERE status = 'active' AND overdue_at IS NULL AND due_date IS NOT NULL;
+
+-- Mark the given tasks overdue if they are active, unmarked and due by
+-- p_now (the scheduler's clock, so a task fires when the backend says it's
+-- due). Returns the tasks marked; others were completed, deleted or already
+-- marked by another replica.
+CREATE OR REPLACE FUNCTION public.mark_tasks_overdue(
+    p_task_ids UUID[],
+    p_now TIMESTAMP WITH TIME ZONE
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_marked JSONB;
+BEGIN
+    WITH marked AS (
+        UPDATE tasks
+           SET overdue_at = p_now
+         WHERE id = ANY(p_task_ids)
+           AND status = 'active'
+           AND overdue_at IS NULL
+           AND due_date <= p_now
+        RETURNING id, creator_id, assignee_id, due_date, overdue_at
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(marked)), '[]'::JSONB)
+      INTO v_marked
+      FROM marked;
+
+    RETURN v_marked;
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION public.mark_tasks_overdue(UUID[], TIMESTAMP WITH TIME ZONE) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.mark_tasks_overdue(UUID[], TIMESTAMP WITH TIME ZONE) TO service_role;
@@ -0,0 +1,121 @@
+-- Per-user data versions behind the API's ETags. Triggers bump a user's
+-- version in the same transaction as any change to their tasks, points,
+-- pairings or profile, so every replica derives the same ETag from the
+-- database instead of from a per-process cache.
+CREATE TABLE user_versions (
+    -- No foreign key: tasks deleted along with a profile still bump it,
+    -- and a leftover row for a removed user is harmless
+    user_id UUID PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+ALTER TABLE user_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own version"
+    ON user_versions FOR SELECT USING (auth.uid() = user_id);
+
+-- Bump each distinct user once, in id order so concurrent bumps of the same
+-- pair can't deadlock
+CREATE OR REPLACE FUNCTION public.bump_user_versions(p_user_ids UUID[])
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    INSERT INTO user_versions AS v (user_id, version)
+    SELECT DISTINCT id, 1
+      FROM unnest(p_user_ids) AS id
+     WHERE id IS NOT NULL
+     ORDER BY 1
+    ON CONFLICT (user_id) DO UPDATE SET version = v.version + 1;
+$$;
+
+-- Statement-level, so a bulk write bumps each user once however many rows
+-- it touches. Only the transition tables of the firing event exist.
+CREATE OR REPLACE FUNCTION public.bump_task_user_versions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_user_versions(ARRAY(
+            SELECT creator_id FROM new_rows UNION SELECT assignee_id FROM new_rows
+        ));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_user_versions(ARRAY(
+            SELECT creator_id FROM old_rows UNION SELECT assignee_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER tasks_versions_insert
+    AFTER INSERT ON tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_task_user_versions();
+
+CREATE TRIGGER tasks_versions_update
+    AFTER UPDATE ON tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_task_user_versions();
+
+CREATE TRIGGER tasks_versions_delete
+    AFTER DELETE ON tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_task_user_versions();
+
+CREATE OR REPLACE FUNCTION public.bump_ledger_user_versions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM bump_user_versions(ARRAY(SELECT user_id FROM new_rows));
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER points_ledger_versions
+    AFTER INSERT ON points_ledger
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.bump_ledger_user_versions();
+
+CREATE OR REPLACE FUNCTION public.bump_pairing_user_versions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_user_versions(ARRAY[NEW.user_id, NEW.partner_id]);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_user_versions(ARRAY[OLD.user_id, OLD.partner_id]);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER pairings_versions
+    AFTER INSERT OR UPDATE OR DELETE ON pairings
+    FOR EACH ROW
+    EXECUTE FUNCTION public.bump_pairing_user_versions();
+
+-- profiles.points only moves when compaction folds in ledger rows that
+-- already bumped the version, so it isn't listed
+CREATE OR REPLACE FUNCTION public.bump_profile_user_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM bump_user_versions(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER profiles_versions
+    AFTER UPDATE OF email, pair_code, paired ON profiles
+    FOR EACH ROW
+    EXECUTE FUNCTION public.bump_profile_user_version();